@@ -20,6 +20,8 @@ timezone_hold_queue = TimeZoneHoldQueueStack(
     app,
     "TimeZoneHoldQueueStack",
     execution_context=execution_context,
+    db_cluster_identifier=random_system.cluster.cluster_identifier,
+    pre_warmer_function=random_system.pre_warmer_lambda,
     env=execution_context.target_environment,
 )
 
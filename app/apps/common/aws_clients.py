@@ -0,0 +1,63 @@
+import functools
+import os
+import threading
+
+from common.constants import ENV_LAZY_IMPORTS
+
+# boto3 and botocore.config are imported inside the functions below: together they
+# take a few hundred milliseconds to import, which is most of a handler's init time.
+
+
+def is_lazy() -> bool:
+    """LAZY_IMPORTS=true defers boto3 and client creation until a client is first used."""
+    return os.getenv(ENV_LAZY_IMPORTS, 'false').lower() in ('1', 'true', 'yes')
+
+
+def build_client(service_name, disable_retries=False, **kwargs):
+    import boto3
+    if disable_retries:
+        from botocore.config import Config
+        kwargs['config'] = Config(retries={'max_attempts': 1, 'mode': 'standard'})
+    return boto3.client(service_name, **kwargs)
+
+
+def build_table(table_name):
+    import boto3
+    return boto3.resource('dynamodb').Table(table_name)
+
+
+class LazyClient:
+    """Stands in for a boto3 client or resource and builds it on first attribute access."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+
+def lazy(factory):
+    return LazyClient(factory) if is_lazy() else factory()
+
+
+def create_client(service_name, disable_retries=False, **kwargs):
+    """boto3 client, or a LazyClient for it in lazy mode.
+
+    ``disable_retries`` turns off botocore's retry loop for clients whose
+    calls go through a ResilientCaller.
+    """
+    return lazy(functools.partial(build_client, service_name, disable_retries, **kwargs))
+
+
+def create_dynamodb_table(table_name):
+    """boto3 DynamoDB Table resource, or a LazyClient for it in lazy mode."""
+    return lazy(functools.partial(build_table, table_name))
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+
+from common.aws_clients import create_client
+
+
+class CloudWatchClient:
+    def __init__(self):
+        self.cloudwatch_client = create_client('cloudwatch')
+
+    def get_latest_metric_value(self, namespace: str, metric_name: str, dimensions: dict,
+                                statistic: str = 'Average', period_seconds: int = 60, lookback_minutes: int = 5):
+        """Return the most recent datapoint of a metric, or None when there is no data."""
+        now = datetime.now(timezone.utc)
+        response = self.cloudwatch_client.get_metric_statistics(
+            Namespace=namespace,
+            MetricName=metric_name,
+            Dimensions=[{'Name': name, 'Value': value} for name, value in dimensions.items()],
+            StartTime=now - timedelta(minutes=lookback_minutes),
+            EndTime=now,
+            Period=period_seconds,
+            Statistics=[statistic],
+        )
+        datapoints = sorted(response.get('Datapoints', []), key=lambda datapoint: datapoint['Timestamp'])
+        if not datapoints:
+            return None
+        return datapoints[-1][statistic]
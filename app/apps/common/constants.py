@@ -29,10 +29,69 @@ ENV_SAFETY_ZONE_END_HOUR = 'SAFETY_ZONE_END_HOUR'
 ENV_SAFETY_ZONE_END_MINUTE = 'SAFETY_ZONE_END_MINUTE'
 ENV_HOLIDAY_TABLE_NAME = "TABLE_NAME"
 ENV_TARGET_LAMBDA_NAME = "TARGET_LAMBDA_NAME"
+ENV_TARGET_LAMBDA_NAMES = "TARGET_LAMBDA_NAMES"
+ENV_INVENTORY_TABLE_NAME = "INVENTORY_TABLE_NAME"
+ENV_INVENTORY_REFRESH_SECONDS = "INVENTORY_REFRESH_SECONDS"
+ENV_RAMP_STAGES = "RAMP_STAGES"
+ENV_RAMP_SMALL_BACKLOG = "RAMP_SMALL_BACKLOG"
+ENV_RAMP_LATENCY_METRIC = "RAMP_LATENCY_METRIC"
+ENV_RAMP_MAX_LATENCY = "RAMP_MAX_LATENCY"
+ENV_RAMP_YOUNG_BACKLOG_SECONDS = "RAMP_YOUNG_BACKLOG_SECONDS"
+ENV_RAMP_OLD_BACKLOG_SECONDS = "RAMP_OLD_BACKLOG_SECONDS"
+ENV_SCHEDULE_CONFIG = "SCHEDULE_CONFIG"
+ENV_SCHEDULE_CONFIG_PATH = "SCHEDULE_CONFIG_PATH"
 HOLIDAY_DATE_STR = "HOLIDAY_DATE"
 
+# Timezone mappings based on the last three characters of the queue name
+TIMEZONE_MAP = {
+    'EST': 'America/New_York',
+    'CST': 'America/Chicago',
+    'MST': 'America/Denver',
+    'PST': 'America/Los_Angeles',
+    'EDT': 'America/New_York',
+    'CDT': 'America/Chicago',
+    'MDT': 'America/Denver',
+    'PDT': 'America/Los_Angeles'
+}
+
 
 ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN = "DB_CLUSTER_ARN"
 ENV_RANDOM_SYSTEM_DB_SECRET_ARN = "DB_SECRET_ARN"
 ENV_RANDOM_SYSTEM_DB_NAME = "DB_NAME"
-ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL = "OUTPUT_QUEUE_URL"
\ No newline at end of file
+ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL = "OUTPUT_QUEUE_URL"
+ENV_PAYLOAD_BUCKET_NAME = "PAYLOAD_BUCKET_NAME"
+ENV_LOCAL_PAYLOAD_DIR = "LOCAL_PAYLOAD_DIR"
+ENV_MESSAGE_CODEC = "MESSAGE_CODEC"
+ENV_REFERENCE_CACHE_TTL_SECONDS = "REFERENCE_CACHE_TTL_SECONDS"
+ENV_REFERENCE_CACHE_MAX_SIZE = "REFERENCE_CACHE_MAX_SIZE"
+
+
+ENV_RDS_DATA_MAX_ATTEMPTS = "RDS_DATA_MAX_ATTEMPTS"
+ENV_RDS_DATA_RATE_LIMIT = "RDS_DATA_RATE_LIMIT"
+ENV_RDS_DATA_CIRCUIT_FAILURE_THRESHOLD = "RDS_DATA_CIRCUIT_FAILURE_THRESHOLD"
+ENV_RDS_DATA_CIRCUIT_RESET_SECONDS = "RDS_DATA_CIRCUIT_RESET_SECONDS"
+ENV_SQS_MAX_ATTEMPTS = "SQS_MAX_ATTEMPTS"
+ENV_SQS_RATE_LIMIT = "SQS_RATE_LIMIT"
+ENV_EVENT_BUS_NAME = "EVENT_BUS_NAME"
+ENV_EVENTBRIDGE_MAX_ATTEMPTS = "EVENTBRIDGE_MAX_ATTEMPTS"
+# Source of the events upstream systems publish to the random system's history event bus
+HISTORY_EVENT_SOURCE = "random-system.history"
+# The EventBridge input transformer wraps the event detail with its trace context,
+# since EventBridge cannot set message attributes on an SQS target.
+TRACE_CONTEXT_FIELD = "traceContext"
+TRACE_DETAIL_FIELD = "detail"
+# Events carry their lane in detail.priority; anything not marked low goes to the high lane.
+PRIORITY_FIELD = "priority"
+PRIORITY_HIGH = "high"
+PRIORITY_LOW = "low"
+
+ENV_PRE_WARMER_FUNCTION_NAME = "PRE_WARMER_FUNCTION_NAME"
+ENV_PRE_WARM_LEAD_MINUTES = "PRE_WARM_LEAD_MINUTES"
+ENV_PRE_WARM_INTERVAL_SECONDS = "PRE_WARM_INTERVAL_SECONDS"
+ENV_HISTORY_RETENTION_DAYS = "HISTORY_RETENTION_DAYS"
+ENV_HISTORY_PREMAKE_DAYS = "HISTORY_PREMAKE_DAYS"
+
+ENV_PROFILING_MODE = "PROFILING_MODE"
+ENV_PROFILING_SAMPLE_RATE = "PROFILING_SAMPLE_RATE"
+ENV_PROFILING_OUTPUT_DIR = "PROFILING_OUTPUT_DIR"
+ENV_LAZY_IMPORTS = "LAZY_IMPORTS"
@@ -0,0 +1,288 @@
+"""Replay messages from a FIFO dead-letter queue back to its source queue.
+
+Several workers long-poll the DLQ in batches of 10, re-send the selected
+messages with SendMessageBatch and delete them with DeleteMessageBatch once
+they are safely on the source queue. Each message keeps its body, message
+attributes and MessageGroupId, and its original MessageId becomes the
+MessageDeduplicationId, so a redrive interrupted between send and delete
+can be rerun within the 5 minute deduplication window without duplicates.
+
+SQS FIFO never hands out messages of a group while earlier ones of that
+group are in flight, so order within a group is kept across workers. Within
+a batch each SendMessageBatch call carries at most one message per group,
+and a group stops at its first message that can't be sent: that message and
+the rest of its group stay in the DLQ, so nothing overtakes it.
+
+Messages rejected by the filter, and every message of a dry run, are made
+visible again right away so they don't hold back their group until the
+visibility timeout expires. A worker stops once its receives bring nothing
+new, only messages it has already released. Because a released message is
+handed out again before anything behind it in its group, filters and dry
+runs only ever inspect the head of each group: the first 10 messages at
+most. With a single message group that is the whole scan, so redrive the
+head (or delete what should not be replayed) and run again to get further.
+
+Example::
+
+    PYTHONPATH=apps python -m common.dlq_redrive \\
+        --dlq-url https://sqs.us-east-1.amazonaws.com/123456789012/orders-dlq.fifo \\
+        --source-queue-url https://sqs.us-east-1.amazonaws.com/123456789012/orders.fifo \\
+        --workers 8 --rate 200 --dry-run
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from common.resilience import RetryPolicy, TokenBucket
+from common.sqs_client import SQS_MAX_BATCH_SIZE, SQSClient, from_received_message_attributes
+
+# A partially failed SendMessageBatch is retried for its failed entries only, with backoff.
+SEND_ATTEMPTS = 3
+
+
+def select_all(message):
+    return True
+
+
+def build_predicate(group_ids=None, attributes=None, body_contains=None):
+    """Combine the CLI filters into one predicate over a received message. Empty filters match everything."""
+    group_ids = set(group_ids or [])
+    attributes = dict(attributes or {})
+
+    def predicate(message):
+        if group_ids and message.get('Attributes', {}).get('MessageGroupId') not in group_ids:
+            return False
+        message_attributes = message.get('MessageAttributes', {})
+        for name, value in attributes.items():
+            if message_attributes.get(name, {}).get('StringValue') != value:
+                return False
+        if body_contains and body_contains not in message['Body']:
+            return False
+        return True
+
+    return predicate
+
+
+def to_send_entry(entry_id, message) -> dict:
+    """SendMessageBatch entry reproducing a received DLQ message."""
+    entry = {'Id': entry_id, 'MessageBody': message['Body']}
+    group_id = message.get('Attributes', {}).get('MessageGroupId')
+    if group_id:
+        entry['MessageGroupId'] = group_id
+        entry['MessageDeduplicationId'] = message['MessageId']
+    message_attributes = from_received_message_attributes(message.get('MessageAttributes'))
+    if message_attributes:
+        entry['MessageAttributes'] = message_attributes
+    return entry
+
+
+class DlqRedrive:
+    def __init__(self, sqs_client, dlq_url, source_queue_url, workers=4, rate_limiter=None, predicate=None,
+                 dry_run=False, max_messages=None, wait_time_seconds=20, visibility_timeout=300,
+                 empty_receives=2, progress_interval=10.0, retry_policy=None):
+        self.sqs_client = sqs_client
+        self.dlq_url = dlq_url
+        self.source_queue_url = source_queue_url
+        self.workers = workers
+        self.rate_limiter = rate_limiter
+        self.predicate = predicate or select_all
+        self.dry_run = dry_run
+        self.max_messages = max_messages
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        # A worker stops after this many consecutive empty long polls.
+        self.empty_receives = empty_receives
+        self.progress_interval = progress_interval
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=SEND_ATTEMPTS)
+        # Ids of the messages made visible again, so receiving them once more doesn't count as progress.
+        self.released_ids = set()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def count(self, **increments):
+        with self.lock:
+            self.stats.update(increments)
+            if self.max_messages and self.stats['received'] >= self.max_messages:
+                self.stopped.set()
+
+    def send(self, entries) -> set:
+        """Send the entries, retrying failed ones. Returns the ids that were sent."""
+        sent = set()
+        pending = entries
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if attempt > 1:
+                self.retry_policy.sleep(self.retry_policy.compute_delay(attempt - 1))
+            response = self.sqs_client.send_message_batch(self.source_queue_url, pending)
+            sent.update(success['Id'] for success in response.get('Successful', []))
+            failures = response.get('Failed', [])
+            if not failures:
+                break
+            print(f"Failed to send {len(failures)} messages: {failures}")
+            failed_ids = {failure['Id'] for failure in failures if not failure.get('SenderFault')}
+            pending = [entry for entry in pending if entry['Id'] in failed_ids]
+            if not pending:
+                break
+        return sent
+
+    def send_in_order(self, entries) -> set:
+        """Send the entries group by group without letting a message overtake an unsent one of its group.
+
+        Each round sends the next entry of every group still going, one per group, and a group
+        stops at its first entry that fails for good. Returns the ids that were sent.
+        """
+        groups = {}
+        for entry in entries:
+            groups.setdefault(entry.get('MessageGroupId', entry['Id']), []).append(entry)
+        sent = set()
+        while groups:
+            heads = [group[0] for group in groups.values()]
+            sent_now = self.send(heads)
+            sent.update(sent_now)
+            groups = {
+                group_id: group[1:] for group_id, group in groups.items()
+                if group[0]['Id'] in sent_now and len(group) > 1
+            }
+        return sent
+
+    def release(self, messages):
+        """Make messages that stay in the DLQ visible again instead of waiting out the visibility timeout."""
+        if not messages:
+            return
+        with self.lock:
+            self.released_ids.update(message['MessageId'] for message in messages)
+        entries = [
+            {'Id': str(index), 'ReceiptHandle': message['ReceiptHandle'], 'VisibilityTimeout': 0}
+            for index, message in enumerate(messages)
+        ]
+        response = self.sqs_client.change_message_visibility_batch(self.dlq_url, entries)
+        if response.get('Failed'):
+            print(f"Failed to release {len(response['Failed'])} messages: {response['Failed']}")
+
+    def take_new(self, messages) -> list:
+        """Release messages received before and return the others."""
+        with self.lock:
+            new = [message for message in messages if message['MessageId'] not in self.released_ids]
+        if len(new) < len(messages):
+            self.release([message for message in messages if message['MessageId'] in self.released_ids])
+        return new
+
+    def redrive_batch(self, messages):
+        selected, rejected = [], []
+        for message in messages:
+            (selected if self.predicate(message) else rejected).append(message)
+        skipped = len(rejected)
+
+        if self.dry_run or not selected:
+            for message in selected:
+                print(f"Would redrive {message['MessageId']} "
+                      f"(group {message.get('Attributes', {}).get('MessageGroupId')})")
+            self.release(messages)
+            self.count(received=len(messages), skipped=skipped, selected=len(selected))
+            return
+
+        self.release(rejected)
+        if self.rate_limiter:
+            # One token at a time: a batch may be larger than the bucket's capacity.
+            for _ in selected:
+                self.rate_limiter.acquire()
+
+        entries = [to_send_entry(str(index), message) for index, message in enumerate(selected)]
+        sent_ids = self.send_in_order(entries)
+
+        # Only what reached the source queue leaves the DLQ; the rest is retried on a later run.
+        to_delete = [
+            {'Id': entry['Id'], 'ReceiptHandle': message['ReceiptHandle']}
+            for entry, message in zip(entries, selected) if entry['Id'] in sent_ids
+        ]
+        if to_delete:
+            response = self.sqs_client.delete_message_batch(self.dlq_url, to_delete)
+            if response.get('Failed'):
+                print(f"Failed to delete {len(response['Failed'])} redriven messages: {response['Failed']}")
+
+        self.count(received=len(messages), skipped=skipped, redriven=len(sent_ids),
+                   failed=len(entries) - len(sent_ids))
+
+    def worker(self):
+        empty_receives = 0
+        while not self.stopped.is_set():
+            messages = self.sqs_client.receive_messages(
+                self.dlq_url,
+                max_number=SQS_MAX_BATCH_SIZE,
+                wait_time_seconds=self.wait_time_seconds,
+                visibility_timeout=self.visibility_timeout,
+            )
+            messages = self.take_new(messages)
+            if not messages:
+                empty_receives += 1
+                if empty_receives >= self.empty_receives:
+                    return
+                continue
+            empty_receives = 0
+            self.redrive_batch(messages)
+
+    def run(self) -> Counter:
+        """Drain the DLQ until it is empty or ``max_messages`` were received. Returns the counters."""
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.worker) for _ in range(self.workers)}
+            try:
+                while futures:
+                    done, futures = wait(futures, timeout=self.progress_interval)
+                    for future in done:
+                        future.result()
+                    if futures:
+                        print(f"Progress: {dict(self.stats)}")
+            finally:
+                # A failing worker stops the others instead of leaving them polling.
+                self.stopped.set()
+
+        elapsed = time.monotonic() - started_at
+        rate = self.stats['redriven'] / elapsed if elapsed else 0
+        action = "Dry run" if self.dry_run else "Redrive"
+        print(f"{action} finished in {elapsed:.1f}s ({rate:.0f} messages/s): {dict(self.stats)}")
+        return self.stats
+
+
+def parse_attribute_filter(value):
+    name, separator, attribute_value = value.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError(f"Expected NAME=VALUE, got {value}")
+    return name, attribute_value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dlq-url', required=True)
+    parser.add_argument('--source-queue-url', required=True)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=0, help='maximum messages redriven per second, 0 for no limit')
+    parser.add_argument('--max-messages', type=int, help='stop after receiving about this many messages')
+    parser.add_argument('--visibility-timeout', type=int, default=300)
+    parser.add_argument('--group', action='append', dest='groups', help='only redrive this message group, repeatable; '
+                        'only the first 10 messages of the other groups are looked at')
+    parser.add_argument('--attribute', action='append', type=parse_attribute_filter, dest='attributes',
+                        help='only redrive messages with this NAME=VALUE message attribute, repeatable')
+    parser.add_argument('--body-contains', help='only redrive messages whose body contains this text')
+    parser.add_argument('--dry-run', action='store_true', help='list what would be redriven without moving it; '
+                        'only the first 10 messages of each group are listed')
+    args = parser.parse_args(argv)
+
+    redrive = DlqRedrive(
+        SQSClient(),
+        args.dlq_url,
+        args.source_queue_url,
+        workers=args.workers,
+        rate_limiter=TokenBucket(args.rate, capacity=max(args.rate, SQS_MAX_BATCH_SIZE)) if args.rate > 0 else None,
+        predicate=build_predicate(args.groups, args.attributes, args.body_contains),
+        dry_run=args.dry_run,
+        max_messages=args.max_messages,
+        visibility_timeout=args.visibility_timeout,
+    )
+    redrive.run()
+
+
+if __name__ == '__main__':
+    main()
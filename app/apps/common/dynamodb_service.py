@@ -1,9 +1,9 @@
-import boto3
+from common.aws_clients import create_dynamodb_table
 
 
 class DynamoDBService:
     def __init__(self, table_name):
-        self.dynamo_table = boto3.resource('dynamodb').Table(table_name)
+        self.dynamo_table = create_dynamodb_table(table_name)
 
     def get_item(self, key: dict) -> dict:
         response = self.dynamo_table.get_item(Key=key)
@@ -12,3 +12,7 @@ class DynamoDBService:
     def get_items(self):
         response = self.dynamo_table.scan()
         return response
+
+    def put_item(self, item: dict) -> dict:
+        response = self.dynamo_table.put_item(Item=item)
+        return response
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+
+from common.aws_clients import create_client
+from common.constants import ENV_EVENT_BUS_NAME, ENV_EVENTBRIDGE_MAX_ATTEMPTS, PRIORITY_FIELD
+from common.resilience import RETRYABLE_ERROR_CODES, ResilientCaller, RetryPolicy
+
+# PutEvents takes at most 10 entries and 256 KB per request.
+PUT_EVENTS_MAX_ENTRIES = 10
+PUT_EVENTS_MAX_BYTES = 256 * 1024
+
+
+def get_entry_size(entry: dict) -> int:
+    """Size of a PutEvents entry as EventBridge counts it towards the request limit."""
+    size = 14 if entry.get('Time') else 0
+    for field in ('Source', 'DetailType', 'Detail'):
+        if entry.get(field):
+            size += len(entry[field].encode('utf-8'))
+    for resource in entry.get('Resources', []):
+        size += len(resource.encode('utf-8'))
+    return size
+
+
+def create_default_caller() -> ResilientCaller:
+    """Build the retry setup for EventBridge from env vars."""
+    return ResilientCaller(
+        'events',
+        retry_policy=RetryPolicy(max_attempts=int(os.getenv(ENV_EVENTBRIDGE_MAX_ATTEMPTS, '5'))),
+    )
+
+
+class EventBridgeClient:
+    """Buffers events and publishes them with as few PutEvents calls as possible.
+
+    Events are flushed whenever the next one would push the buffer past 10
+    entries or 256 KB, on ``flush()`` and on ``close()``. With
+    ``flush_interval`` set, a background thread also flushes every that
+    many seconds, so a slow trickle of events is not held back. Entries
+    EventBridge rejects in an otherwise successful call with a throttling
+    or internal error are retried on their own with backoff. Entries
+    rejected for any other reason, still failing after the last attempt,
+    or pending when a call raised are kept in ``failed_entries``.
+    """
+
+    def __init__(self, event_bus_name=None, source=None, caller: ResilientCaller = None, flush_interval=None):
+        # Retries are handled by the caller, so disable botocore's own retry loop.
+        self.events_client = create_client('events', disable_retries=True)
+        self.caller = caller or create_default_caller()
+        self.event_bus_name = event_bus_name or os.getenv(ENV_EVENT_BUS_NAME)
+        self.source = source
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.failed_entries = []
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.flush_thread = None
+        if flush_interval:
+            self.flush_thread = threading.Thread(target=self.flush_periodically, args=(flush_interval,), daemon=True)
+            self.flush_thread.start()
+
+    def put_event(self, detail_type: str, detail, source: str = None, resources: list = None, priority: str = None):
+        """Queue an event. ``detail`` is a dict or an already serialised JSON string.
+
+        ``priority`` is set as detail.priority, which the history event rules route on.
+        """
+        if priority is not None:
+            if isinstance(detail, str):
+                detail = json.loads(detail)
+            detail = {**detail, PRIORITY_FIELD: priority}
+        source = source or self.source
+        if not source:
+            raise ValueError("An event source is required, pass source here or to the client")
+        entry = {
+            'Source': source,
+            'DetailType': detail_type,
+            'Detail': detail if isinstance(detail, str) else json.dumps(detail, separators=(',', ':')),
+        }
+        if resources:
+            entry['Resources'] = list(resources)
+        if self.event_bus_name:
+            entry['EventBusName'] = self.event_bus_name
+
+        entry_size = get_entry_size(entry)
+        if entry_size > PUT_EVENTS_MAX_BYTES:
+            raise ValueError(f"Event of {entry_size} bytes exceeds the {PUT_EVENTS_MAX_BYTES} bytes PutEvents limit")
+
+        full_batch = None
+        with self.lock:
+            if len(self.buffer) >= PUT_EVENTS_MAX_ENTRIES or self.buffer_bytes + entry_size > PUT_EVENTS_MAX_BYTES:
+                full_batch = self.take_buffer()
+            self.buffer.append(entry)
+            self.buffer_bytes += entry_size
+        if full_batch:
+            self.put_entries(full_batch)
+
+    def take_buffer(self) -> list:
+        entries, self.buffer, self.buffer_bytes = self.buffer, [], 0
+        return entries
+
+    def flush(self):
+        """Publish everything buffered so far."""
+        with self.lock:
+            entries = self.take_buffer()
+        # The lock only guards the buffer, so other threads keep buffering during the call and its backoff.
+        if entries:
+            self.put_entries(entries)
+
+    def record_failed(self, entries):
+        with self.lock:
+            self.failed_entries.extend(entries)
+
+    def put_entries(self, entries):
+        retry_policy = self.caller.retry_policy
+        pending = entries
+        try:
+            for attempt in range(1, retry_policy.max_attempts + 1):
+                response = self.caller.call(self.events_client.put_events, Entries=pending)
+                if not response.get('FailedEntryCount'):
+                    return
+                # Result entries line up with the request entries; failed ones carry an ErrorCode.
+                failed = [
+                    (entry, result) for entry, result in zip(pending, response['Entries']) if result.get('ErrorCode')
+                ]
+                print(f"PutEvents rejected {len(failed)} entries on attempt {attempt}: "
+                      f"{sorted({result['ErrorCode'] for _, result in failed})}")
+                # Throttled or internal failures may pass next time; a malformed entry fails the same way again.
+                self.record_failed([
+                    entry for entry, result in failed if result['ErrorCode'] not in RETRYABLE_ERROR_CODES
+                ])
+                pending = [entry for entry, result in failed if result['ErrorCode'] in RETRYABLE_ERROR_CODES]
+                if not pending:
+                    return
+                if attempt < retry_policy.max_attempts:
+                    retry_policy.sleep(retry_policy.compute_delay(attempt))
+        except Exception:
+            # Keep the events still unpublished for the caller to inspect or republish.
+            self.record_failed(pending)
+            raise
+        self.record_failed(pending)
+
+    def flush_periodically(self, interval):
+        while not self.stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Background flush failed: {e}")
+
+    def close(self):
+        """Stop the background thread, if any, and flush what is left."""
+        self.stopped.set()
+        if self.flush_thread:
+            self.flush_thread.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,169 @@
+"""Measure how long each Lambda handler module takes to import, against a budget.
+
+Every module is imported in a fresh interpreter under ``python -X importtime``
+(the median of ``--runs`` runs is used), with placeholder values for the
+environment variables the handlers read at import time. The slowest parts
+of the import tree are printed and the exit status is 1 when any handler
+is over its budget. Wall-clock budgets depend on the host, so the test suite
+checks them only when CHECK_IMPORT_BUDGETS=true (run that in a dedicated CI job).
+By default it checks instead that in lazy mode no handler imports boto3 or
+botocore, which holds on any machine.
+
+Example::
+
+    PYTHONPATH=apps python -m common.import_profiler --lazy
+    PYTHONPATH=apps python -m common.import_profiler --module random_system.class_mapper_lambda --budget-ms 150
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import NamedTuple
+
+from common.constants import (
+    ENV_LAZY_IMPORTS,
+    ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
+    ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
+    ENV_RANDOM_SYSTEM_DB_NAME,
+    ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL,
+)
+
+APPS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import budget per handler module of both stacks, in milliseconds: the slowest median
+# measured on a 1 vCPU build host plus about 30%, so a new eager import of boto3 or of a
+# heavy library fails the check. Re-measure and update these when a change is meant to
+# move them.
+HANDLER_BUDGETS_MS = {
+    'random_system.history_processor_lambda': 450,  # measured 240-355
+    'random_system.class_mapper_lambda': 450,  # measured 225-345
+    'random_system.pre_warmer_lambda': 450,  # measured 245-345
+    'random_system.partition_maintenance_lambda': 45,  # measured 22-30
+    'random_system.init_db': 45,  # measured 23-33
+    'timezone_hold_queue.main': 530,  # measured 310-405
+}
+# The same with LAZY_IMPORTS=true, where no boto3 client is built at import.
+LAZY_HANDLER_BUDGETS_MS = {
+    'random_system.history_processor_lambda': 80,  # measured 55
+    'random_system.class_mapper_lambda': 80,  # measured 53
+    'random_system.pre_warmer_lambda': 50,  # measured 32
+    'random_system.partition_maintenance_lambda': 45,  # measured 22-30
+    'random_system.init_db': 45,  # measured 23-33
+    'timezone_hold_queue.main': 60,  # measured 38
+}
+
+
+# Packages a handler must not import at module level in lazy mode: they are what lazy mode defers.
+LAZY_FORBIDDEN_PACKAGES = ('boto3', 'botocore', 'urllib3')
+
+PLACEHOLDER_ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN: 'arn:aws:rds:us-east-1:123456789012:cluster:placeholder',
+    ENV_RANDOM_SYSTEM_DB_SECRET_ARN: 'arn:aws:secretsmanager:us-east-1:123456789012:secret:placeholder',
+    ENV_RANDOM_SYSTEM_DB_NAME: 'postgres',
+    ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL: 'https://sqs.us-east-1.amazonaws.com/123456789012/placeholder.fifo',
+}
+
+
+class ImportEntry(NamedTuple):
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> list:
+    """Parse ``-X importtime`` lines such as ``import time:   120 |   3400 |   common.sqs_client``."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append(ImportEntry(name.strip(), depth, int(fields[0]), int(fields[1])))
+    return entries
+
+
+def measure(module, lazy=False, env=None, python=sys.executable) -> list:
+    """Import ``module`` in a fresh interpreter and return its import entries."""
+    process_env = {**os.environ, **PLACEHOLDER_ENV, **(env or {})}
+    process_env['PYTHONPATH'] = os.pathsep.join(filter(None, [APPS_DIR, process_env.get('PYTHONPATH')]))
+    process_env[ENV_LAZY_IMPORTS] = 'true' if lazy else 'false'
+    completed = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        env=process_env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+    return parse_importtime(completed.stderr)
+
+
+def find_forbidden_imports(module, forbidden=LAZY_FORBIDDEN_PACKAGES, env=None) -> list:
+    """Names of the modules under the ``forbidden`` packages that importing ``module`` loads in lazy mode."""
+    return sorted({
+        entry.name for entry in measure(module, lazy=True, env=env) if entry.name.split('.')[0] in forbidden
+    })
+
+
+def get_total_us(entries, module) -> int:
+    """Cumulative import time of the top-level module."""
+    return next(entry.cumulative_us for entry in entries if entry.name == module and entry.depth == 0)
+
+
+def summarize(entries, top_n=10) -> list:
+    """The ``top_n`` costliest imports by self time, which is where the time actually goes."""
+    return sorted(entries, key=lambda entry: entry.self_us, reverse=True)[:top_n]
+
+
+def check(modules_budgets, lazy=False, runs=3, top_n=10, env=None) -> bool:
+    """Print a report for each module. Returns True when every module is within its budget."""
+    all_within_budget = True
+    for module, budget_ms in modules_budgets.items():
+        measurements = [measure(module, lazy=lazy, env=env) for _ in range(runs)]
+        totals_ms = [get_total_us(entries, module) / 1000 for entries in measurements]
+        total_ms = statistics.median(totals_ms)
+        within_budget = total_ms <= budget_ms
+        all_within_budget = all_within_budget and within_budget
+
+        print(f"{'OK  ' if within_budget else 'OVER'} {module}: {total_ms:.1f} ms (budget {budget_ms} ms, "
+              f"runs {', '.join(f'{total:.0f}' for total in totals_ms)})")
+        for entry in summarize(measurements[totals_ms.index(total_ms)], top_n):
+            print(f"       {entry.self_us / 1000:8.1f} ms self {entry.cumulative_us / 1000:8.1f} ms cumulative  "
+                  f"{entry.name}")
+    return all_within_budget
+
+
+def parse_env(value):
+    name, separator, env_value = value.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError(f"Expected NAME=VALUE, got {value}")
+    return name, env_value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', action='append', dest='modules', help='handler module, repeatable; '
+                                                                          'defaults to every handler')
+    parser.add_argument('--budget-ms', type=float, help='budget for every module, instead of the defaults')
+    parser.add_argument('--lazy', action='store_true', help='measure with LAZY_IMPORTS=true')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--env', action='append', type=parse_env, default=[], help='extra NAME=VALUE, repeatable')
+    args = parser.parse_args(argv)
+
+    default_budgets = LAZY_HANDLER_BUDGETS_MS if args.lazy else HANDLER_BUDGETS_MS
+    modules = args.modules or list(default_budgets)
+    budgets = {
+        module: args.budget_ms if args.budget_ms is not None else default_budgets.get(module, 400)
+        for module in modules
+    }
+    within_budget = check(budgets, lazy=args.lazy, runs=args.runs, top_n=args.top, env=dict(args.env))
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,43 @@
-import boto3
+import json
+
+from common.aws_clients import create_client
 
 
 class LambdaClient:
     def __init__(self):
-        self.lambda_client = boto3.client('lambda')
+        self.lambda_client = create_client('lambda')
 
     def get_list_event_source_mappings(self, target_lambda_name: str) -> dict:
         return self.lambda_client.list_event_source_mappings(
             FunctionName=target_lambda_name
         )
 
+    def list_all_event_source_mappings(self, target_lambda_name: str) -> list:
+        """Return every event source mapping of a function, following NextMarker."""
+        mappings = []
+        paginator = self.lambda_client.get_paginator('list_event_source_mappings')
+        for page in paginator.paginate(FunctionName=target_lambda_name):
+            mappings.extend(page.get('EventSourceMappings', []))
+        return mappings
+
     def get_event_source_mapping(self, uuid: str) -> dict:
         return self.lambda_client.get_event_source_mapping(
             UUID=uuid
         )
 
-    def update_event_source_mapping(self, uuid: str, enabled: bool) -> dict:
-        return self.lambda_client.update_event_source_mapping(
-            UUID=uuid,
-            Enabled=enabled
-        )
\ No newline at end of file
+    def update_event_source_mapping(self, uuid: str, enabled: bool = None, maximum_concurrency: int = None) -> dict:
+        """Update the state and/or the SQS maximum concurrency (2-1000) of a mapping in one call."""
+        kwargs = {'UUID': uuid}
+        if enabled is not None:
+            kwargs['Enabled'] = enabled
+        if maximum_concurrency is not None:
+            kwargs['ScalingConfig'] = {'MaximumConcurrency': maximum_concurrency}
+        return self.lambda_client.update_event_source_mapping(**kwargs)
+
+    def invoke_async(self, function_name: str, payload: dict) -> dict:
+        """Queue an asynchronous invocation; returns as soon as Lambda accepts the event."""
+        return self.lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps(payload).encode('utf-8'),
+        )
@@ -0,0 +1,117 @@
+import base64
+import json
+
+# Optional faster backends. The stdlib codec is always available.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment package
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the deployment package
+    msgpack = None
+
+CONTENT_TYPE_ATTRIBUTE = "ContentType"
+SCHEMA_VERSION_ATTRIBUTE = "SchemaVersion"
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/x-msgpack+base64"
+DEFAULT_SCHEMA_VERSION = 1
+
+
+class JsonCodec:
+    name = "json"
+    content_type = CONTENT_TYPE_JSON
+
+    @staticmethod
+    def encode(payload) -> str:
+        return json.dumps(payload, separators=(",", ":"))
+
+    @staticmethod
+    def decode(body: str):
+        return json.loads(body)
+
+
+class OrjsonCodec:
+    """Same wire format as JsonCodec, only faster, so consumers need no upgrade."""
+    name = "orjson"
+    content_type = CONTENT_TYPE_JSON
+
+    @staticmethod
+    def encode(payload) -> str:
+        return orjson.dumps(payload).decode("utf-8")
+
+    @staticmethod
+    def decode(body: str):
+        return orjson.loads(body)
+
+
+class MsgpackCodec:
+    """Compact binary encoding, base64'd because SQS bodies must be text."""
+    name = "msgpack"
+    content_type = CONTENT_TYPE_MSGPACK
+
+    @staticmethod
+    def encode(payload) -> str:
+        return base64.b64encode(msgpack.packb(payload, use_bin_type=True)).decode("ascii")
+
+    @staticmethod
+    def decode(body: str):
+        return msgpack.unpackb(base64.b64decode(body), raw=False)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+AVAILABLE = {
+    JsonCodec.name: True,
+    OrjsonCodec.name: orjson is not None,
+    MsgpackCodec.name: msgpack is not None,
+}
+
+
+def get_decoder(content_type: str):
+    """Pick the fastest installed decoder for a content type."""
+    if content_type == CONTENT_TYPE_JSON:
+        return OrjsonCodec if AVAILABLE[OrjsonCodec.name] else JsonCodec
+    if content_type == CONTENT_TYPE_MSGPACK:
+        if not AVAILABLE[MsgpackCodec.name]:
+            raise ValueError("Received a msgpack message but msgpack is not installed")
+        return MsgpackCodec
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+class MessageCodec:
+    """Serialises payloads with a pluggable backend and a versioned envelope.
+
+    The content type and schema version travel as message attributes, so a
+    consumer decodes whatever a producer sent and producers and consumers
+    can be upgraded independently. Messages without attributes are treated
+    as schema version 1 JSON, which is what producers sent before.
+    """
+
+    def __init__(self, codec_name=JsonCodec.name, schema_version=DEFAULT_SCHEMA_VERSION):
+        if codec_name not in CODECS:
+            raise ValueError(f"Unknown message codec: {codec_name}")
+        if not AVAILABLE[codec_name]:
+            raise ValueError(f"Message codec {codec_name} is not installed")
+        self.codec = CODECS[codec_name]
+        self.schema_version = schema_version
+
+    def encode(self, payload):
+        """Return (body, message attributes) for a payload."""
+        return self.codec.encode(payload), {
+            CONTENT_TYPE_ATTRIBUTE: self.codec.content_type,
+            SCHEMA_VERSION_ATTRIBUTE: str(self.schema_version),
+        }
+
+    @staticmethod
+    def decode(body: str, attributes: dict = None):
+        """Return (payload, schema version) for a body and its message attributes."""
+        attributes = attributes or {}
+        decoder = get_decoder(attributes.get(CONTENT_TYPE_ATTRIBUTE, CONTENT_TYPE_JSON))
+        schema_version = int(attributes.get(SCHEMA_VERSION_ATTRIBUTE, DEFAULT_SCHEMA_VERSION))
+        return decoder.decode(body), schema_version
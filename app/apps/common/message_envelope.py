@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import json
+import os
+import zlib
+
+from common.constants import ENV_PAYLOAD_BUCKET_NAME, ENV_LOCAL_PAYLOAD_DIR
+from common.s3_client import S3Client
+
+CONTENT_ENCODING_ATTRIBUTE = "ContentEncoding"
+ENCODING_IDENTITY = "identity"
+ENCODING_ZLIB = "zlib+base64"
+ENCODING_CLAIM_CHECK = "claim-check"
+
+# SQS rejects messages above 256 KB and bills every started 64 KB chunk.
+SQS_MAX_MESSAGE_BYTES = 256 * 1024
+# Leave room for message attributes, which count towards the limit.
+DEFAULT_OFFLOAD_THRESHOLD = SQS_MAX_MESSAGE_BYTES - 16 * 1024
+DEFAULT_COMPRESS_THRESHOLD = 1024
+PAYLOAD_KEY_PREFIX = "payloads/"
+
+
+class S3ObjectStore:
+    """Claim-check storage in an S3 bucket."""
+
+    def __init__(self, bucket, s3_client=None):
+        self.bucket = bucket
+        self.s3_client = s3_client or S3Client()
+
+    def put(self, key, data: bytes) -> dict:
+        self.s3_client.put_object(self.bucket, key, data)
+        return {"store": "s3", "bucket": self.bucket, "key": key}
+
+    def get(self, reference: dict) -> bytes:
+        return self.s3_client.get_object(reference["bucket"], reference["key"])
+
+
+class LocalObjectStore:
+    """Filesystem stand-in for S3, for tests and local runs."""
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def put(self, key, data: bytes) -> dict:
+        path = os.path.join(self.root_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as payload_file:
+            payload_file.write(data)
+        return {"store": "local", "key": key}
+
+    def get(self, reference: dict) -> bytes:
+        with open(os.path.join(self.root_dir, reference["key"]), "rb") as payload_file:
+            return payload_file.read()
+
+
+class MessageEnvelope:
+    """Transparently compresses or offloads message bodies.
+
+    ``wrap`` returns the body to send and the message attributes describing
+    how it was encoded; ``unwrap`` reverses it. Messages without the
+    encoding attribute are passed through untouched, so old producers keep
+    working.
+    """
+
+    def __init__(self, object_store=None, compress_threshold=DEFAULT_COMPRESS_THRESHOLD,
+                 offload_threshold=DEFAULT_OFFLOAD_THRESHOLD):
+        self.object_store = object_store
+        self.compress_threshold = compress_threshold
+        self.offload_threshold = offload_threshold
+
+    def wrap(self, body: str):
+        raw = body.encode("utf-8")
+        encoded_body, encoding = body, ENCODING_IDENTITY
+
+        if len(raw) >= self.compress_threshold:
+            compressed = base64.b64encode(zlib.compress(raw)).decode("ascii")
+            # Only worth it when it saves more than the attribute overhead.
+            if len(compressed) < len(raw) * 0.9:
+                encoded_body, encoding = compressed, ENCODING_ZLIB
+
+        # SQS limits bytes, and multibyte UTF-8 bodies have more bytes than characters.
+        if len(encoded_body.encode("utf-8")) > self.offload_threshold:
+            if self.object_store is None:
+                raise ValueError(f"Message of {len(raw)} bytes is too large for SQS and no payload store is configured")
+            # Content-addressed key, so resending the same payload keeps FIFO content-based deduplication working.
+            key = f"{PAYLOAD_KEY_PREFIX}{hashlib.sha256(raw).hexdigest()}"
+            reference = self.object_store.put(key, zlib.compress(raw))
+            encoded_body, encoding = json.dumps(reference), ENCODING_CLAIM_CHECK
+
+        if encoding == ENCODING_IDENTITY:
+            return encoded_body, {}
+        return encoded_body, {CONTENT_ENCODING_ATTRIBUTE: encoding}
+
+    def unwrap(self, body: str, attributes: dict = None) -> str:
+        encoding = (attributes or {}).get(CONTENT_ENCODING_ATTRIBUTE, ENCODING_IDENTITY)
+        if encoding == ENCODING_IDENTITY:
+            return body
+        if encoding == ENCODING_ZLIB:
+            return zlib.decompress(base64.b64decode(body)).decode("utf-8")
+        if encoding == ENCODING_CLAIM_CHECK:
+            if self.object_store is None:
+                raise ValueError("Received a claim-check message but no payload store is configured")
+            return zlib.decompress(self.object_store.get(json.loads(body))).decode("utf-8")
+        raise ValueError(f"Unknown content encoding: {encoding}")
+
+    def unwrap_record(self, record: dict) -> str:
+        """Decode the body of an SQS record as delivered to Lambda."""
+        return self.unwrap(record["body"], get_record_attributes(record))
+
+
+def get_record_attributes(record: dict) -> dict:
+    """Flatten the string message attributes of a Lambda SQS record into {name: value}."""
+    return {
+        name: attribute.get("stringValue")
+        for name, attribute in record.get("messageAttributes", {}).items()
+        if attribute.get("stringValue") is not None
+    }
+
+
+def create_default_envelope() -> MessageEnvelope:
+    """Envelope backed by PAYLOAD_BUCKET_NAME, or LOCAL_PAYLOAD_DIR when running locally."""
+    bucket = os.getenv(ENV_PAYLOAD_BUCKET_NAME)
+    local_dir = os.getenv(ENV_LOCAL_PAYLOAD_DIR)
+    if bucket:
+        return MessageEnvelope(S3ObjectStore(bucket))
+    if local_dir:
+        return MessageEnvelope(LocalObjectStore(local_dir))
+    return MessageEnvelope()
@@ -0,0 +1,123 @@
+import datetime
+import linecache
+import re
+from typing import Any, Callable, NamedTuple, Optional, Union
+
+MISSING = object()
+
+
+def to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+
+def to_datetime(value) -> datetime.datetime:
+    """Parse timestamps as the Data API returns them, e.g. ``2024-01-01 00:00:00.123``."""
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(value)
+
+
+COERCIONS = {
+    'int': int,
+    'float': float,
+    'str': str,
+    'bool': to_bool,
+    'datetime': to_datetime,
+}
+
+
+class FieldMapping(NamedTuple):
+    """One target key. ``source`` is a dict key or, for rows given as sequences, a column index."""
+    target: str
+    source: Union[str, int]
+    coerce: Optional[Union[str, Callable]] = None
+    # Used when the source key is missing or None. Without a default, a missing key raises.
+    default: Any = MISSING
+
+
+class MappingSpec(NamedTuple):
+    message_type: str
+    fields: tuple
+
+
+def generate_source(spec: MappingSpec, function_name: str):
+    """Return (Python source, namespace) of a function that applies ``spec`` to one record."""
+    namespace = {}
+    lines = [f"def {function_name}(record):"]
+    items = []
+    for index, field in enumerate(spec.fields):
+        coerce = COERCIONS[field.coerce] if isinstance(field.coerce, str) else field.coerce
+        if coerce is not None:
+            namespace[f'coerce_{index}'] = coerce
+        if field.default is MISSING:
+            value = f"record[{field.source!r}]"
+            items.append(f"{field.target!r}: {f'coerce_{index}({value})' if coerce else value}")
+            continue
+        # Optional fields need a statement or two; required ones stay inline in the dict display.
+        namespace[f'default_{index}'] = field.default
+        if isinstance(field.source, int):
+            lines.append(f"    value_{index} = record[{field.source}] if len(record) > {field.source} else None")
+        else:
+            lines.append(f"    value_{index} = record.get({field.source!r})")
+        if coerce:
+            lines.append(f"    value_{index} = default_{index} if value_{index} is None else "
+                         f"coerce_{index}(value_{index})")
+        else:
+            lines.append(f"    if value_{index} is None:")
+            lines.append(f"        value_{index} = default_{index}")
+        items.append(f"{field.target!r}: value_{index}")
+    lines.append("    return {" + ", ".join(items) + "}")
+    return "\n".join(lines) + "\n", namespace
+
+
+def compile_mapping(spec: MappingSpec) -> Callable:
+    """Compile ``spec`` into a plain function, so applying it costs what a hand-written mapping does.
+
+    The generated source is kept in ``mapper.source`` and registered with
+    linecache, so tracebacks through a mapper show the failing line.
+    """
+    unknown = [
+        field.coerce for field in spec.fields if isinstance(field.coerce, str) and field.coerce not in COERCIONS
+    ]
+    if unknown:
+        raise ValueError(f"Unknown coercions in mapping {spec.message_type}: {unknown}")
+    function_name = "map_" + re.sub(r'\W', '_', spec.message_type)
+    source, namespace = generate_source(spec, function_name)
+    filename = f"<mapping {spec.message_type}>"
+    exec(compile(source, filename, 'exec'), namespace)
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    mapper = namespace[function_name]
+    mapper.source = source
+    return mapper
+
+
+class MappingRegistry:
+    """Mapping specs by message type, each compiled on first use and kept for the container's lifetime.
+
+    Compiling lazily keeps unused specs off the cold start, and registering
+    more message types adds nothing to the cost of mapping a record.
+    """
+
+    def __init__(self):
+        self.specs = {}
+        self.mappers = {}
+
+    def register(self, message_type: str, fields) -> MappingSpec:
+        """Register ``fields``, FieldMapping instances or plain (target, source, coerce, default) tuples."""
+        spec = MappingSpec(message_type, tuple(FieldMapping(*field) for field in fields))
+        self.specs[message_type] = spec
+        self.mappers.pop(message_type, None)
+        return spec
+
+    def get_mapper(self, message_type: str) -> Callable:
+        mapper = self.mappers.get(message_type)
+        if mapper is None:
+            if message_type not in self.specs:
+                raise ValueError(f"No mapping registered for message type: {message_type}")
+            mapper = self.mappers[message_type] = compile_mapping(self.specs[message_type])
+        return mapper
+
+    def map(self, message_type: str, record):
+        return self.get_mapper(message_type)(record)
@@ -0,0 +1,108 @@
+from typing import NamedTuple, Tuple
+
+CREATE_VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+SELECT_VERSIONS_SQL = "SELECT version FROM schema_migrations ORDER BY version"
+RECORD_VERSION_SQL = """
+INSERT INTO schema_migrations (version, description) VALUES (:version, :description)
+ON CONFLICT (version) DO NOTHING
+"""
+INVALID_INDEX_SQL = """
+SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+WHERE c.relname = :name AND NOT i.indisvalid
+"""
+# Fail fast rather than queueing behind live traffic for a table lock.
+LOCK_TIMEOUT_SQL = "SET LOCAL lock_timeout = '5s'"
+
+
+class Migration(NamedTuple):
+    """One schema change.
+
+    Transactional migrations run all their statements in a single Data API
+    transaction together with the version bookkeeping. Non-transactional
+    ones are for statements PostgreSQL refuses to run in a transaction, such
+    as CREATE INDEX CONCURRENTLY; every statement must then be idempotent.
+    Indexes built concurrently are listed in ``concurrent_indexes`` so a
+    build left invalid by an earlier failure is dropped and rebuilt.
+    """
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+    transactional: bool = True
+    concurrent_indexes: Tuple[str, ...] = ()
+
+
+class MigrationRunner:
+    def __init__(self, rds_data_client, cluster_arn, secret_arn, db_name, migrations):
+        self.rds_data_client = rds_data_client
+        self.cluster_arn = cluster_arn
+        self.secret_arn = secret_arn
+        self.db_name = db_name
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        versions = [migration.version for migration in self.migrations]
+        if len(versions) != len(set(versions)):
+            raise ValueError(f"Duplicate migration versions: {versions}")
+
+    def execute(self, sql, parameters=None, transaction_id=None):
+        return self.rds_data_client.execute_statement(
+            sql, parameters or [], self.cluster_arn, self.secret_arn, self.db_name, transaction_id=transaction_id
+        )
+
+    def get_applied_versions(self) -> set:
+        self.execute(CREATE_VERSION_TABLE_SQL)
+        response = self.execute(SELECT_VERSIONS_SQL)
+        return {record[0]['longValue'] for record in response.get('records', [])}
+
+    def record_version(self, migration, transaction_id=None):
+        self.execute(RECORD_VERSION_SQL, [
+            {'name': 'version', 'value': {'longValue': migration.version}},
+            {'name': 'description', 'value': {'stringValue': migration.description}},
+        ], transaction_id=transaction_id)
+
+    def drop_invalid_index(self, index_name):
+        response = self.execute(INVALID_INDEX_SQL, [{'name': 'name', 'value': {'stringValue': index_name}}])
+        if response.get('records'):
+            print(f"Dropping invalid index {index_name} left by an earlier failed build")
+            self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+    def apply(self, migration):
+        print(f"Applying migration {migration.version}: {migration.description}")
+        if not migration.transactional:
+            for index_name in migration.concurrent_indexes:
+                self.drop_invalid_index(index_name)
+            for statement in migration.statements:
+                self.execute(statement)
+            self.record_version(migration)
+            return
+
+        transaction_id = self.rds_data_client.begin_transaction(self.cluster_arn, self.secret_arn, self.db_name)
+        try:
+            self.execute(LOCK_TIMEOUT_SQL, transaction_id=transaction_id)
+            for statement in migration.statements:
+                self.execute(statement, transaction_id=transaction_id)
+            self.record_version(migration, transaction_id=transaction_id)
+            self.rds_data_client.commit_transaction(transaction_id, self.cluster_arn, self.secret_arn)
+        except Exception:
+            self.rds_data_client.rollback_transaction(transaction_id, self.cluster_arn, self.secret_arn)
+            raise
+
+    def run(self) -> list:
+        """Apply every pending migration in version order. Returns the versions applied."""
+        applied_versions = self.get_applied_versions()
+        applied_now = []
+        for migration in self.migrations:
+            if migration.version in applied_versions:
+                continue
+            self.apply(migration)
+            applied_now.append(migration.version)
+        print(f"Schema is at version {self.latest_version}, applied {applied_now or 'nothing'}")
+        return applied_now
+
+    @property
+    def latest_version(self):
+        return self.migrations[-1].version if self.migrations else 0
@@ -0,0 +1,132 @@
+import re
+from datetime import date, timedelta
+
+LIST_PARTITIONS_SQL = """
+SELECT child.relname FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = :table_name
+ORDER BY child.relname
+"""
+# Same guard as schema migrations: never queue behind live traffic for the parent's lock.
+LOCK_TIMEOUT_SQL = "SET LOCAL lock_timeout = '5s'"
+PARTITION_DATE_FORMAT = '%Y%m%d'
+
+
+class DailyPartitionManager:
+    """Keeps a table partitioned by RANGE on a timestamp column in one partition per UTC day.
+
+    ``ensure_partitions`` creates today's partition and the next
+    ``premake_days`` ones, so inserts never hit a missing range.
+    ``drop_expired`` enforces retention by dropping whole partitions older
+    than ``retention_days``, which frees the space at once instead of
+    leaving dead tuples behind like a DELETE would.
+
+    If the table has a ``<table>_default`` DEFAULT partition, rows for days
+    without a partition land there instead of failing the insert. Creating
+    the day's partition later moves them over, because Postgres refuses to
+    add a range the default partition already holds rows for. Retention
+    never touches the default partition.
+    """
+
+    def __init__(self, rds_data_client, cluster_arn, secret_arn, db_name, table_name, premake_days=7,
+                 retention_days=30, partition_column='created_at'):
+        for identifier in (table_name, partition_column):
+            if not re.fullmatch(r'[a-z_][a-z0-9_]*', identifier):
+                raise ValueError(f"Invalid identifier: {identifier}")
+        self.rds_data_client = rds_data_client
+        self.cluster_arn = cluster_arn
+        self.secret_arn = secret_arn
+        self.db_name = db_name
+        self.table_name = table_name
+        self.premake_days = premake_days
+        self.retention_days = retention_days
+        self.partition_column = partition_column
+        self.default_partition = f"{table_name}_default"
+        self.partition_pattern = re.compile(rf'{table_name}_p(\d{{8}})')
+
+    def execute(self, sql, parameters=None, transaction_id=None):
+        return self.rds_data_client.execute_statement(
+            sql, parameters or [], self.cluster_arn, self.secret_arn, self.db_name, transaction_id=transaction_id
+        )
+
+    def execute_in_transaction(self, *statements):
+        transaction_id = self.rds_data_client.begin_transaction(self.cluster_arn, self.secret_arn, self.db_name)
+        try:
+            self.execute(LOCK_TIMEOUT_SQL, transaction_id=transaction_id)
+            for sql in statements:
+                self.execute(sql, transaction_id=transaction_id)
+            self.rds_data_client.commit_transaction(transaction_id, self.cluster_arn, self.secret_arn)
+        except Exception:
+            self.rds_data_client.rollback_transaction(transaction_id, self.cluster_arn, self.secret_arn)
+            raise
+
+    def partition_name(self, day: date) -> str:
+        return f"{self.table_name}_p{day.strftime(PARTITION_DATE_FORMAT)}"
+
+    def partition_day(self, partition_name):
+        """Day a partition covers, or None for partitions this manager did not create."""
+        match = self.partition_pattern.fullmatch(partition_name)
+        if not match:
+            return None
+        return date(int(match.group(1)[:4]), int(match.group(1)[4:6]), int(match.group(1)[6:]))
+
+    def list_partitions(self) -> list:
+        response = self.execute(LIST_PARTITIONS_SQL, [{'name': 'table_name', 'value': {'stringValue': self.table_name}}])
+        return [record[0]['stringValue'] for record in response.get('records', [])]
+
+    def default_has_rows(self, bounds) -> bool:
+        response = self.execute(
+            f"SELECT 1 FROM {self.default_partition} WHERE {self.partition_column} >= '{bounds[0]}' "
+            f"AND {self.partition_column} < '{bounds[1]}' LIMIT 1"
+        )
+        return bool(response.get('records'))
+
+    def create_partition(self, name, day: date, has_default: bool):
+        bounds = (day.isoformat(), (day + timedelta(days=1)).isoformat())
+        if not (has_default and self.default_has_rows(bounds)):
+            self.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {self.table_name} "
+                f"FOR VALUES FROM ('{bounds[0]}') TO ('{bounds[1]}')"
+            )
+            return
+        # Move the day's rows out of the default partition, then attach, all or nothing.
+        print(f"Moving rows of {day} from {self.default_partition} to {name}")
+        self.execute_in_transaction(
+            f"CREATE TABLE {name} (LIKE {self.table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+            f"WITH moved AS (DELETE FROM {self.default_partition} WHERE {self.partition_column} >= '{bounds[0]}' "
+            f"AND {self.partition_column} < '{bounds[1]}' RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+            f"ALTER TABLE {self.table_name} ATTACH PARTITION {name} FOR VALUES FROM ('{bounds[0]}') TO ('{bounds[1]}')",
+        )
+
+    def ensure_partitions(self, today: date) -> list:
+        """Create the missing partitions from today to ``premake_days`` ahead. Returns the ones created."""
+        existing = set(self.list_partitions())
+        has_default = self.default_partition in existing
+        created = []
+        for offset in range(self.premake_days + 1):
+            day = today + timedelta(days=offset)
+            name = self.partition_name(day)
+            if name in existing:
+                continue
+            self.create_partition(name, day, has_default)
+            created.append(name)
+        return created
+
+    def drop_expired(self, today: date) -> list:
+        """Drop the partitions wholly older than the retention period. Returns the ones dropped."""
+        cutoff = today - timedelta(days=self.retention_days)
+        expired = [
+            name for name in self.list_partitions()
+            if self.partition_day(name) is not None and self.partition_day(name) < cutoff
+        ]
+        for name in expired:
+            self.execute_in_transaction(f"DROP TABLE IF EXISTS {name}")
+        return expired
+
+    def run(self, today: date) -> dict:
+        # Create before dropping, so a failed drop never leaves tomorrow without a partition.
+        created = self.ensure_partitions(today)
+        dropped = self.drop_expired(today)
+        print(f"Partitions of {self.table_name}: created {created or 'none'}, dropped {dropped or 'none'}")
+        return {'created': created, 'dropped': dropped}
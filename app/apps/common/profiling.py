@@ -0,0 +1,138 @@
+import functools
+import io
+import os
+import random
+import time
+
+from common.constants import ENV_PROFILING_MODE, ENV_PROFILING_SAMPLE_RATE, ENV_PROFILING_OUTPUT_DIR
+
+MODE_CPU = "cpu"
+MODE_MEMORY = "memory"
+DEFAULT_OUTPUT_DIR = "/tmp/profiles"
+# /tmp is shared by every invocation of a container, so keep only the newest profiles.
+DEFAULT_MAX_FILES = 20
+PROFILE_SUFFIXES = ('.prof', '.tracemalloc')
+
+
+class HandlerProfiler:
+    """Runs a sample of handler invocations under cProfile and/or tracemalloc.
+
+    Raw profiles go to ``output_dir`` (load ``.prof`` files with pstats or
+    snakeviz, ``.tracemalloc`` ones with ``tracemalloc.Snapshot.load``) and a
+    short summary of the top functions and allocation sites is logged.
+    """
+
+    def __init__(self, modes, sample_rate=1.0, output_dir=DEFAULT_OUTPUT_DIR, top_n=15,
+                 max_files=DEFAULT_MAX_FILES):
+        unknown = set(modes) - {MODE_CPU, MODE_MEMORY}
+        if unknown:
+            raise ValueError(f"Unknown profiling modes: {sorted(unknown)}")
+        self.modes = set(modes)
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.max_files = max_files
+
+    def wrap(self, handler, name=None):
+        name = name or f"{handler.__module__}.{handler.__name__}"
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if random.random() >= self.sample_rate:
+                return handler(event, context)
+            return self.profile(handler, name, event, context)
+
+        return wrapper
+
+    def profile(self, handler, name, event, context):
+        # Imported here so handlers that never profile do not pay for them at cold start.
+        import cProfile
+        import tracemalloc
+
+        request_id = getattr(context, 'aws_request_id', None) or str(int(time.time() * 1000))
+        path_prefix = os.path.join(self.output_dir, f"{name}-{request_id}")
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        profiler = cProfile.Profile() if MODE_CPU in self.modes else None
+        # Leave tracemalloc alone if something else already started it.
+        owns_tracemalloc = MODE_MEMORY in self.modes and not tracemalloc.is_tracing()
+        if owns_tracemalloc:
+            tracemalloc.start()
+        started_at = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            return handler(event, context)
+        finally:
+            if profiler:
+                profiler.disable()
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            print(f"Profiled {name} ({request_id}) in {elapsed_ms:.1f} ms")
+            if profiler:
+                self.report_cpu(profiler, f"{path_prefix}.prof")
+            if owns_tracemalloc:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.report_memory(snapshot, peak, f"{path_prefix}.tracemalloc")
+            self.prune()
+
+    def report_cpu(self, profiler, path):
+        import pstats
+
+        profiler.dump_stats(path)
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        print(f"Top {self.top_n} functions by cumulative time, full profile in {path}:")
+        # Drop pstats' header and blank lines to keep the log compact.
+        lines = [line for line in output.getvalue().splitlines() if line.strip()]
+        start = next((index for index, line in enumerate(lines) if line.lstrip().startswith('ncalls')), 0)
+        print("\n".join(lines[start:]))
+
+    def report_memory(self, snapshot, peak, path):
+        import tracemalloc
+
+        snapshot.dump(path)
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        print(f"Peak traced memory {peak / 1024:.1f} KiB. Top {self.top_n} allocation sites, full snapshot in {path}:")
+        for statistic in snapshot.statistics('lineno')[:self.top_n]:
+            print(f"  {statistic}")
+
+    def prune(self):
+        """Remove all but the newest profiles. Other files and directories in ``output_dir`` are left alone."""
+        paths = [
+            entry.path for entry in os.scandir(self.output_dir)
+            if entry.is_file() and entry.name.endswith(PROFILE_SUFFIXES)
+        ]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[self.max_files:]:
+            os.remove(path)
+
+
+def create_profiler_from_env():
+    """Profiler configured by PROFILING_MODE (cpu, memory or cpu,memory), or None when profiling is off."""
+    modes = [mode.strip() for mode in os.getenv(ENV_PROFILING_MODE, '').split(',') if mode.strip()]
+    if not modes:
+        return None
+    return HandlerProfiler(
+        modes,
+        sample_rate=float(os.getenv(ENV_PROFILING_SAMPLE_RATE, '0.01')),
+        output_dir=os.getenv(ENV_PROFILING_OUTPUT_DIR, DEFAULT_OUTPUT_DIR),
+    )
+
+
+def profiled(handler):
+    """Handler decorator that profiles a sample of invocations when PROFILING_MODE is set.
+
+    The environment is read once when the module is imported; when
+    profiling is off the handler is returned untouched, so leaving the
+    decorator in place costs nothing.
+    """
+    profiler = create_profiler_from_env()
+    if profiler is None:
+        return handler
+    return profiler.wrap(handler)
@@ -1,21 +1,113 @@
-import boto3
-from botocore.exceptions import ClientError
+import os
+
+from common.aws_clients import create_client
+from common.constants import (
+    ENV_RDS_DATA_MAX_ATTEMPTS,
+    ENV_RDS_DATA_RATE_LIMIT,
+    ENV_RDS_DATA_CIRCUIT_FAILURE_THRESHOLD,
+    ENV_RDS_DATA_CIRCUIT_RESET_SECONDS,
+)
+from common.resilience import CircuitBreaker, ResilientCaller, RetryPolicy, TokenBucket, is_client_error
+
+
+def get_field_value(field: dict):
+    """Unwrap a Data API field such as {'longValue': 1} or {'isNull': True}."""
+    if field.get('isNull'):
+        return None
+    return next(iter(field.values()))
+
+
+def records_to_dicts(records: list, columns: list) -> list:
+    """Turn Data API records into dicts keyed by the selected column names."""
+    return [
+        {column: get_field_value(field) for column, field in zip(columns, record)}
+        for record in records
+    ]
+
+
+def create_default_caller() -> ResilientCaller:
+    """Build the retry / rate limit / circuit breaker setup for the Data API from env vars."""
+    rate_limit = float(os.getenv(ENV_RDS_DATA_RATE_LIMIT, '0'))
+    return ResilientCaller(
+        'rds-data',
+        # Aurora Serverless can take ~30s to resume, so allow a long backoff ceiling.
+        retry_policy=RetryPolicy(
+            max_attempts=int(os.getenv(ENV_RDS_DATA_MAX_ATTEMPTS, '6')),
+            base_delay=0.5,
+            max_delay=15.0,
+        ),
+        rate_limiter=TokenBucket(rate_limit) if rate_limit > 0 else None,
+        circuit_breaker=CircuitBreaker(
+            'rds-data',
+            failure_threshold=int(os.getenv(ENV_RDS_DATA_CIRCUIT_FAILURE_THRESHOLD, '10')),
+            reset_timeout=float(os.getenv(ENV_RDS_DATA_CIRCUIT_RESET_SECONDS, '30')),
+        ),
+    )
 
 
 class RDSDataClient:
-    def __init__(self):
-        self.rds_data_client = boto3.client('rds-data')
+    def __init__(self, caller: ResilientCaller = None):
+        # Retries are handled by the caller, so disable botocore's own retry loop.
+        self.rds_data_client = create_client('rds-data', disable_retries=True)
+        self.caller = caller or create_default_caller()
+
+    def execute_statement(self, sql: str, parameters: list, cluster_arn: str, secret_arn: str, db_name: str,
+                          transaction_id: str = None):
+        kwargs = {'transactionId': transaction_id} if transaction_id else {}
+        try:
+            response = self.caller.call(
+                self.rds_data_client.execute_statement,
+                secretArn=secret_arn,
+                database=db_name,
+                resourceArn=cluster_arn,
+                sql=sql,
+                parameters=parameters,
+                **kwargs
+            )
+            return response
+        except Exception as e:
+            if is_client_error(e):
+                print(f"Error executing SQL statement: {e}")
+            raise
 
-    def execute_statement(self, sql: str, parameters: list, cluster_arn: str, secret_arn: str, db_name: str):
+    def batch_execute_statement(self, sql: str, parameter_sets: list, cluster_arn: str, secret_arn: str, db_name: str):
+        """Run one statement for many parameter sets in a single Data API call."""
         try:
-            response = self.rds_data_client.execute_statement(
+            response = self.caller.call(
+                self.rds_data_client.batch_execute_statement,
                 secretArn=secret_arn,
                 database=db_name,
                 resourceArn=cluster_arn,
                 sql=sql,
-                parameters=parameters
+                parameterSets=parameter_sets
             )
             return response
-        except ClientError as e:
-            print(f"Error executing SQL statement: {e}")
-            raise e
+        except Exception as e:
+            if is_client_error(e):
+                print(f"Error executing SQL batch statement: {e}")
+            raise
+
+    def begin_transaction(self, cluster_arn: str, secret_arn: str, db_name: str) -> str:
+        response = self.caller.call(
+            self.rds_data_client.begin_transaction,
+            secretArn=secret_arn,
+            database=db_name,
+            resourceArn=cluster_arn
+        )
+        return response['transactionId']
+
+    def commit_transaction(self, transaction_id: str, cluster_arn: str, secret_arn: str):
+        return self.caller.call(
+            self.rds_data_client.commit_transaction,
+            secretArn=secret_arn,
+            resourceArn=cluster_arn,
+            transactionId=transaction_id
+        )
+
+    def rollback_transaction(self, transaction_id: str, cluster_arn: str, secret_arn: str):
+        return self.caller.call(
+            self.rds_data_client.rollback_transaction,
+            secretArn=secret_arn,
+            resourceArn=cluster_arn,
+            transactionId=transaction_id
+        )
@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReferenceDataCache:
+    """Per-container, size-bounded read-through cache of reference rows.
+
+    ``load_row(key)`` reads one row by key and returns None when there is
+    none, so only the keys a container actually sees are ever loaded,
+    however large the table grows. Rows are kept for ``ttl_seconds``, misses
+    for ``miss_ttl_seconds`` so an unknown key doesn't query the database on
+    every record, and at most ``max_size`` keys are kept, evicting the least
+    recently used. ``invalidate`` drops one key or everything.
+    """
+
+    def __init__(self, load_row, max_size=10000, ttl_seconds=300, miss_ttl_seconds=5, clock=time.monotonic):
+        self.load_row = load_row
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self.clock = clock
+        # key -> (row, expires_at), least recently used first
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def invalidate(self, key=None):
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def get(self, key):
+        """Return the row for ``key`` or None, hitting the database only when it isn't cached."""
+        now = self.clock()
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None and now < cached[1]:
+                self.entries.move_to_end(key)
+                return cached[0]
+
+        # Load outside the lock so one slow query doesn't hold up other threads' hits.
+        row = self.load_row(key)
+        ttl_seconds = self.ttl_seconds if row is not None else self.miss_ttl_seconds
+        with self.lock:
+            self.entries[key] = (row, now + ttl_seconds)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return row
+
+    def __len__(self):
+        return len(self.entries)
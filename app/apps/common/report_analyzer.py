@@ -0,0 +1,263 @@
+"""Summarise Lambda REPORT lines and embedded metrics from exported CloudWatch logs.
+
+Reads plain or gzipped files line by line, so exports of any size fit in
+constant memory. A line is either raw log text, as in a CloudWatch Logs
+export to S3 or ``aws logs tail``, or a JSON object with a ``message`` field,
+as printed by ``aws logs filter-log-events --output json | jq -c '.events[]'``.
+The function name comes from ``/aws/lambda/<name>`` in the log group or file
+path (or ``--function``) and the version from the ``[$LATEST]``/``[3]``
+part of the log stream name.
+
+For each function and version it prints duration, init duration and memory
+percentiles, the cold start rate and the memory headroom, and recommends
+the cheapest memory size under a simple cost model. Percentiles of the
+metrics in EMF lines (such as the pipeline latency metrics) are printed too.
+
+Example::
+
+    PYTHONPATH=apps python -m common.report_analyzer exportedlogs/**/*.gz --cpu-bound-fraction 0.3
+"""
+import argparse
+import gzip
+import json
+import math
+import re
+from collections import defaultdict
+
+REPORT_PATTERN = re.compile(
+    r'REPORT RequestId: (?P<request_id>\S+)\s+'
+    r'Duration: (?P<duration>[\d.]+) ms\s+'
+    r'Billed Duration: (?P<billed_duration>[\d.]+) ms\s+'
+    r'Memory Size: (?P<memory_size>\d+) MB\s+'
+    r'Max Memory Used: (?P<max_memory_used>\d+) MB'
+    r'(?:\s+Init Duration: (?P<init_duration>[\d.]+) ms)?'
+)
+FUNCTION_PATTERN = re.compile(r'/aws/lambda/([^/\s]+)')
+VERSION_PATTERN = re.compile(r'\[(\$LATEST|\d+)\]')
+
+# us-east-1 x86 on-demand prices.
+PRICE_PER_GB_SECOND = 0.0000166667
+PRICE_PER_REQUEST = 0.0000002
+# Lambda allocates CPU in proportion to memory, reaching one full vCPU at 1769 MB.
+FULL_VCPU_MEMORY_MB = 1769
+MEMORY_SIZES_MB = (128, 256, 384, 512, 640, 768, 1024, 1280, 1536, 1769, 2048, 3008, 4096, 6144, 8192, 10240)
+PERCENTILES = (50, 90, 99)
+
+
+class LogHistogram:
+    """Streaming histogram with log-spaced buckets: percentiles within ``precision`` in constant memory."""
+
+    def __init__(self, precision=0.01):
+        self.log_base = math.log(1 + precision)
+        self.buckets = defaultdict(int)
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.maximum = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        if value <= 0:
+            self.zeros += 1
+        else:
+            self.buckets[math.floor(math.log(value) / self.log_base)] += 1
+
+    def percentile(self, percentile):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        if rank <= self.zeros:
+            return 0.0
+        seen = self.zeros
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Upper bound of the bucket, capped by the largest value seen.
+                return min(math.exp((bucket + 1) * self.log_base), self.maximum)
+        return self.maximum
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class FunctionStats:
+    """REPORT line statistics of one function version at one memory size."""
+
+    def __init__(self, memory_size):
+        self.memory_size = memory_size
+        self.invocations = 0
+        self.cold_starts = 0
+        self.duration = LogHistogram()
+        self.billed_duration = LogHistogram()
+        self.init_duration = LogHistogram()
+        self.max_memory_used = LogHistogram()
+
+    def add_report(self, report):
+        self.invocations += 1
+        self.duration.add(float(report['duration']))
+        self.billed_duration.add(float(report['billed_duration']))
+        self.max_memory_used.add(float(report['max_memory_used']))
+        if report['init_duration']:
+            self.cold_starts += 1
+            self.init_duration.add(float(report['init_duration']))
+
+
+def open_log_file(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', errors='replace')
+    return open(path, errors='replace')
+
+
+def parse_line(line, path, default_function=None):
+    """Return (function, version, message) for a log line."""
+    message, context = line, path
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict) and 'message' in record:
+            message = record['message']
+            context = ' '.join(str(record.get(field, '')) for field in ('logGroup', 'logGroupName', 'logStreamName',
+                                                                        'logStream')) + ' ' + path
+    function_match = FUNCTION_PATTERN.search(context)
+    version_match = VERSION_PATTERN.search(context) or VERSION_PATTERN.search(line)
+    function = default_function or (function_match.group(1) if function_match else 'unknown')
+    return function, version_match.group(1) if version_match else '$LATEST', message
+
+
+def parse_emf(message):
+    """Yield (metric label, value) for every metric in an embedded metric format document."""
+    start = message.find('{"_aws"')
+    if start < 0:
+        start = message.find('{')
+    if start < 0 or '"_aws"' not in message:
+        return
+    try:
+        document = json.loads(message[start:])
+    except ValueError:
+        return
+    for directive in document.get('_aws', {}).get('CloudWatchMetrics', []):
+        dimension_names = [name for dimension_set in directive.get('Dimensions', []) for name in dimension_set]
+        dimensions = ','.join(f"{name}={document.get(name)}" for name in dimension_names)
+        for metric in directive.get('Metrics', []):
+            value = document.get(metric['Name'])
+            values = value if isinstance(value, list) else [value]
+            for single_value in values:
+                if isinstance(single_value, (int, float)):
+                    yield f"{directive.get('Namespace')} {metric['Name']} {dimensions}".rstrip(), single_value
+
+
+def analyze(paths, default_function=None):
+    """Stream every file once.
+
+    Returns ({(function, version, memory size): FunctionStats}, {metric label: LogHistogram}); a memory
+    change without a new version shows up as a separate entry rather than mixing both configurations.
+    """
+    functions = {}
+    metrics = defaultdict(LogHistogram)
+    for path in paths:
+        with open_log_file(path) as log_file:
+            for line in log_file:
+                if 'REPORT RequestId' not in line and '_aws' not in line:
+                    continue  # Cheap pre-filter: most lines are neither.
+                function, version, message = parse_line(line.rstrip('\n'), path, default_function)
+                report = REPORT_PATTERN.search(message)
+                if report:
+                    memory_size = int(report['memory_size'])
+                    key = (function, version, memory_size)
+                    if key not in functions:
+                        functions[key] = FunctionStats(memory_size)
+                    functions[key].add_report(report.groupdict())
+                    continue
+                for label, value in parse_emf(message):
+                    metrics[label].add(value)
+    return functions, metrics
+
+
+def estimate_duration(duration_ms, memory_mb, candidate_mb, cpu_bound_fraction):
+    """Scale the CPU-bound share of a duration by the CPU a memory size gets; the rest is unchanged."""
+    speedup = min(candidate_mb, FULL_VCPU_MEMORY_MB) / min(memory_mb, FULL_VCPU_MEMORY_MB)
+    return duration_ms * (cpu_bound_fraction / speedup + (1 - cpu_bound_fraction))
+
+
+def invocation_cost(duration_ms, memory_mb):
+    return math.ceil(duration_ms) / 1000 * memory_mb / 1024 * PRICE_PER_GB_SECOND + PRICE_PER_REQUEST
+
+
+def recommend_memory(stats, cpu_bound_fraction=0.5, headroom=0.2, max_slowdown=0.1):
+    """Cheapest memory size that fits p99 memory use plus headroom without slowing p99 duration too much.
+
+    Returns (memory_mb, estimated mean cost per invocation, estimated p99 duration).
+    """
+    memory_mb = stats.memory_size
+    mean_duration = stats.duration.mean
+    p99_duration = stats.duration.percentile(99)
+    required_mb = stats.max_memory_used.percentile(99) * (1 + headroom)
+
+    best = None
+    for candidate_mb in sorted(set(MEMORY_SIZES_MB) | {memory_mb}):
+        if candidate_mb < required_mb:
+            continue
+        candidate_p99 = estimate_duration(p99_duration, memory_mb, candidate_mb, cpu_bound_fraction)
+        if candidate_p99 > p99_duration * (1 + max_slowdown):
+            continue
+        cost = invocation_cost(estimate_duration(mean_duration, memory_mb, candidate_mb, cpu_bound_fraction),
+                               candidate_mb)
+        if best is None or cost < best[1]:
+            best = (candidate_mb, cost, candidate_p99)
+    return best
+
+
+def format_ms(value):
+    return '-' if value is None else f"{value:.1f}"
+
+
+def print_report(functions, metrics, cpu_bound_fraction=0.5, headroom=0.2, max_slowdown=0.1):
+    for (function, version, memory_mb), stats in sorted(functions.items()):
+        p99_memory = stats.max_memory_used.percentile(99)
+        print(f"{function} [{version}] {memory_mb} MB: {stats.invocations} invocations, "
+              f"{100 * stats.cold_starts / stats.invocations:.1f}% cold starts")
+        for label, histogram in (('duration', stats.duration), ('billed', stats.billed_duration),
+                                 ('init', stats.init_duration)):
+            percentiles = ' '.join(f"p{p}={format_ms(histogram.percentile(p))}" for p in PERCENTILES)
+            print(f"  {label:<9} ms {percentiles} max={format_ms(histogram.maximum)}")
+        print(f"  memory    MB p99={format_ms(p99_memory)} max={format_ms(stats.max_memory_used.maximum)} "
+              f"headroom={100 * (1 - stats.max_memory_used.maximum / memory_mb):.0f}%")
+
+        recommendation = recommend_memory(stats, cpu_bound_fraction, headroom, max_slowdown)
+        current_cost = invocation_cost(stats.duration.mean, memory_mb)
+        if recommendation is None:
+            print("  recommendation: none, no size fits the memory headroom")
+            continue
+        recommended_mb, cost, p99_duration = recommendation
+        change = 100 * (cost - current_cost) / current_cost
+        print(f"  recommendation: {recommended_mb} MB, est. p99 {p99_duration:.1f} ms, "
+              f"${cost * 1_000_000:.2f} vs ${current_cost * 1_000_000:.2f} per million invocations ({change:+.0f}%)")
+
+    if metrics:
+        print("Embedded metrics:")
+        for label, histogram in sorted(metrics.items()):
+            percentiles = ' '.join(f"p{p}={format_ms(histogram.percentile(p))}" for p in PERCENTILES)
+            print(f"  {label}: n={histogram.count} {percentiles} max={format_ms(histogram.maximum)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='log files, plain or .gz')
+    parser.add_argument('--function', help='function name for files whose path does not contain the log group')
+    parser.add_argument('--cpu-bound-fraction', type=float, default=0.5,
+                        help='share of the duration that scales with CPU (0 = all I/O, 1 = all CPU)')
+    parser.add_argument('--headroom', type=float, default=0.2, help='memory kept free above p99 memory used')
+    parser.add_argument('--max-slowdown', type=float, default=0.1, help='acceptable increase of p99 duration')
+    args = parser.parse_args(argv)
+
+    functions, metrics = analyze(args.paths, args.function)
+    print_report(functions, metrics, args.cpu_bound_fraction, args.headroom, args.max_slowdown)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import random
+import threading
+import time
+
+# botocore.exceptions is imported where errors are classified, not here: it pulls in
+# botocore and urllib3, which a handler would otherwise pay for at every cold start.
+
+# Error codes that are safe to retry for the Data API and SQS.
+RETRYABLE_ERROR_CODES = {
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'RequestThrottled',
+    'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException',
+    'ServiceUnavailableError',
+    'ServiceUnavailable',
+    'InternalFailure',
+    'InternalServerErrorException',
+    'InternalError',
+    'StatementTimeoutException',
+    'DatabaseResumingException',
+    'DatabaseUnavailableException',
+    'AWS.SimpleQueueService.ServiceUnavailable',
+    'AWS.SimpleQueueService.RequestThrottled',
+    'KMS.ThrottlingException',
+}
+
+# Aurora Serverless reports resume and connection issues as a BadRequestException
+# with one of these messages.
+RETRYABLE_ERROR_MESSAGES = (
+    'communications link failure',
+    'is resuming',
+    'database is being resumed',
+    'connection refused',
+    'the last packet sent successfully to the server',
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit '{name}' is open, retry after {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_client_error(error) -> bool:
+    """True for a botocore ClientError, the error of a call the service answered."""
+    from botocore.exceptions import ClientError
+
+    return isinstance(error, ClientError)
+
+
+def is_retryable_error(error) -> bool:
+    """Classify an exception raised by a boto3 call as transient or not."""
+    from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, ReadTimeoutError
+
+    if isinstance(error, (BotocoreConnectionError, ReadTimeoutError)):
+        return True
+    if not isinstance(error, ClientError):
+        return False
+
+    error_info = error.response.get('Error', {})
+    code = error_info.get('Code', '')
+    if code in RETRYABLE_ERROR_CODES:
+        return True
+
+    status_code = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    if status_code in (429, 500, 502, 503, 504):
+        return True
+
+    message = error_info.get('Message', '').lower()
+    return any(fragment in message for fragment in RETRYABLE_ERROR_MESSAGES)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, max_attempts=5, base_delay=0.1, max_delay=20.0, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def compute_delay(self, attempt: int) -> float:
+        """Return the delay before retry number ``attempt`` (starting at 1)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class TokenBucket:
+    """Client-side rate limiter shared by all calls of one client."""
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available; otherwise return the seconds to wait for them."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        """Block until ``tokens`` are available."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            self.sleep(wait)
+
+
+class CircuitBreaker:
+    """Fail fast after repeated transient failures, probing again after a cool-down."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                elapsed = self.clock() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+                # Let a single probe through.
+                self.state = self.HALF_OPEN
+            elif self.state == self.HALF_OPEN:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"Circuit '{self.name}' opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class ResilientCaller:
+    """Run boto3 calls through a rate limiter, a circuit breaker and a retry policy."""
+
+    def __init__(self, name, retry_policy=None, rate_limiter=None, circuit_breaker=None):
+        self.name = name
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 1
+        while True:
+            if self.circuit_breaker:
+                self.circuit_breaker.before_call()
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if self.circuit_breaker:
+                    if retryable:
+                        self.circuit_breaker.record_failure()
+                    else:
+                        # The service answered, so it is up.
+                        self.circuit_breaker.record_success()
+                if not retryable or attempt >= self.retry_policy.max_attempts:
+                    raise
+                delay = self.retry_policy.compute_delay(attempt)
+                print(f"{self.name}: transient error on attempt {attempt}, retrying in {delay:.2f}s: {e}")
+                self.retry_policy.sleep(delay)
+                attempt += 1
+                continue
+
+            if self.circuit_breaker:
+                self.circuit_breaker.record_success()
+            return result
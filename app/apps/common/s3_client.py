@@ -0,0 +1,24 @@
+from common.aws_clients import create_client
+from common.resilience import is_client_error
+
+
+class S3Client:
+    def __init__(self):
+        self.s3_client = create_client('s3')
+
+    def put_object(self, bucket: str, key: str, body: bytes):
+        try:
+            return self.s3_client.put_object(Bucket=bucket, Key=key, Body=body)
+        except Exception as e:
+            if is_client_error(e):
+                print(f"Error writing s3://{bucket}/{key}: {e}")
+            raise
+
+    def get_object(self, bucket: str, key: str) -> bytes:
+        try:
+            response = self.s3_client.get_object(Bucket=bucket, Key=key)
+            return response['Body'].read()
+        except Exception as e:
+            if is_client_error(e):
+                print(f"Error reading s3://{bucket}/{key}: {e}")
+            raise
@@ -1,20 +1,114 @@
-import boto3
-from botocore.exceptions import ClientError
+import os
+
+from common.aws_clients import create_client
+from common.constants import ENV_SQS_MAX_ATTEMPTS, ENV_SQS_RATE_LIMIT
+from common.resilience import ResilientCaller, RetryPolicy, TokenBucket, is_client_error
+
+# Batch APIs and ReceiveMessage take at most 10 messages per call.
+SQS_MAX_BATCH_SIZE = 10
+
+
+def get_queue_url_from_arn(queue_arn):
+    """Build the queue URL from an arn:aws:sqs:<region>:<account>:<name> ARN."""
+    _, _, _, region, account_id, queue_name = queue_arn.split(':')
+    return f"https://sqs.{region}.amazonaws.com/{account_id}/{queue_name}"
+
+
+def to_sqs_message_attributes(attributes: dict) -> dict:
+    """Convert {name: value} into the SQS MessageAttributes shape."""
+    return {name: {'DataType': 'String', 'StringValue': str(value)} for name, value in attributes.items()}
+
+
+def from_received_message_attributes(message_attributes: dict) -> dict:
+    """Strip a received message's attributes down to the shape SendMessage accepts."""
+    converted = {}
+    for name, attribute in (message_attributes or {}).items():
+        value = {'DataType': attribute['DataType']}
+        if 'StringValue' in attribute:
+            value['StringValue'] = attribute['StringValue']
+        if 'BinaryValue' in attribute:
+            value['BinaryValue'] = attribute['BinaryValue']
+        converted[name] = value
+    return converted
+
+
+def create_default_caller() -> ResilientCaller:
+    """Build the retry / rate limit setup for SQS from env vars."""
+    rate_limit = float(os.getenv(ENV_SQS_RATE_LIMIT, '0'))
+    return ResilientCaller(
+        'sqs',
+        retry_policy=RetryPolicy(max_attempts=int(os.getenv(ENV_SQS_MAX_ATTEMPTS, '5'))),
+        rate_limiter=TokenBucket(rate_limit) if rate_limit > 0 else None,
+    )
 
 
 class SQSClient:
-    def __init__(self):
-        self.sqs_client = boto3.client('sqs')
+    def __init__(self, caller: ResilientCaller = None, endpoint_url: str = None):
+        # Retries are handled by the caller, so disable botocore's own retry loop.
+        # ``endpoint_url`` points the client at a local SQS stand-in such as ElasticMQ.
+        self.sqs_client = create_client('sqs', disable_retries=True, endpoint_url=endpoint_url)
+        self.caller = caller or create_default_caller()
+
+    def send_message_to_sqs(self, queue_url, message, message_group_id, message_attributes=None, trace_context=None):
+        """Send a message to an SQS queue. ``message_attributes`` is a {name: string value} dict.
 
-    def send_message_to_sqs(self, queue_url, message, message_group_id):
-        """Send a message to an SQS queue."""
+        A ``trace_context`` (see common.tracing) is forwarded as message attributes.
+        """
+        if trace_context:
+            message_attributes = {**(message_attributes or {}), **trace_context.to_attributes()}
+        kwargs = {}
+        if message_attributes:
+            kwargs['MessageAttributes'] = to_sqs_message_attributes(message_attributes)
         try:
-            response = self.sqs_client.send_message(
+            response = self.caller.call(
+                self.sqs_client.send_message,
                 QueueUrl=queue_url,
                 MessageBody=message,
-                MessageGroupId=message_group_id  # Required for FIFO queues
+                MessageGroupId=message_group_id,  # Required for FIFO queues
+                **kwargs
             )
             print(f"Message sent to SQS: {response['MessageId']}")
-        except ClientError as e:
-            print(f"Error sending message to SQS: {e}")
-            raise e
+        except Exception as e:
+            if is_client_error(e):
+                print(f"Error sending message to SQS: {e}")
+            raise
+
+    def list_queue_tags(self, queue_url) -> dict:
+        """Return the tags of an SQS queue."""
+        response = self.caller.call(self.sqs_client.list_queue_tags, QueueUrl=queue_url)
+        return response.get('Tags', {})
+
+    def get_queue_attributes(self, queue_url, attribute_names) -> dict:
+        """Return the requested attributes of an SQS queue."""
+        response = self.caller.call(
+            self.sqs_client.get_queue_attributes,
+            QueueUrl=queue_url,
+            AttributeNames=attribute_names
+        )
+        return response.get('Attributes', {})
+
+    def receive_messages(self, queue_url, max_number=10, wait_time_seconds=20, visibility_timeout=None) -> list:
+        """Long-poll up to ``max_number`` messages, with their attributes and FIFO system attributes."""
+        kwargs = {'VisibilityTimeout': visibility_timeout} if visibility_timeout is not None else {}
+        response = self.caller.call(
+            self.sqs_client.receive_message,
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=max_number,
+            WaitTimeSeconds=wait_time_seconds,
+            AttributeNames=['All'],
+            MessageAttributeNames=['All'],
+            **kwargs
+        )
+        return response.get('Messages', [])
+
+    def send_message_batch(self, queue_url, entries) -> dict:
+        """Send up to 10 entries. Returns the response with its Successful and Failed lists."""
+        return self.caller.call(self.sqs_client.send_message_batch, QueueUrl=queue_url, Entries=entries)
+
+    def delete_message_batch(self, queue_url, entries) -> dict:
+        """Delete up to 10 {Id, ReceiptHandle} entries. Returns the response with its Successful and Failed lists."""
+        return self.caller.call(self.sqs_client.delete_message_batch, QueueUrl=queue_url, Entries=entries)
+
+    def change_message_visibility_batch(self, queue_url, entries) -> dict:
+        """Change the visibility of up to 10 {Id, ReceiptHandle, VisibilityTimeout} entries."""
+        return self.caller.call(self.sqs_client.change_message_visibility_batch, QueueUrl=queue_url, Entries=entries)
@@ -0,0 +1,226 @@
+"""Run a Lambda SQS handler outside Lambda, for backfills and load tests.
+
+A pool of workers long-polls the queue 10 messages at a time, turns each
+receive into the event a Lambda event source mapping would deliver and
+calls the handler with it. Messages the handler reports in
+``batchItemFailures`` (or the whole batch, if it raises) are left on the
+queue to be retried after the visibility timeout, exactly like Lambda does;
+the rest are deleted in one DeleteMessageBatch. While a batch is being
+handled its visibility timeout is extended periodically, so slow records
+are not handed to another worker.
+
+The handler module is imported as-is, so export the environment variables
+the function has in Lambda first. Example::
+
+    PYTHONPATH=apps DB_CLUSTER_ARN=... DB_SECRET_ARN=... DB_NAME=postgres \\
+        python -m common.sqs_poller --handler random_system.class_mapper_lambda.lambda_handler \\
+        --queue-url https://sqs.us-east-1.amazonaws.com/123456789012/transform.fifo --workers 16 --drain
+
+Pass ``--endpoint-url http://localhost:9324`` to consume from ElasticMQ or
+another local SQS stand-in.
+"""
+import argparse
+import importlib
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from common.sqs_client import SQS_MAX_BATCH_SIZE, SQSClient
+
+
+def to_lambda_message_attribute(attribute: dict) -> dict:
+    return {
+        'stringValue': attribute.get('StringValue'),
+        'binaryValue': attribute.get('BinaryValue'),
+        'stringListValues': [],
+        'binaryListValues': [],
+        'dataType': attribute['DataType'],
+    }
+
+
+def to_lambda_record(message: dict, queue_arn: str) -> dict:
+    """Shape a ReceiveMessage message like the SQS records Lambda delivers."""
+    return {
+        'messageId': message['MessageId'],
+        'receiptHandle': message['ReceiptHandle'],
+        'body': message['Body'],
+        'attributes': message.get('Attributes', {}),
+        'messageAttributes': {
+            name: to_lambda_message_attribute(attribute)
+            for name, attribute in message.get('MessageAttributes', {}).items()
+        },
+        'md5OfBody': message.get('MD5OfBody'),
+        'eventSource': 'aws:sqs',
+        'eventSourceARN': queue_arn,
+        'awsRegion': queue_arn.split(':')[3],
+    }
+
+
+def get_failed_message_ids(response, message_ids) -> set:
+    """Read a partial batch response the way Lambda does.
+
+    An identifier that is missing or not in the batch fails the whole batch.
+    """
+    if not isinstance(response, dict) or 'batchItemFailures' not in response:
+        return set()
+    failed_ids = set()
+    for failure in response['batchItemFailures'] or []:
+        item_identifier = failure.get('itemIdentifier')
+        if item_identifier not in message_ids:
+            return set(message_ids)
+        failed_ids.add(item_identifier)
+    return failed_ids
+
+
+def load_handler(dotted_path):
+    """Import ``package.module.function``."""
+    module_name, _, function_name = dotted_path.rpartition('.')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+class VisibilityHeartbeat:
+    """Keeps a batch invisible while it is being handled."""
+
+    def __init__(self, sqs_client, queue_url, messages, visibility_timeout, interval=None):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.entries = [
+            {'Id': str(index), 'ReceiptHandle': message['ReceiptHandle'], 'VisibilityTimeout': visibility_timeout}
+            for index, message in enumerate(messages)
+        ]
+        # Extend well before the timeout runs out.
+        self.interval = interval if interval is not None else visibility_timeout / 2
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.sqs_client.change_message_visibility_batch(self.queue_url, self.entries)
+            except Exception as e:
+                print(f"Failed to extend visibility timeout: {e}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+class SQSPoller:
+    def __init__(self, sqs_client, queue_url, handler, workers=4, visibility_timeout=60, wait_time_seconds=20,
+                 empty_receives=None, max_messages=None, progress_interval=10.0, queue_arn=None):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.handler = handler
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.wait_time_seconds = wait_time_seconds
+        # None polls until stopped; a number stops a worker after that many consecutive empty receives.
+        self.empty_receives = empty_receives
+        self.max_messages = max_messages
+        self.progress_interval = progress_interval
+        self.queue_arn = queue_arn
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def count(self, **increments):
+        with self.lock:
+            self.stats.update(increments)
+            if self.max_messages and self.stats['received'] >= self.max_messages:
+                self.stopped.set()
+
+    def handle_batch(self, messages):
+        event = {'Records': [to_lambda_record(message, self.queue_arn) for message in messages]}
+        message_ids = [message['MessageId'] for message in messages]
+
+        with VisibilityHeartbeat(self.sqs_client, self.queue_url, messages, self.visibility_timeout):
+            try:
+                failed_ids = get_failed_message_ids(self.handler(event, None), message_ids)
+            except Exception as e:
+                print(f"Handler failed for the whole batch: {e}")
+                failed_ids = set(message_ids)
+
+        to_delete = [
+            {'Id': str(index), 'ReceiptHandle': message['ReceiptHandle']}
+            for index, message in enumerate(messages) if message['MessageId'] not in failed_ids
+        ]
+        if to_delete:
+            response = self.sqs_client.delete_message_batch(self.queue_url, to_delete)
+            if response.get('Failed'):
+                print(f"Failed to delete {len(response['Failed'])} messages: {response['Failed']}")
+
+        self.count(received=len(messages), succeeded=len(to_delete), failed=len(failed_ids))
+
+    def worker(self):
+        empty_receives = 0
+        while not self.stopped.is_set():
+            messages = self.sqs_client.receive_messages(
+                self.queue_url,
+                max_number=SQS_MAX_BATCH_SIZE,
+                wait_time_seconds=self.wait_time_seconds,
+                visibility_timeout=self.visibility_timeout,
+            )
+            if not messages:
+                empty_receives += 1
+                if self.empty_receives is not None and empty_receives >= self.empty_receives:
+                    return
+                continue
+            empty_receives = 0
+            self.handle_batch(messages)
+
+    def run(self) -> Counter:
+        """Consume until stopped, drained or ``max_messages`` were received. Returns the counters."""
+        if self.queue_arn is None:
+            self.queue_arn = self.sqs_client.get_queue_attributes(self.queue_url, ['QueueArn'])['QueueArn']
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.worker) for _ in range(self.workers)}
+            try:
+                while futures:
+                    done, futures = wait(futures, timeout=self.progress_interval)
+                    for future in done:
+                        future.result()
+                    if futures:
+                        print(f"Progress: {dict(self.stats)}")
+            finally:
+                # Ctrl-C or a failing worker stops the others after their current batch.
+                self.stopped.set()
+
+        elapsed = time.monotonic() - started_at
+        rate = self.stats['received'] / elapsed if elapsed else 0
+        print(f"Finished in {elapsed:.1f}s ({rate:.0f} messages/s): {dict(self.stats)}")
+        return self.stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queue-url', required=True)
+    parser.add_argument('--handler', required=True, help='dotted path of the handler, e.g. '
+                                                         'random_system.class_mapper_lambda.lambda_handler')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--visibility-timeout', type=int, default=60)
+    parser.add_argument('--max-messages', type=int, help='stop after receiving about this many messages')
+    parser.add_argument('--drain', action='store_true', help='stop once the queue is empty')
+    parser.add_argument('--endpoint-url', help='SQS endpoint, for a local stand-in')
+    args = parser.parse_args(argv)
+
+    poller = SQSPoller(
+        SQSClient(endpoint_url=args.endpoint_url),
+        args.queue_url,
+        load_handler(args.handler),
+        workers=args.workers,
+        visibility_timeout=args.visibility_timeout,
+        empty_receives=2 if args.drain else None,
+        max_messages=args.max_messages,
+    )
+    poller.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+from unittest.mock import MagicMock
+
+from common.aws_clients import LazyClient, lazy
+
+
+def test_lazy_client_builds_once_on_first_use():
+    factory = MagicMock()
+    factory.return_value.list_queues.return_value = {'QueueUrls': []}
+    client = LazyClient(factory)
+
+    factory.assert_not_called()
+    assert client.list_queues() == {'QueueUrls': []}
+    assert client.list_queues() == {'QueueUrls': []}
+    factory.assert_called_once_with()
+
+
+def test_lazy_mode_is_toggled_by_env(monkeypatch):
+    factory = MagicMock()
+
+    monkeypatch.setenv('LAZY_IMPORTS', 'true')
+    assert isinstance(lazy(factory), LazyClient)
+    factory.assert_not_called()
+
+    monkeypatch.setenv('LAZY_IMPORTS', 'false')
+    assert lazy(factory) is factory.return_value
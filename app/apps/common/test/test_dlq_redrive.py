@@ -0,0 +1,139 @@
+import threading
+
+from common.dlq_redrive import DlqRedrive, build_predicate
+from common.resilience import RetryPolicy, TokenBucket
+
+DLQ_URL = 'https://sqs.us-east-1.amazonaws.com/123456789012/orders-dlq.fifo'
+SOURCE_URL = 'https://sqs.us-east-1.amazonaws.com/123456789012/orders.fifo'
+
+
+class InMemorySQSClient:
+    """Two-queue stand-in: receives hand out DLQ messages once, sends append to the source queue."""
+
+    def __init__(self, messages, fail_ids=(), transient_failures=0):
+        self.dlq = list(messages)
+        self.in_flight = {}
+        self.sent = []
+        self.fail_ids = set(fail_ids)
+        self.transient_failures = transient_failures
+        self.lock = threading.Lock()
+
+    def receive_messages(self, queue_url, max_number=10, wait_time_seconds=20, visibility_timeout=None):
+        with self.lock:
+            batch, self.dlq = self.dlq[:max_number], self.dlq[max_number:]
+            for message in batch:
+                self.in_flight[message['ReceiptHandle']] = message
+            return batch
+
+    def send_message_batch(self, queue_url, entries):
+        with self.lock:
+            successful, failed = [], []
+            if self.transient_failures:
+                self.transient_failures -= 1
+                return {'Failed': [{'Id': entry['Id'], 'SenderFault': False, 'Code': 'InternalError'}
+                                   for entry in entries]}
+            for entry in entries:
+                if entry['MessageDeduplicationId'] in self.fail_ids:
+                    failed.append({'Id': entry['Id'], 'SenderFault': True, 'Code': 'InvalidParameterValue'})
+                else:
+                    self.sent.append(entry)
+                    successful.append({'Id': entry['Id']})
+            return {'Successful': successful, 'Failed': failed}
+
+    def delete_message_batch(self, queue_url, entries):
+        with self.lock:
+            for entry in entries:
+                del self.in_flight[entry['ReceiptHandle']]
+            return {'Successful': [{'Id': entry['Id']} for entry in entries]}
+
+    def change_message_visibility_batch(self, queue_url, entries):
+        with self.lock:
+            for entry in entries:
+                assert entry['VisibilityTimeout'] == 0
+                self.dlq.append(self.in_flight.pop(entry['ReceiptHandle']))
+            return {'Successful': [{'Id': entry['Id']} for entry in entries]}
+
+
+def make_messages(count):
+    return [
+        {
+            'MessageId': f'id-{index}',
+            'ReceiptHandle': f'handle-{index}',
+            'Body': f'{{"order": {index}}}',
+            'Attributes': {'MessageGroupId': f'group-{index % 3}'},
+            'MessageAttributes': {'SchemaVersion': {'DataType': 'String', 'StringValue': '1', 'StringListValues': []}},
+        }
+        for index in range(count)
+    ]
+
+
+def make_redrive(sqs_client, **kwargs):
+    return DlqRedrive(sqs_client, DLQ_URL, SOURCE_URL, workers=1, wait_time_seconds=0, empty_receives=1, **kwargs)
+
+
+def test_redrive_keeps_group_order_and_deduplication_ids():
+    sqs_client = InMemorySQSClient(make_messages(25))
+
+    stats = make_redrive(sqs_client).run()
+
+    assert stats['redriven'] == 25
+    assert not sqs_client.in_flight
+    group_0 = [entry['MessageDeduplicationId'] for entry in sqs_client.sent if entry['MessageGroupId'] == 'group-0']
+    assert group_0 == [f'id-{index}' for index in range(0, 25, 3)]
+    assert sqs_client.sent[0]['MessageAttributes'] == {'SchemaVersion': {'DataType': 'String', 'StringValue': '1'}}
+
+
+def test_failed_sends_and_filtered_messages_stay_in_the_dlq():
+    sqs_client = InMemorySQSClient(make_messages(6), fail_ids={'id-3'})
+
+    stats = make_redrive(sqs_client, predicate=build_predicate(group_ids=['group-0'])).run()
+
+    assert stats['redriven'] == 1
+    assert stats['failed'] == 1
+    assert stats['skipped'] == 4
+    # Filtered messages are visible again at once; the failed send waits out its visibility timeout.
+    assert sorted(sqs_client.in_flight) == ['handle-3']
+    assert sorted(message['MessageId'] for message in sqs_client.dlq) == ['id-1', 'id-2', 'id-4', 'id-5']
+
+
+def test_failed_send_holds_back_the_rest_of_its_group():
+    sqs_client = InMemorySQSClient(make_messages(9), fail_ids={'id-3'})
+
+    stats = make_redrive(sqs_client).run()
+
+    assert stats['redriven'] == 7
+    assert stats['failed'] == 2
+    # id-6 comes after the failed id-3 in group-0: it is neither sent nor deleted.
+    assert [entry['MessageDeduplicationId'] for entry in sqs_client.sent if entry['MessageGroupId'] == 'group-0'] \
+        == ['id-0']
+    assert sorted(sqs_client.in_flight) == ['handle-3', 'handle-6']
+
+
+def test_dry_run_moves_nothing():
+    sqs_client = InMemorySQSClient(make_messages(5))
+
+    stats = make_redrive(sqs_client, dry_run=True).run()
+
+    assert stats['selected'] == 5
+    assert sqs_client.sent == []
+    assert not sqs_client.in_flight
+    assert len(sqs_client.dlq) == 5
+
+
+def test_rate_limit_below_the_batch_size_and_send_backoff():
+    now = [0.0]
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        now[0] += seconds
+
+    sqs_client = InMemorySQSClient(make_messages(10), transient_failures=1)
+    rate_limiter = TokenBucket(5, capacity=5, clock=lambda: now[0], sleep=sleep)
+    retry_policy = RetryPolicy(max_attempts=3, base_delay=0.5, sleep=sleep)
+
+    stats = make_redrive(sqs_client, rate_limiter=rate_limiter, retry_policy=retry_policy).run()
+
+    assert stats['redriven'] == 10
+    assert now[0] >= 1.0
+    assert len(delays) >= 2
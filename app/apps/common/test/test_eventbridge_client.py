@@ -0,0 +1,119 @@
+import os
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import time
+
+import pytest
+
+from common.eventbridge_client import EventBridgeClient, PUT_EVENTS_MAX_BYTES, get_entry_size
+from common.resilience import ResilientCaller, RetryPolicy
+
+
+class FakeEvents:
+    def __init__(self, reject_once=(), error_code='ThrottlingException', raise_on_call=None):
+        self.calls = []
+        self.reject_once = set(reject_once)
+        self.error_code = error_code
+        self.raise_on_call = raise_on_call
+
+    def put_events(self, Entries):
+        self.calls.append(list(Entries))
+        if len(self.calls) == self.raise_on_call:
+            raise RuntimeError('connection reset')
+        results = []
+        for entry in Entries:
+            if entry['Detail'] in self.reject_once:
+                self.reject_once.remove(entry['Detail'])
+                results.append({'ErrorCode': self.error_code, 'ErrorMessage': 'Rejected'})
+            else:
+                results.append({'EventId': 'event-id'})
+        failed_count = sum(1 for result in results if 'ErrorCode' in result)
+        return {'FailedEntryCount': failed_count, 'Entries': results}
+
+
+def make_client(fake_events, **kwargs):
+    caller = ResilientCaller('events', retry_policy=RetryPolicy(max_attempts=3, sleep=lambda _: None))
+    client = EventBridgeClient('history-bus', source='random-system.test', caller=caller, **kwargs)
+    client.events_client = fake_events
+    return client
+
+
+def test_events_are_batched_by_count_and_size():
+    fake_events = FakeEvents()
+    with make_client(fake_events) as client:
+        for index in range(23):
+            client.put_event('UserCreated', {'id': index})
+
+    assert [len(call) for call in fake_events.calls] == [10, 10, 3]
+    assert fake_events.calls[0][0]['EventBusName'] == 'history-bus'
+
+    fake_events = FakeEvents()
+    large_detail = 'x' * (PUT_EVENTS_MAX_BYTES // 3)
+    with make_client(fake_events) as client:
+        for _ in range(4):
+            client.put_event('UserCreated', large_detail)
+
+    assert [len(call) for call in fake_events.calls] == [2, 2]
+    assert all(sum(get_entry_size(entry) for entry in call) <= PUT_EVENTS_MAX_BYTES for call in fake_events.calls)
+
+
+def test_only_failed_entries_are_retried():
+    fake_events = FakeEvents(reject_once={'{"id":1}'})
+    with make_client(fake_events) as client:
+        for index in range(3):
+            client.put_event('UserCreated', {'id': index})
+
+    assert [len(call) for call in fake_events.calls] == [3, 1]
+    assert fake_events.calls[1][0]['Detail'] == '{"id":1}'
+    assert client.failed_entries == []
+
+
+def test_non_retryable_rejections_are_not_retried():
+    fake_events = FakeEvents(reject_once={'{"id":1}'}, error_code='MalformedDetail')
+    with make_client(fake_events) as client:
+        for index in range(3):
+            client.put_event('UserCreated', {'id': index})
+
+    assert [len(call) for call in fake_events.calls] == [3]
+    assert [entry['Detail'] for entry in client.failed_entries] == ['{"id":1}']
+
+
+def test_an_error_during_a_retry_keeps_only_the_unpublished_entries():
+    fake_events = FakeEvents(reject_once={'{"id":1}'}, raise_on_call=2)
+    client = make_client(fake_events)
+    for index in range(3):
+        client.put_event('UserCreated', {'id': index})
+
+    with pytest.raises(RuntimeError):
+        client.flush()
+
+    assert [entry['Detail'] for entry in client.failed_entries] == ['{"id":1}']
+
+
+def test_an_event_without_a_source_is_rejected():
+    client = make_client(FakeEvents())
+    client.source = None
+
+    with pytest.raises(ValueError):
+        client.put_event('UserCreated', {'id': 1})
+
+
+def test_background_flush_publishes_without_an_explicit_flush():
+    fake_events = FakeEvents()
+    client = make_client(fake_events, flush_interval=0.01)
+    client.put_event('UserCreated', {'id': 1})
+
+    deadline = time.monotonic() + 2
+    while not fake_events.calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    client.close()
+
+    assert len(fake_events.calls) == 1
+
+
+def test_priority_is_set_on_the_detail():
+    fake_events = FakeEvents()
+    with make_client(fake_events) as client:
+        client.put_event('UserCreated', {'id': 1}, priority='low')
+
+    assert fake_events.calls[0][0]['Detail'] == '{"id":1,"priority":"low"}'
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from common.import_profiler import (
+    LAZY_HANDLER_BUDGETS_MS,
+    check,
+    find_forbidden_imports,
+    get_total_us,
+    main,
+    parse_importtime,
+    summarize,
+)
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     botocore.exceptions
+import time:       300 |        420 |   common.resilience
+import time:      2000 |       2000 |   boto3
+import time:        80 |       2500 | common.sqs_client
+"""
+
+
+def test_parse_importtime_keeps_depth_and_times():
+    entries = parse_importtime(IMPORTTIME_OUTPUT)
+
+    assert [(entry.name, entry.depth) for entry in entries] == [
+        ('botocore.exceptions', 2), ('common.resilience', 1), ('boto3', 1), ('common.sqs_client', 0),
+    ]
+    assert get_total_us(entries, 'common.sqs_client') == 2500
+    assert summarize(entries, top_n=1)[0].name == 'boto3'
+
+
+def test_check_fails_only_when_a_module_is_over_budget():
+    assert check({'common.constants': 10_000}, runs=1)
+    assert not check({'common.constants': 0}, runs=1)
+
+
+@pytest.mark.parametrize('module', list(LAZY_HANDLER_BUDGETS_MS))
+def test_handlers_import_no_aws_sdk_in_lazy_mode(module):
+    assert find_forbidden_imports(module) == []
+
+
+# Wall-clock budgets vary with the host, so they only gate the dedicated CI job that sets this.
+@pytest.mark.skipif(os.getenv('CHECK_IMPORT_BUDGETS', 'false').lower() != 'true',
+                    reason="set CHECK_IMPORT_BUDGETS=true to check the import time budgets")
+@pytest.mark.parametrize('mode_args', [[], ['--lazy']])
+def test_handlers_import_within_their_budgets(mode_args):
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--runs', '3', '--top', '0', *mode_args])
+
+    assert exit_info.value.code == 0
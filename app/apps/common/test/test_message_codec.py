@@ -0,0 +1,40 @@
+import pytest
+
+from common import message_codec
+from common.message_codec import (
+    CONTENT_TYPE_ATTRIBUTE,
+    CONTENT_TYPE_JSON,
+    SCHEMA_VERSION_ATTRIBUTE,
+    MessageCodec,
+)
+
+PAYLOAD = {"userId": 1, "userName": "Alice", "userEmail": "alice@example.com"}
+
+
+def test_json_round_trip():
+    body, attributes = MessageCodec('json').encode(PAYLOAD)
+
+    assert attributes == {CONTENT_TYPE_ATTRIBUTE: CONTENT_TYPE_JSON, SCHEMA_VERSION_ATTRIBUTE: '1'}
+    assert MessageCodec.decode(body, attributes) == (PAYLOAD, 1)
+
+
+def test_messages_without_attributes_are_legacy_json():
+    assert MessageCodec.decode('{"userId": 1}') == ({"userId": 1}, 1)
+
+
+def test_schema_version_is_carried():
+    body, attributes = MessageCodec('json', schema_version=2).encode(PAYLOAD)
+    assert MessageCodec.decode(body, attributes)[1] == 2
+
+
+@pytest.mark.skipif(message_codec.msgpack is None, reason="msgpack is not installed")
+def test_msgpack_round_trip():
+    body, attributes = MessageCodec('msgpack').encode(PAYLOAD)
+    assert MessageCodec.decode(body, attributes) == (PAYLOAD, 1)
+
+
+def test_unknown_codecs_are_rejected():
+    with pytest.raises(ValueError):
+        MessageCodec('xml')
+    with pytest.raises(ValueError):
+        MessageCodec.decode('<a/>', {CONTENT_TYPE_ATTRIBUTE: 'application/xml'})
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from common.message_envelope import (
+    CONTENT_ENCODING_ATTRIBUTE,
+    ENCODING_CLAIM_CHECK,
+    ENCODING_ZLIB,
+    LocalObjectStore,
+    MessageEnvelope,
+)
+
+
+def to_record(body, attributes):
+    return {
+        'body': body,
+        'messageAttributes': {
+            name: {'stringValue': value, 'dataType': 'String'} for name, value in attributes.items()
+        },
+    }
+
+
+def test_small_messages_are_sent_as_is():
+    envelope = MessageEnvelope()
+    body, attributes = envelope.wrap('{"userId": 1}')
+
+    assert body == '{"userId": 1}'
+    assert attributes == {}
+    assert envelope.unwrap_record({'body': body}) == '{"userId": 1}'
+
+
+def test_compressible_messages_are_compressed():
+    envelope = MessageEnvelope()
+    message = json.dumps([{"userName": "name", "userEmail": "name@example.com"}] * 200)
+
+    body, attributes = envelope.wrap(message)
+
+    assert attributes[CONTENT_ENCODING_ATTRIBUTE] == ENCODING_ZLIB
+    assert len(body) < len(message)
+    assert envelope.unwrap_record(to_record(body, attributes)) == message
+
+
+def test_oversized_messages_are_offloaded(tmp_path):
+    envelope = MessageEnvelope(LocalObjectStore(str(tmp_path)), offload_threshold=100)
+    message = json.dumps([{"userName": "name", "userEmail": "name@example.com"}] * 200)
+
+    body, attributes = envelope.wrap(message)
+
+    assert attributes[CONTENT_ENCODING_ATTRIBUTE] == ENCODING_CLAIM_CHECK
+    assert json.loads(body)['key'].startswith('payloads/')
+    assert envelope.wrap(message)[0] == body
+    assert envelope.unwrap_record(to_record(body, attributes)) == message
+
+
+def test_oversized_messages_without_store_fail_early():
+    envelope = MessageEnvelope(offload_threshold=10)
+
+    with pytest.raises(ValueError):
+        envelope.wrap('x' * 11)
+
+
+def test_offload_threshold_counts_utf8_bytes(tmp_path):
+    envelope = MessageEnvelope(LocalObjectStore(str(tmp_path)), compress_threshold=10 ** 6, offload_threshold=100)
+    # 60 characters, 180 bytes
+    message = '"' + '日本語' * 19 + '"'
+
+    body, attributes = envelope.wrap(message)
+
+    assert len(message) <= 100 < len(message.encode('utf-8'))
+    assert attributes[CONTENT_ENCODING_ATTRIBUTE] == ENCODING_CLAIM_CHECK
+    assert envelope.unwrap_record(to_record(body, attributes)) == message
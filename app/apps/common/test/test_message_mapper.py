@@ -0,0 +1,48 @@
+import datetime
+
+import pytest
+
+from common.message_mapper import FieldMapping, MappingRegistry, compile_mapping, MappingSpec
+
+
+def test_compiled_mapper_coerces_and_applies_defaults():
+    registry = MappingRegistry()
+    registry.register('user', [
+        FieldMapping('id', 'userId', 'int'),
+        FieldMapping('name', 'userName', default='anonymous'),
+        FieldMapping('active', 'active', 'bool', default=False),
+        ('createdAt', 'created_at', 'datetime', None),
+    ])
+
+    assert registry.map('user', {'userId': '7', 'active': 'true', 'created_at': '2024-01-01 00:00:00'}) == {
+        'id': 7,
+        'name': 'anonymous',
+        'active': True,
+        'createdAt': datetime.datetime(2024, 1, 1),
+    }
+    assert registry.map('user', {'userId': 8, 'userName': 'Bob'})['name'] == 'Bob'
+    with pytest.raises(KeyError):
+        registry.map('user', {'userName': 'Bob'})
+
+
+def test_sequence_rows_map_by_column_index():
+    mapper = compile_mapping(MappingSpec('row', (
+        FieldMapping('userId', 0, 'int'),
+        FieldMapping('userEmail', 2),
+        FieldMapping('createdAt', 3, default=None),
+    )))
+
+    assert mapper([1, 'Alice', 'alice@example.com']) == {'userId': 1, 'userEmail': 'alice@example.com',
+                                                         'createdAt': None}
+    assert "def map_row(record):" in mapper.source
+
+
+def test_specs_compile_once_and_unknown_types_fail():
+    registry = MappingRegistry()
+    registry.register('user', [FieldMapping('id', 'userId')])
+
+    assert registry.get_mapper('user') is registry.get_mapper('user')
+    with pytest.raises(ValueError):
+        registry.map('order', {})
+    with pytest.raises(ValueError):
+        compile_mapping(MappingSpec('bad', (FieldMapping('id', 'userId', 'uuid'),)))
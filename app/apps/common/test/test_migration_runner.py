@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from common.migration_runner import Migration, MigrationRunner, SELECT_VERSIONS_SQL
+
+MIGRATIONS = [
+    Migration(2, "add index", ("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx ON t (c)",),
+              transactional=False, concurrent_indexes=("idx",)),
+    Migration(1, "create table", ("CREATE TABLE IF NOT EXISTS t (c INT)",)),
+]
+
+
+def make_client(applied_versions):
+    rds_data_client = MagicMock()
+    rds_data_client.begin_transaction.return_value = 'tx-1'
+
+    def execute_statement(sql, parameters, *args, **kwargs):
+        if sql == SELECT_VERSIONS_SQL:
+            return {'records': [[{'longValue': version}] for version in applied_versions]}
+        return {'records': []}
+
+    rds_data_client.execute_statement.side_effect = execute_statement
+    return rds_data_client
+
+
+def executed_sql(rds_data_client):
+    return [call[0][0] for call in rds_data_client.execute_statement.call_args_list]
+
+
+def test_run_applies_pending_migrations_in_order():
+    rds_data_client = make_client(applied_versions=[])
+    runner = MigrationRunner(rds_data_client, 'cluster-arn', 'secret-arn', 'db', MIGRATIONS)
+
+    assert runner.run() == [1, 2]
+
+    statements = executed_sql(rds_data_client)
+    assert statements.index("CREATE TABLE IF NOT EXISTS t (c INT)") < statements.index(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx ON t (c)")
+    rds_data_client.commit_transaction.assert_called_once_with('tx-1', 'cluster-arn', 'secret-arn')
+
+
+def test_run_skips_applied_migrations():
+    rds_data_client = make_client(applied_versions=[1, 2])
+    runner = MigrationRunner(rds_data_client, 'cluster-arn', 'secret-arn', 'db', MIGRATIONS)
+
+    assert runner.run() == []
+    rds_data_client.begin_transaction.assert_not_called()
+
+
+def test_failed_transactional_migration_is_rolled_back():
+    rds_data_client = make_client(applied_versions=[])
+    rds_data_client.execute_statement.side_effect = [
+        {}, {'records': []}, {}, RuntimeError('syntax error'),
+    ]
+    runner = MigrationRunner(rds_data_client, 'cluster-arn', 'secret-arn', 'db', MIGRATIONS)
+
+    with pytest.raises(RuntimeError):
+        runner.run()
+    rds_data_client.rollback_transaction.assert_called_once()
+    rds_data_client.commit_transaction.assert_not_called()
+
+
+def test_duplicate_versions_are_rejected():
+    with pytest.raises(ValueError):
+        MigrationRunner(MagicMock(), 'cluster-arn', 'secret-arn', 'db', MIGRATIONS + [MIGRATIONS[0]])
@@ -0,0 +1,78 @@
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+
+from common.partition_manager import DailyPartitionManager, LIST_PARTITIONS_SQL
+
+
+def make_client(partitions, default_rows_on=()):
+    rds_data_client = MagicMock()
+    rds_data_client.begin_transaction.return_value = 'tx-1'
+
+    def execute_statement(sql, parameters, *args, **kwargs):
+        if sql == LIST_PARTITIONS_SQL:
+            return {'records': [[{'stringValue': name}] for name in partitions]}
+        if sql.startswith('SELECT 1 FROM user_history_default') and any(day in sql for day in default_rows_on):
+            return {'records': [[{'longValue': 1}]]}
+        return {'records': []}
+
+    rds_data_client.execute_statement.side_effect = execute_statement
+    return rds_data_client
+
+
+def executed_sql(rds_data_client):
+    return [call[0][0] for call in rds_data_client.execute_statement.call_args_list if call[0][0] != LIST_PARTITIONS_SQL]
+
+
+def make_manager(rds_data_client):
+    return DailyPartitionManager(rds_data_client, 'cluster-arn', 'secret-arn', 'db', 'user_history',
+                                 premake_days=2, retention_days=30)
+
+
+def test_ensure_partitions_creates_only_missing_days():
+    rds_data_client = make_client(['user_history_p20240301'])
+
+    created = make_manager(rds_data_client).ensure_partitions(date(2024, 3, 1))
+
+    assert created == ['user_history_p20240302', 'user_history_p20240303']
+    assert executed_sql(rds_data_client) == [
+        "CREATE TABLE IF NOT EXISTS user_history_p20240302 PARTITION OF user_history "
+        "FOR VALUES FROM ('2024-03-02') TO ('2024-03-03')",
+        "CREATE TABLE IF NOT EXISTS user_history_p20240303 PARTITION OF user_history "
+        "FOR VALUES FROM ('2024-03-03') TO ('2024-03-04')",
+    ]
+
+
+def test_drop_expired_drops_whole_partitions_past_retention():
+    rds_data_client = make_client(['user_history_p20240130', 'user_history_p20240131', 'user_history_p20240301',
+                                   'user_history_manual'])
+
+    dropped = make_manager(rds_data_client).drop_expired(date(2024, 3, 1))
+
+    assert dropped == ['user_history_p20240130']
+    assert "DROP TABLE IF EXISTS user_history_p20240130" in executed_sql(rds_data_client)
+    rds_data_client.commit_transaction.assert_called_once_with('tx-1', 'cluster-arn', 'secret-arn')
+
+
+def test_rows_in_the_default_partition_are_moved_into_the_new_partition():
+    rds_data_client = make_client(['user_history_default', 'user_history_p20240301'],
+                                  default_rows_on=["'2024-03-02'"])
+
+    created = make_manager(rds_data_client).ensure_partitions(date(2024, 3, 1))
+
+    assert created == ['user_history_p20240302', 'user_history_p20240303']
+    statements = [sql for sql in executed_sql(rds_data_client) if not sql.startswith('SELECT 1')]
+    assert statements[1].startswith("CREATE TABLE user_history_p20240302 (LIKE user_history")
+    assert "DELETE FROM user_history_default WHERE created_at >= '2024-03-02'" in statements[2]
+    assert statements[3] == ("ALTER TABLE user_history ATTACH PARTITION user_history_p20240302 "
+                             "FOR VALUES FROM ('2024-03-02') TO ('2024-03-03')")
+    assert statements[4].startswith("CREATE TABLE IF NOT EXISTS user_history_p20240303 PARTITION OF")
+    rds_data_client.commit_transaction.assert_called_once_with('tx-1', 'cluster-arn', 'secret-arn')
+
+    assert make_manager(make_client(['user_history_default'])).drop_expired(date(2024, 3, 1)) == []
+
+
+def test_rejects_unsafe_table_names():
+    with pytest.raises(ValueError):
+        DailyPartitionManager(MagicMock(), 'cluster-arn', 'secret-arn', 'db', 'users; DROP TABLE users')
@@ -0,0 +1,43 @@
+import os
+from types import SimpleNamespace
+
+from common.profiling import HandlerProfiler, profiled
+
+
+def handler(event, context):
+    return {'total': sum(range(event['n'])), 'items': [str(index) for index in range(event['n'])]}
+
+
+def test_profiled_returns_the_handler_untouched_when_off(monkeypatch):
+    monkeypatch.delenv('PROFILING_MODE', raising=False)
+
+    assert profiled(handler) is handler
+
+
+def test_sampled_invocations_write_profiles_and_log_a_summary(tmp_path, capsys):
+    profiler = HandlerProfiler(['cpu', 'memory'], sample_rate=1.0, output_dir=str(tmp_path), top_n=5)
+    wrapped = profiler.wrap(handler, name='test-handler')
+
+    result = wrapped({'n': 1000}, SimpleNamespace(aws_request_id='request-1'))
+
+    assert result['total'] == 499500
+    assert sorted(os.listdir(tmp_path)) == ['test-handler-request-1.prof', 'test-handler-request-1.tracemalloc']
+    output = capsys.readouterr().out
+    assert 'Top 5 functions by cumulative time' in output
+    assert 'Top 5 allocation sites' in output
+
+
+def test_unsampled_invocations_are_not_profiled_and_old_files_are_pruned(tmp_path):
+    HandlerProfiler(['cpu'], sample_rate=0.0, output_dir=str(tmp_path)).wrap(handler)({'n': 10}, None)
+    assert os.listdir(tmp_path) == []
+
+    (tmp_path / 'keep.txt').write_text('not a profile')
+    (tmp_path / 'nested').mkdir()
+    profiler = HandlerProfiler(['cpu'], output_dir=str(tmp_path), max_files=2)
+    wrapped = profiler.wrap(handler, name='test-handler')
+    for request_id in range(4):
+        wrapped({'n': 10}, SimpleNamespace(aws_request_id=str(request_id)))
+
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.prof')]) == 2
+    assert (tmp_path / 'keep.txt').exists()
+    assert (tmp_path / 'nested').is_dir()
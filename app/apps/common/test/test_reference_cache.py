@@ -0,0 +1,63 @@
+from common.reference_cache import ReferenceDataCache
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = {row['id']: row for row in rows}
+        self.reads = []
+
+    def load_row(self, key):
+        self.reads.append(key)
+        return self.rows.get(key)
+
+
+def make_cache(table, now, **kwargs):
+    return ReferenceDataCache(table.load_row, ttl_seconds=60, miss_ttl_seconds=5, clock=lambda: now[0], **kwargs)
+
+
+def test_lookups_are_served_from_memory_until_the_ttl():
+    now = [0]
+    table = FakeTable([{'id': 1, 'name': 'Alice'}, {'id': 2, 'name': 'Bob'}])
+    cache = make_cache(table, now)
+
+    assert cache.get(1)['name'] == 'Alice'
+    now[0] = 30
+    assert cache.get(1)['name'] == 'Alice'
+    assert cache.get(2)['name'] == 'Bob'
+    assert table.reads == [1, 2]
+
+    table.rows[1] = {'id': 1, 'name': 'Alice B'}
+    now[0] = 60
+    assert cache.get(1)['name'] == 'Alice B'
+    assert table.reads == [1, 2, 1]
+
+
+def test_misses_are_cached_briefly():
+    now = [0]
+    table = FakeTable([])
+    cache = make_cache(table, now)
+
+    assert cache.get(3) is None
+    assert cache.get(3) is None
+    assert table.reads == [3]
+
+    table.rows[3] = {'id': 3, 'name': 'Carol'}
+    now[0] = 5
+    assert cache.get(3)['name'] == 'Carol'
+
+
+def test_size_is_bounded_by_evicting_the_least_recently_used():
+    now = [0]
+    table = FakeTable([{'id': key, 'name': f'user-{key}'} for key in range(10)])
+    cache = make_cache(table, now, max_size=2)
+
+    cache.get(1)
+    cache.get(2)
+    cache.get(1)
+    cache.get(3)
+
+    assert len(cache) == 2
+    assert set(cache.entries) == {1, 3}
+
+    cache.invalidate()
+    assert len(cache) == 0
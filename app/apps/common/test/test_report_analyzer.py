@@ -0,0 +1,71 @@
+import gzip
+import json
+
+from common.report_analyzer import LogHistogram, analyze, recommend_memory
+
+
+def write_reports(path, count, memory_size=1024, duration=200.0, max_memory_used=90, cold_every=10):
+    with gzip.open(path, 'wt') as log_file:
+        for index in range(count):
+            log_file.write(f"2024-01-01T00:00:00.000Z START RequestId: request-{index} Version: $LATEST\n")
+            init = f"\tInit Duration: {300 + index}.00 ms" if index % cold_every == 0 else ""
+            log_file.write(
+                f"2024-01-01T00:00:00.000Z REPORT RequestId: request-{index}\tDuration: {duration + index:.2f} ms"
+                f"\tBilled Duration: {int(duration + index) + 1} ms\tMemory Size: {memory_size} MB"
+                f"\tMax Memory Used: {max_memory_used} MB{init}\t\n"
+            )
+
+
+def test_histogram_percentiles_are_within_precision():
+    histogram = LogHistogram(precision=0.01)
+    for value in range(1, 1001):
+        histogram.add(value)
+
+    assert abs(histogram.percentile(50) - 500) <= 5
+    assert abs(histogram.percentile(99) - 990) <= 10
+    assert histogram.percentile(100) == 1000
+
+
+def test_reports_are_grouped_by_function_version_and_memory(tmp_path):
+    stream_dir = tmp_path / 'aws' / 'lambda' / 'history-processor' / '2024' / '01' / '01' / '[3]abc'
+    stream_dir.mkdir(parents=True)
+    write_reports(str(stream_dir / '000000.gz'), 100)
+    events = tmp_path / 'events.jsonl'
+    with open(events, 'w') as events_file:
+        events_file.write(json.dumps({
+            'logStreamName': '2024/01/01/[$LATEST]def',
+            'message': 'REPORT RequestId: r\tDuration: 5.00 ms\tBilled Duration: 5 ms\tMemory Size: 512 MB'
+                       '\tMax Memory Used: 80 MB\t',
+        }) + '\n')
+        events_file.write(json.dumps({
+            'message': json.dumps({
+                '_aws': {'CloudWatchMetrics': [{'Namespace': 'RandomSystem/Pipeline', 'Dimensions': [['Hop']],
+                                                'Metrics': [{'Name': 'EndToEndLatency', 'Unit': 'Milliseconds'}]}]},
+                'Hop': 'class-mapper',
+                'EndToEndLatency': 42,
+            }),
+        }) + '\n')
+
+    functions, metrics = analyze([str(stream_dir / '000000.gz'), str(events)])
+    assert set(functions) == {('history-processor', '3', 1024), ('unknown', '$LATEST', 512)}
+    stats = functions[('history-processor', '3', 1024)]
+    assert stats.invocations == 100
+    assert stats.cold_starts == 10
+    assert stats.init_duration.count == 10
+    assert metrics['RandomSystem/Pipeline EndToEndLatency Hop=class-mapper'].percentile(50) == 42
+
+
+def test_recommendation_fits_memory_and_saves_cost(tmp_path):
+    path = str(tmp_path / 'report.gz')
+    write_reports(path, 50, memory_size=1024, duration=200.0, max_memory_used=90)
+    functions, _ = analyze([path], default_function='class-mapper')
+    stats = functions[('class-mapper', '$LATEST', 1024)]
+
+    # Entirely I/O bound: less memory is no slower, so the smallest size above 90 MB + 20% wins.
+    memory_mb, cost, p99_duration = recommend_memory(stats, cpu_bound_fraction=0.0)
+    assert memory_mb == 128
+    assert abs(p99_duration - stats.duration.percentile(99)) < 1e-9
+
+    # Entirely CPU bound: shrinking memory slows it past the allowed 10%.
+    memory_mb, _, _ = recommend_memory(stats, cpu_bound_fraction=1.0)
+    assert memory_mb >= 1024
@@ -0,0 +1,98 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from common.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientCaller,
+    RetryPolicy,
+    TokenBucket,
+    is_retryable_error,
+)
+
+
+def make_client_error(code, message='', status_code=400):
+    return ClientError(
+        {'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': status_code}},
+        'ExecuteStatement'
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_is_retryable_error():
+    assert is_retryable_error(make_client_error('ThrottlingException'))
+    assert is_retryable_error(make_client_error('BadRequestException', 'Communications link failure'))
+    assert is_retryable_error(make_client_error('InternalError', status_code=500))
+    assert not is_retryable_error(make_client_error('BadRequestException', 'syntax error at or near "SELEC"'))
+    assert not is_retryable_error(ValueError('boom'))
+
+
+def test_caller_retries_transient_errors():
+    clock = FakeClock()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise make_client_error('ThrottlingException')
+        return 'ok'
+
+    caller = ResilientCaller('test', retry_policy=RetryPolicy(max_attempts=5, sleep=clock.sleep))
+
+    assert caller.call(flaky) == 'ok'
+    assert len(calls) == 3
+
+
+def test_caller_does_not_retry_permanent_errors():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise make_client_error('BadRequestException', 'syntax error')
+
+    caller = ResilientCaller('test', retry_policy=RetryPolicy(max_attempts=5, sleep=lambda _: None))
+
+    with pytest.raises(ClientError):
+        caller.call(broken)
+    assert len(calls) == 1
+
+
+def test_circuit_breaker_fails_fast_then_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker('db', failure_threshold=2, reset_timeout=10, clock=clock)
+    caller = ResilientCaller('test', retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=breaker)
+
+    def down():
+        raise make_client_error('BadRequestException', 'Communications link failure')
+
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            caller.call(down)
+
+    with pytest.raises(CircuitOpenError):
+        caller.call(lambda: 'ok')
+
+    clock.now += 10
+    assert caller.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_token_bucket_limits_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(6):
+        bucket.acquire()
+
+    # Two tokens were available up front, the other four take two seconds.
+    assert clock.now == pytest.approx(2.0)
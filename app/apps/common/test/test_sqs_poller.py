@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+from common.message_envelope import get_record_attributes
+from common.sqs_poller import SQSPoller, VisibilityHeartbeat, get_failed_message_ids
+
+QUEUE_URL = 'https://sqs.us-east-1.amazonaws.com/123456789012/transform.fifo'
+QUEUE_ARN = 'arn:aws:sqs:us-east-1:123456789012:transform.fifo'
+
+
+class InMemorySQSClient:
+    def __init__(self, messages):
+        self.queue = list(messages)
+        self.deleted = []
+        self.visibility_changes = 0
+        self.lock = threading.Lock()
+
+    def get_queue_attributes(self, queue_url, attribute_names):
+        return {'QueueArn': QUEUE_ARN}
+
+    def receive_messages(self, queue_url, max_number=10, wait_time_seconds=20, visibility_timeout=None):
+        with self.lock:
+            batch, self.queue = self.queue[:max_number], self.queue[max_number:]
+            return batch
+
+    def delete_message_batch(self, queue_url, entries):
+        with self.lock:
+            self.deleted.extend(entry['ReceiptHandle'] for entry in entries)
+            return {'Successful': [{'Id': entry['Id']} for entry in entries]}
+
+    def change_message_visibility_batch(self, queue_url, entries):
+        with self.lock:
+            self.visibility_changes += 1
+            return {'Successful': [{'Id': entry['Id']} for entry in entries]}
+
+
+def make_messages(count):
+    return [
+        {
+            'MessageId': f'id-{index}',
+            'ReceiptHandle': f'handle-{index}',
+            'Body': json.dumps({'userId': index}),
+            'Attributes': {'MessageGroupId': 'default-group'},
+            'MessageAttributes': {'SchemaVersion': {'DataType': 'String', 'StringValue': '1'}},
+        }
+        for index in range(count)
+    ]
+
+
+def test_poller_calls_handler_with_lambda_shaped_events_and_deletes_successes():
+    sqs_client = InMemorySQSClient(make_messages(15))
+    seen = []
+
+    def handler(event, context):
+        for record in event['Records']:
+            assert record['eventSourceARN'] == QUEUE_ARN
+            assert get_record_attributes(record) == {'SchemaVersion': '1'}
+            seen.append(json.loads(record['body'])['userId'])
+        # Fail user 3 only
+        return {'batchItemFailures': [
+            {'itemIdentifier': record['messageId']} for record in event['Records'] if record['messageId'] == 'id-3'
+        ]}
+
+    stats = SQSPoller(sqs_client, QUEUE_URL, handler, workers=2, wait_time_seconds=0, empty_receives=1).run()
+
+    assert sorted(seen) == list(range(15))
+    assert stats['succeeded'] == 14
+    assert stats['failed'] == 1
+    assert 'handle-3' not in sqs_client.deleted
+    assert len(sqs_client.deleted) == 14
+
+
+def test_handler_exception_or_unknown_identifier_fails_the_whole_batch():
+    message_ids = ['id-0', 'id-1']
+    assert get_failed_message_ids(None, message_ids) == set()
+    assert get_failed_message_ids({'batchItemFailures': []}, message_ids) == set()
+    assert get_failed_message_ids({'batchItemFailures': [{'itemIdentifier': 'other'}]}, message_ids) == set(message_ids)
+
+    def handler(event, context):
+        raise RuntimeError("database unavailable")
+
+    sqs_client = InMemorySQSClient(make_messages(3))
+    stats = SQSPoller(sqs_client, QUEUE_URL, handler, workers=1, wait_time_seconds=0, empty_receives=1).run()
+
+    assert stats['failed'] == 3
+    assert sqs_client.deleted == []
+
+
+def test_heartbeat_extends_visibility_while_the_handler_runs():
+    sqs_client = InMemorySQSClient([])
+
+    with VisibilityHeartbeat(sqs_client, QUEUE_URL, make_messages(2), visibility_timeout=60, interval=0.01):
+        time.sleep(0.05)
+
+    assert sqs_client.visibility_changes >= 2
@@ -0,0 +1,45 @@
+import json
+
+from common.tracing import TraceContext, emit_hop_metrics, extract_trace_context
+
+
+def make_record(message_attributes=None, sent=1_700_000_000_000, first_received=1_700_000_000_250):
+    return {
+        'messageId': 'message-1',
+        'body': '{}',
+        'attributes': {
+            'SentTimestamp': str(sent),
+            'ApproximateFirstReceiveTimestamp': str(first_received),
+            'ApproximateReceiveCount': '1',
+        },
+        'messageAttributes': {
+            name: {'stringValue': value, 'dataType': 'String'} for name, value in (message_attributes or {}).items()
+        },
+    }
+
+
+def test_context_comes_from_attributes_then_eventbridge_wrapper_then_sent_timestamp():
+    upstream = TraceContext(1_699_999_999_000, 'event-1')
+    payload, trace_context = extract_trace_context(make_record(upstream.to_attributes()), {'userId': 1})
+    assert (payload, trace_context) == ({'userId': 1}, upstream)
+
+    wrapped = {'detail': {'name': 'Alice'}, 'traceContext': {'originTime': '2023-11-14T22:13:20Z', 'correlationId': 'e'}}
+    payload, trace_context = extract_trace_context(make_record(), wrapped)
+    assert payload == {'name': 'Alice'}
+    assert trace_context == TraceContext(1_700_000_000_000, 'e')
+
+    payload, trace_context = extract_trace_context(make_record(), {'userId': 1})
+    assert trace_context == TraceContext(1_700_000_000_000, 'message-1')
+
+
+def test_hop_metrics_are_logged_in_embedded_metric_format(capsys):
+    trace_context = TraceContext(1_700_000_000_000, 'event-1')
+
+    metrics = emit_hop_metrics('class-mapper', make_record(), trace_context,
+                               started_ms=1_700_000_000_300, finished_ms=1_700_000_000_340)
+
+    assert metrics == {'ProcessingTime': 40, 'EndToEndLatency': 340, 'QueueDwellTime': 250}
+    document = json.loads(capsys.readouterr().out)
+    assert document['Hop'] == 'class-mapper'
+    assert document['CorrelationId'] == 'event-1'
+    assert [metric['Name'] for metric in document['_aws']['CloudWatchMetrics'][0]['Metrics']] == list(metrics)
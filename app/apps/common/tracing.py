@@ -0,0 +1,107 @@
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+
+from common.constants import TRACE_CONTEXT_FIELD, TRACE_DETAIL_FIELD
+from common.message_envelope import get_record_attributes
+
+ORIGIN_TIME_ATTRIBUTE = "TraceOriginTime"
+CORRELATION_ID_ATTRIBUTE = "CorrelationId"
+
+METRICS_NAMESPACE = "RandomSystem/Pipeline"
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class TraceContext(NamedTuple):
+    """Where a message entered the pipeline: epoch milliseconds and a correlation id."""
+    origin_time_ms: int
+    correlation_id: str
+
+    def to_attributes(self) -> dict:
+        return {
+            ORIGIN_TIME_ATTRIBUTE: str(self.origin_time_ms),
+            CORRELATION_ID_ATTRIBUTE: self.correlation_id,
+        }
+
+    @classmethod
+    def from_attributes(cls, attributes: dict):
+        if ORIGIN_TIME_ATTRIBUTE not in attributes or CORRELATION_ID_ATTRIBUTE not in attributes:
+            return None
+        return cls(int(attributes[ORIGIN_TIME_ATTRIBUTE]), attributes[CORRELATION_ID_ATTRIBUTE])
+
+
+def parse_event_time(value: str) -> int:
+    """EventBridge event times look like 2024-01-01T00:00:00Z."""
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+
+
+def extract_trace_context(record: dict, payload):
+    """Return (payload, trace context) for a decoded SQS record.
+
+    The context comes from the message attributes set by an upstream
+    handler, or from the wrapper the EventBridge input transformer adds, in
+    which case the wrapped event detail is returned as the payload. Messages
+    carrying neither start a new trace at the time SQS accepted them.
+    """
+    trace_context = TraceContext.from_attributes(get_record_attributes(record))
+    if trace_context:
+        return payload, trace_context
+
+    if isinstance(payload, dict) and TRACE_CONTEXT_FIELD in payload:
+        wrapper = payload[TRACE_CONTEXT_FIELD]
+        trace_context = TraceContext(parse_event_time(wrapper['originTime']), wrapper['correlationId'])
+        return payload.get(TRACE_DETAIL_FIELD), trace_context
+
+    sent_timestamp = record.get('attributes', {}).get('SentTimestamp')
+    origin_time_ms = int(sent_timestamp) if sent_timestamp else now_ms()
+    return payload, TraceContext(origin_time_ms, record.get('messageId') or str(uuid.uuid4()))
+
+
+def get_queue_dwell_ms(record: dict):
+    """Time the message waited in the queue before its first delivery, or None if SQS did not say."""
+    attributes = record.get('attributes', {})
+    sent = attributes.get('SentTimestamp')
+    first_received = attributes.get('ApproximateFirstReceiveTimestamp')
+    if sent is None or first_received is None:
+        return None
+    return int(first_received) - int(sent)
+
+
+def emit_hop_metrics(hop: str, record: dict, trace_context: TraceContext, started_ms: int, finished_ms: int = None,
+                     extra_metrics: dict = None):
+    """Log the latency of one record through one hop in CloudWatch embedded metric format.
+
+    ``extra_metrics`` are further millisecond values of the hop, such as the duration of a batch-wide write.
+    """
+    finished_ms = finished_ms if finished_ms is not None else now_ms()
+    metrics = {
+        'ProcessingTime': finished_ms - started_ms,
+        'EndToEndLatency': finished_ms - trace_context.origin_time_ms,
+    }
+    queue_dwell_ms = get_queue_dwell_ms(record)
+    if queue_dwell_ms is not None:
+        metrics['QueueDwellTime'] = queue_dwell_ms
+    if extra_metrics:
+        metrics.update(extra_metrics)
+
+    document = {
+        '_aws': {
+            'Timestamp': finished_ms,
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Hop']],
+                'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in metrics],
+            }],
+        },
+        'Hop': hop,
+        'CorrelationId': trace_context.correlation_id,
+        'ApproximateReceiveCount': record.get('attributes', {}).get('ApproximateReceiveCount'),
+        **metrics,
+    }
+    print(json.dumps(document))
+    return metrics
@@ -0,0 +1,256 @@
+"""Bulk load the users table through the RDS Data API.
+
+Rows are streamed from a CSV or NDJSON file (columns ``name``, ``email`` and
+optionally ``created_at``) or generated synthetically, grouped into chunks
+and written with BatchExecuteStatement by a pool of workers. Completed chunks
+are checkpointed with the chunk size and source, so an interrupted load of
+the same source resumes where it stopped; inserts use ON CONFLICT (email)
+DO NOTHING, so replaying a chunk is harmless.
+
+Example::
+
+    PYTHONPATH=apps DB_CLUSTER_ARN=... DB_SECRET_ARN=... DB_NAME=postgres \\
+        python -m random_system.bulk_loader --synthetic 10000000 --workers 8 --checkpoint load.json
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from itertools import islice
+
+from common.constants import (
+    ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
+    ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
+    ENV_RANDOM_SYSTEM_DB_NAME,
+)
+from common.rds_data_client import RDSDataClient
+
+INSERT_USER_SQL = """
+INSERT INTO users (name, email, created_at) VALUES
+(:name, :email, COALESCE(CAST(:created_at AS TIMESTAMP), CURRENT_TIMESTAMP))
+ON CONFLICT (email) DO NOTHING
+"""
+SYNTHETIC_EPOCH = datetime(2020, 1, 1)
+
+
+def read_csv(path):
+    with open(path, newline='') as source_file:
+        for row in csv.DictReader(source_file):
+            yield row
+
+
+def read_ndjson(path):
+    with open(path) as source_file:
+        for line in source_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def generate_synthetic(count, start=0):
+    """Deterministic rows, so a resumed load regenerates exactly the same chunks."""
+    for index in range(start, start + count):
+        yield {
+            'name': f'user{index}',
+            'email': f'user{index}@example.com',
+            'created_at': (SYNTHETIC_EPOCH + timedelta(seconds=index)).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+
+def to_parameter_set(row):
+    created_at = row.get('created_at')
+    return [
+        {'name': 'name', 'value': {'stringValue': row['name']}},
+        {'name': 'email', 'value': {'stringValue': row['email']}},
+        {'name': 'created_at', 'value': {'stringValue': created_at} if created_at else {'isNull': True}},
+    ]
+
+
+def chunked(rows, chunk_size):
+    """Yield (chunk_index, rows) without materialising the whole source."""
+    iterator = iter(rows)
+    chunk_index = 0
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk_index, chunk
+        chunk_index += 1
+
+
+class Checkpoint:
+    """Tracks completed chunks as a contiguous watermark plus the out-of-order ones after it.
+
+    Chunk indexes only mean something for the chunk size and source they were counted with,
+    so both are saved and a checkpoint written for another one is refused unless ``force``.
+    """
+
+    def __init__(self, path=None, chunk_size=None, source=None, force=False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.source = source
+        self.watermark = 0
+        self.completed = set()
+        self.rows_loaded = 0
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as checkpoint_file:
+                state = json.load(checkpoint_file)
+            if not force:
+                self.check(state)
+            self.watermark = state['watermark']
+            self.completed = set(state['completed'])
+            self.rows_loaded = state.get('rows_loaded', 0)
+
+    def check(self, state):
+        for key, expected in (('chunk_size', self.chunk_size), ('source', self.source)):
+            saved = state.get(key)
+            if expected is not None and saved is not None and saved != expected:
+                raise ValueError(f"Checkpoint {self.path} was written for {key} {saved!r}, not {expected!r}")
+
+    def is_done(self, chunk_index):
+        return chunk_index < self.watermark or chunk_index in self.completed
+
+    def mark_done(self, chunk_index, row_count):
+        with self.lock:
+            self.completed.add(chunk_index)
+            while self.watermark in self.completed:
+                self.completed.remove(self.watermark)
+                self.watermark += 1
+            self.rows_loaded += row_count
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            state = {
+                'watermark': self.watermark,
+                'completed': sorted(self.completed),
+                'rows_loaded': self.rows_loaded,
+                'chunk_size': self.chunk_size,
+                'source': self.source,
+            }
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(temporary_path, self.path)
+
+
+class BulkLoader:
+    def __init__(self, rds_data_client, cluster_arn, secret_arn, db_name, chunk_size=500, workers=4,
+                 checkpoint=None, progress_interval=10.0):
+        self.rds_data_client = rds_data_client
+        self.cluster_arn = cluster_arn
+        self.secret_arn = secret_arn
+        self.db_name = db_name
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.checkpoint = checkpoint or Checkpoint()
+        self.progress_interval = progress_interval
+
+    def load_chunk(self, chunk_index, rows):
+        self.rds_data_client.batch_execute_statement(
+            INSERT_USER_SQL,
+            [to_parameter_set(row) for row in rows],
+            self.cluster_arn,
+            self.secret_arn,
+            self.db_name,
+        )
+        return chunk_index, len(rows)
+
+    def load(self, rows):
+        """Load every row not covered by the checkpoint. Returns the number of rows written by this run."""
+        started_at = last_report = time.monotonic()
+        rows_written = 0
+        # Bounded in-flight work keeps memory flat however large the source is.
+        max_in_flight = self.workers * 2
+        in_flight = set()
+
+        def collect(done):
+            nonlocal rows_written
+            # Record every chunk that succeeded before surfacing a failure, or a resumed run redoes them.
+            error = None
+            for future in done:
+                try:
+                    chunk_index, row_count = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                self.checkpoint.mark_done(chunk_index, row_count)
+                rows_written += row_count
+            if error:
+                raise error
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for chunk_index, chunk in chunked(rows, self.chunk_size):
+                    if self.checkpoint.is_done(chunk_index):
+                        continue
+                    if len(in_flight) >= max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    in_flight.add(executor.submit(self.load_chunk, chunk_index, chunk))
+
+                    now = time.monotonic()
+                    if now - last_report >= self.progress_interval:
+                        self.checkpoint.save()
+                        rate = rows_written / (now - started_at)
+                        print(f"Loaded {self.checkpoint.rows_loaded} rows ({rate:.0f} rows/s this run)")
+                        last_report = now
+
+                collect(wait(in_flight).done)
+        finally:
+            # Whatever finished is kept, so a failed run resumes after its last completed chunk.
+            self.checkpoint.save()
+
+        elapsed = time.monotonic() - started_at
+        print(f"Finished: {rows_written} rows in {elapsed:.1f}s, {self.checkpoint.rows_loaded} rows in total")
+        return rows_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help='CSV file with name,email[,created_at] columns')
+    source.add_argument('--ndjson', help='newline-delimited JSON file')
+    source.add_argument('--synthetic', type=int, help='number of synthetic rows to generate')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--checkpoint', help='checkpoint file used to resume an interrupted load')
+    parser.add_argument('--force-resume', action='store_true',
+                        help='resume from a checkpoint written for another chunk size or source')
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        rows = read_csv(args.csv)
+        source = f"csv:{os.path.abspath(args.csv)}"
+    elif args.ndjson:
+        rows = read_ndjson(args.ndjson)
+        source = f"ndjson:{os.path.abspath(args.ndjson)}"
+    else:
+        rows = generate_synthetic(args.synthetic)
+        # Synthetic rows depend only on their index, so any count resumes the same chunks.
+        source = 'synthetic'
+
+    try:
+        checkpoint = Checkpoint(args.checkpoint, chunk_size=args.chunk_size, source=source, force=args.force_resume)
+    except ValueError as e:
+        parser.error(f"{e}; pass --force-resume to use it anyway")
+
+    loader = BulkLoader(
+        RDSDataClient(),
+        os.environ[ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN],
+        os.environ[ENV_RANDOM_SYSTEM_DB_SECRET_ARN],
+        os.environ[ENV_RANDOM_SYSTEM_DB_NAME],
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        checkpoint=checkpoint,
+    )
+    loader.load(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,39 +1,97 @@
 import os
-import json
-from common.rds_data_client import RDSDataClient
+from common.rds_data_client import RDSDataClient, records_to_dicts
+from common.message_envelope import create_default_envelope, get_record_attributes
+from common.message_codec import MessageCodec
+from common.reference_cache import ReferenceDataCache
+from common.tracing import emit_hop_metrics, extract_trace_context, now_ms
+from common.profiling import profiled
 from common.constants import (
     ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
     ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
     ENV_RANDOM_SYSTEM_DB_NAME,
+    ENV_REFERENCE_CACHE_TTL_SECONDS,
+    ENV_REFERENCE_CACHE_MAX_SIZE,
     get_logger,
 )
+from random_system.message_mappings import MESSAGE_TYPE_FIELD, USER_MESSAGE, mappings
 
 # Set up logging
 logger = get_logger()
 
 rds_data_client = RDSDataClient()
+message_envelope = create_default_envelope()
 
 cluster_arn = os.environ[ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN]
 secret_arn = os.environ[ENV_RANDOM_SYSTEM_DB_SECRET_ARN]
 db_name = os.environ[ENV_RANDOM_SYSTEM_DB_NAME]
 
+# Schema versions of the history processor's messages this mapper understands
+SUPPORTED_SCHEMA_VERSIONS = {1}
+
+# Hop name of this handler in the pipeline latency metrics
+TRACE_HOP = 'class-mapper'
+
+# Message attribute asking every container that sees it to drop its reference cache
+INVALIDATE_CACHE_ATTRIBUTE = "InvalidateReferenceCache"
+
+USER_COLUMNS = ['id', 'name', 'email', 'created_at']
+SELECT_USER_SQL = f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE id = :id"
+
+
+def load_user(user_id):
+    """Read one user by primary key, or None when there is no such user."""
+    parameters = [{'name': 'id', 'value': {'longValue': user_id}}]
+    result = rds_data_client.execute_statement(SELECT_USER_SQL, parameters, cluster_arn, secret_arn, db_name)
+    rows = records_to_dicts(result.get('records', []), USER_COLUMNS)
+    return rows[0] if rows else None
+
+
+# Only the users this container sees are cached, so memory stays bounded however large the table grows
+users_cache = ReferenceDataCache(
+    load_user,
+    max_size=int(os.getenv(ENV_REFERENCE_CACHE_MAX_SIZE, '10000')),
+    ttl_seconds=int(os.getenv(ENV_REFERENCE_CACHE_TTL_SECONDS, '300')),
+)
+
+
+@profiled
 def lambda_handler(event, context):
+    records = event['Records']
 
     # Process each SQS message
-    for record in event['Records']:
+    for index, record in enumerate(records):
+        started_ms = now_ms()
         try:
-            message_body = json.loads(record['body'])
+            attributes = get_record_attributes(record)
+            if attributes.get(INVALIDATE_CACHE_ATTRIBUTE):
+                logger.info("Invalidating reference data cache")
+                users_cache.invalidate()
+
+            message_body, schema_version = MessageCodec.decode(
+                message_envelope.unwrap(record['body'], attributes), attributes
+            )
+            if schema_version not in SUPPORTED_SCHEMA_VERSIONS:
+                raise ValueError(f"Unsupported message schema version: {schema_version}")
+            message_body, trace_context = extract_trace_context(record, message_body)
             logger.info(f"Processing message: {message_body}")
 
-            # Example SQL query to fetch data from the PostgreSQL database
-            query = "SELECT * FROM users"
-            parameters = []
+            # Map the message with the compiled mapping of its type. Like an unsupported schema version, a
+            # missing field or a type without a mapping is reported as failed, so after the queue's
+            # maxReceiveCount it lands in the DLQ and can be redriven once a mapping for it is deployed.
+            mapped = mappings.map(message_body.get(MESSAGE_TYPE_FIELD, USER_MESSAGE), message_body)
 
-            # Execute the SQL query
-            result = rds_data_client.execute_statement(query, parameters, cluster_arn, secret_arn, db_name)
+            # Look the user up in the per-container cache instead of querying the table per record
+            user = users_cache.get(mapped['id'])
 
             # Process the result (example: log the result)
-            logger.info(f"Query result: {result}")
+            logger.info(f"Mapped message: {mapped}, reference user: {user}")
+            emit_hop_metrics(TRACE_HOP, record, trace_context, started_ms)
 
         except Exception as e:
             logger.exception(f"Error processing record: {e}")
+            # FIFO order: retry this record and every record after it
+            return {'batchItemFailures': [
+                {'itemIdentifier': failed_record.get('messageId')} for failed_record in records[index:]
+            ]}
+
+    return {'batchItemFailures': []}
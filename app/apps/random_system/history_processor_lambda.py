@@ -1,13 +1,18 @@
 import os
 import datetime
-import json
-from common.rds_data_client import RDSDataClient
+from common.rds_data_client import RDSDataClient, records_to_dicts
 from common.sqs_client import SQSClient
+from common.message_envelope import create_default_envelope, get_record_attributes
+from common.message_codec import MessageCodec
+from common.tracing import emit_hop_metrics, extract_trace_context, now_ms
+from common.profiling import profiled
+from random_system.message_mappings import USER_ROW, mappings
 from common.constants import (
     ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
     ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
     ENV_RANDOM_SYSTEM_DB_NAME,
     ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL,
+    ENV_MESSAGE_CODEC,
     get_logger,
 )
 
@@ -16,60 +21,151 @@ logger = get_logger()
 
 rds_data_client = RDSDataClient()
 sqs_client = SQSClient()
+message_envelope = create_default_envelope()
+message_codec = MessageCodec(os.getenv(ENV_MESSAGE_CODEC, 'json'))
 
 cluster_arn = os.environ[ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN]
 secret_arn = os.environ[ENV_RANDOM_SYSTEM_DB_SECRET_ARN]
 db_name = os.environ[ENV_RANDOM_SYSTEM_DB_NAME]
 output_queue_url = os.environ[ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL]
 
+# Hop name of this handler in the pipeline latency metrics
+TRACE_HOP = 'history-processor'
+
+USER_COLUMNS = ['id', 'name', 'email', 'created_at']
+# One statement per batch: upsert the users and append one user_history row per event.
+# The no-op update makes RETURNING yield rows that already existed as well as new ones,
+# so every source record gets its row back from the same round trip. ON CONFLICT DO
+# UPDATE cannot touch a row twice, so the upsert keeps the last event per email.
+# History rows are keyed by the SQS messageId and dated by the message's SentTimestamp,
+# which a redelivery keeps, so records retried after a partially failed batch don't
+# append their history twice.
+UPSERT_USERS_SQL = """
+WITH source (name, email, position, message_id, sent_at) AS (
+    VALUES
+    {values}
+), upserted AS (
+    INSERT INTO users (name, email)
+    SELECT DISTINCT ON (email) name, email FROM source ORDER BY email, position DESC
+    ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+    RETURNING {columns}
+), history AS (
+    INSERT INTO user_history (user_id, name, email, message_id, created_at)
+    SELECT upserted.id, source.name, source.email, source.message_id,
+           COALESCE(CAST(to_timestamp(source.sent_at / 1000.0) AS TIMESTAMP), LOCALTIMESTAMP)
+    FROM source JOIN upserted ON upserted.email = source.email
+    ON CONFLICT (message_id, created_at) DO NOTHING
+)
+SELECT {columns} FROM upserted
+"""
+
+
+def to_user(message_body, index):
+    """Pick the user a message writes: its own name/email, or a generated one like before."""
+    name = message_body.get('name') or f"name{datetime.datetime.now()}-{index}"
+    email = message_body.get('email') or f"{name}@example.com"
+    return name, email
+
+
+def to_nullable(key, value):
+    return {key: value} if value is not None else {'isNull': True}
+
+
+def build_upsert(users, records):
+    """Build the batch upsert for (name, email) pairs and the SQS records they came from."""
+    values = []
+    parameters = []
+    for index, ((name, email), record) in enumerate(zip(users, records)):
+        sent_timestamp = record.get('attributes', {}).get('SentTimestamp')
+        values.append(f"(:name_{index}, :email_{index}, {index}, "
+                      f"CAST(:message_id_{index} AS VARCHAR), CAST(:sent_at_{index} AS BIGINT))")
+        parameters.append({'name': f'name_{index}', 'value': {'stringValue': name}})
+        parameters.append({'name': f'email_{index}', 'value': {'stringValue': email}})
+        parameters.append({'name': f'message_id_{index}',
+                           'value': to_nullable('stringValue', record.get('messageId'))})
+        parameters.append({'name': f'sent_at_{index}',
+                           'value': to_nullable('longValue', int(sent_timestamp) if sent_timestamp else None)})
+    sql = UPSERT_USERS_SQL.format(values=",\n    ".join(values), columns=", ".join(USER_COLUMNS))
+    return sql, parameters
+
+
+def upsert_users(users, records):
+    """Write the users and their history in one statement and return the user rows keyed by email."""
+    sql, parameters = build_upsert(users, records)
+    result = rds_data_client.execute_statement(sql, parameters, cluster_arn, secret_arn, db_name)
+    return {row['email']: row for row in records_to_dicts(result.get('records', []), USER_COLUMNS)}
+
+
+@profiled
 def lambda_handler(event, context):
 
     # Define a default MessageGroupId for the FIFO queue
     message_group_id = 'default-group'
+    records = event['Records']
+    failed_index = None
 
-    # Process each SQS message
-    for record in event['Records']:
-        print("record", record)
+    # Decode every record first so the whole batch is written in a single statement
+    users = []
+    trace_contexts = []
+    decode_ms = []
+    for index, record in enumerate(records):
+        record_started_ms = now_ms()
         try:
-            message_body = json.loads(record['body'])
+            message_body, _ = MessageCodec.decode(record['body'], get_record_attributes(record))
+            message_body, trace_context = extract_trace_context(record, message_body)
             logger.info(f"Processing message: {message_body}")
+            users.append(to_user(message_body or {}, index))
+            trace_contexts.append(trace_context)
+            decode_ms.append(now_ms() - record_started_ms)
+        except Exception as e:
+            logger.exception(f"Error processing record: {e}")
+            failed_index = index
+            break
 
-            # Example SQL query to fetch data from the PostgreSQL database
-            parameters = []
-
-            current_time = datetime.datetime.now()
-            # Insert test data using the RDS Data API
-            insert_data_sql = f"""
-            INSERT INTO users (name, email) VALUES
-            ('name{current_time}', 'name{current_time}@example.com')
-            ON CONFLICT (email) DO NOTHING;
-            """
-            rds_data_client.execute_statement(insert_data_sql, parameters, cluster_arn, secret_arn, db_name)
-            print("wafafaf")
-            query = "SELECT * FROM users"
-            # Execute the SQL query
-            result = rds_data_client.execute_statement(query, parameters, cluster_arn, secret_arn, db_name)
-
-            # Process the result (example: log the result)
-            logger.info(f"Query result: {result}")
-
-            # Transform the message (example: modify the structure or content)
-            transformed_message = transform_message(result["records"])
+    # The upsert is shared by the whole batch, so it is reported as its own metric, not in each record's time
+    write_started_ms = now_ms()
+    try:
+        rows = upsert_users(users, records) if users else {}
+    except Exception as e:
+        logger.exception(f"Error writing users: {e}")
+        rows = {}
+        failed_index = 0
+    batch_write_ms = now_ms() - write_started_ms
+
+    for index, (_, email) in enumerate(users):
+        if failed_index is not None and index >= failed_index:
+            break
+        # A record's own work: its decode above plus the transform and send below
+        record_started_ms = now_ms() - decode_ms[index]
+        try:
+            row = rows.get(email)
+            if row is None:
+                raise ValueError(f"No row returned for {email}")
+
+            # Transform the returned row (example: modify the structure or content)
+            transformed_message = transform_message(row)
             logger.info(f"Transformed message: {transformed_message}")
 
-            # Send the transformed message to another SQS queue
-            sqs_client.send_message_to_sqs(output_queue_url, transformed_message, message_group_id)
+            # Encode, compress or offload large payloads, then send to another SQS queue
+            body, message_attributes = message_codec.encode(transformed_message)
+            body, envelope_attributes = message_envelope.wrap(body)
+            message_attributes.update(envelope_attributes)
+            sqs_client.send_message_to_sqs(output_queue_url, body, message_group_id, message_attributes,
+                                           trace_context=trace_contexts[index])
+            emit_hop_metrics(TRACE_HOP, records[index], trace_contexts[index], record_started_ms,
+                             extra_metrics={'BatchWriteTime': batch_write_ms})
 
         except Exception as e:
             logger.exception(f"Error processing record: {e}")
+            failed_index = index
+
+    # FIFO order: once a record fails, every record after it is retried too
+    if failed_index is None:
+        return {'batchItemFailures': []}
+    return {'batchItemFailures': [
+        {'itemIdentifier': record.get('messageId')} for record in records[failed_index:]
+    ]}
 
-def transform_message(query_result):
-    """Transform the database query result into a new format."""
-    # Example transformation: create a new dictionary from the query result
-    transformed_data = {
-        "userId": query_result[0][0]['longValue'],
-        "userName": query_result[0][1]['stringValue'],
-        "userEmail": query_result[0][2]['stringValue']
-    }
-    return json.dumps(transformed_data)
-    
\ No newline at end of file
+def transform_message(row):
+    """Transform an upserted users row into a new format."""
+    return mappings.map(USER_ROW, row)
@@ -0,0 +1,22 @@
+from common.message_mapper import FieldMapping, MappingRegistry
+
+# Upserted users row -> message the history processor publishes
+USER_ROW = 'user_row'
+# Message the class mapper receives -> user record it works with
+USER_MESSAGE = 'user'
+# Body field naming a message's type; messages without one are USER_MESSAGE
+MESSAGE_TYPE_FIELD = 'messageType'
+
+mappings = MappingRegistry()
+
+mappings.register(USER_ROW, [
+    FieldMapping('userId', 'id', 'int'),
+    FieldMapping('userName', 'name', 'str'),
+    FieldMapping('userEmail', 'email', 'str'),
+])
+
+mappings.register(USER_MESSAGE, [
+    FieldMapping('id', 'userId', 'int'),
+    FieldMapping('name', 'userName', 'str', default=None),
+    FieldMapping('email', 'userEmail', 'str', default=None),
+])
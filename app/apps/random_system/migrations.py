@@ -0,0 +1,86 @@
+from common.migration_runner import Migration
+
+# Ordered schema history of the random system database. Never edit a
+# migration that has shipped; add a new one instead.
+MIGRATIONS = [
+    Migration(
+        1,
+        "create users table",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) UNIQUE NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """,
+        ),
+    ),
+    Migration(
+        2,
+        "seed test users",
+        (
+            """
+            INSERT INTO users (name, email) VALUES
+            ('Alice', 'alice@example.com'),
+            ('Bob', 'bob@example.com'),
+            ('Charlie', 'charlie@example.com')
+            ON CONFLICT (email) DO NOTHING;
+            """,
+        ),
+    ),
+    # email is already covered by the index behind its UNIQUE constraint, and id by the primary key.
+    # (created_at, id) serves created_at range scans and keyset pagination over both columns.
+    Migration(
+        3,
+        "index users by created_at and id",
+        (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created_at_id ON users (created_at, id)",
+        ),
+        transactional=False,
+        concurrent_indexes=("idx_users_created_at_id",),
+    ),
+    # Every processed event appends a history row. Partitioning by day keeps inserts and
+    # recent-row queries on small partitions (filter on created_at so the planner prunes
+    # the rest), and retention drops whole partitions instead of DELETEing rows. The
+    # partitions themselves are created by random_system.partition_maintenance_lambda.
+    Migration(
+        4,
+        "create user_history partitioned by day",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS user_history (
+                id BIGSERIAL,
+                user_id INTEGER NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (created_at, id)
+            ) PARTITION BY RANGE (created_at);
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_user_history_user_id_created_at ON user_history (user_id, created_at)",
+        ),
+    ),
+    # Catches rows for days without a partition, e.g. after maintenance failed for longer than
+    # the premade days, instead of failing the insert. Partition maintenance moves them into
+    # the day's partition when it creates it.
+    Migration(
+        5,
+        "add a default partition to user_history",
+        (
+            "CREATE TABLE IF NOT EXISTS user_history_default PARTITION OF user_history DEFAULT",
+        ),
+    ),
+    # Lets the history processor skip history rows it already wrote when SQS redelivers a
+    # record. A unique index on a partitioned table has to include the partition key.
+    Migration(
+        6,
+        "key user_history rows by SQS message id",
+        (
+            "ALTER TABLE user_history ADD COLUMN IF NOT EXISTS message_id VARCHAR(128)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_user_history_message_id_created_at "
+            "ON user_history (message_id, created_at)",
+        ),
+    ),
+]
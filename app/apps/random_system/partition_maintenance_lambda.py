@@ -0,0 +1,40 @@
+import os
+from datetime import datetime, timezone
+
+from common.partition_manager import DailyPartitionManager
+from common.profiling import profiled
+from common.rds_data_client import RDSDataClient
+from common.constants import (
+    ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
+    ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
+    ENV_RANDOM_SYSTEM_DB_NAME,
+    ENV_HISTORY_RETENTION_DAYS,
+    ENV_HISTORY_PREMAKE_DAYS,
+    get_logger,
+)
+
+# Set up logging
+logger = get_logger()
+
+HISTORY_TABLE = 'user_history'
+
+
+def create_history_partition_manager(rds_data_client) -> DailyPartitionManager:
+    return DailyPartitionManager(
+        rds_data_client,
+        os.environ[ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN],
+        os.environ[ENV_RANDOM_SYSTEM_DB_SECRET_ARN],
+        os.environ[ENV_RANDOM_SYSTEM_DB_NAME],
+        HISTORY_TABLE,
+        premake_days=int(os.getenv(ENV_HISTORY_PREMAKE_DAYS, '7')),
+        retention_days=int(os.getenv(ENV_HISTORY_RETENTION_DAYS, '30')),
+    )
+
+
+@profiled
+def lambda_handler(event, context):
+    """Create the upcoming user_history partitions and drop the expired ones."""
+    manager = create_history_partition_manager(RDSDataClient())
+    result = manager.run(datetime.now(timezone.utc).date())
+    logger.info(f"Partition maintenance: {result}")
+    return result
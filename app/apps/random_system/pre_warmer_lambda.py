@@ -0,0 +1,54 @@
+import os
+
+from common.rds_data_client import RDSDataClient
+from common.profiling import profiled
+from common.resilience import CircuitBreaker, ResilientCaller, RetryPolicy
+from common.constants import (
+    ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
+    ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
+    ENV_RANDOM_SYSTEM_DB_NAME,
+    get_logger,
+)
+
+# Set up logging
+logger = get_logger()
+
+# Resuming a paused Aurora Serverless cluster takes tens of seconds, so the
+# pre-warmer retries for much longer than the request path does.
+rds_data_client = RDSDataClient(
+    caller=ResilientCaller(
+        'rds-data-pre-warm',
+        retry_policy=RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=20.0),
+        circuit_breaker=CircuitBreaker('rds-data-pre-warm', failure_threshold=20, reset_timeout=5),
+    )
+)
+
+cluster_arn = os.environ[ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN]
+secret_arn = os.environ[ENV_RANDOM_SYSTEM_DB_SECRET_ARN]
+db_name = os.environ[ENV_RANDOM_SYSTEM_DB_NAME]
+
+# Cheap resume query followed by indexed reads that pull the hot indexes into the buffer cache.
+RESUME_STATEMENT = "SELECT 1"
+WARM_UP_STATEMENTS = [
+    "SELECT id FROM users ORDER BY id DESC LIMIT 1000",
+    "SELECT email FROM users ORDER BY email LIMIT 1000",
+]
+
+
+def warm_cluster():
+    """Resume the cluster and warm the hot tables and indexes."""
+    rds_data_client.execute_statement(RESUME_STATEMENT, [], cluster_arn, secret_arn, db_name)
+    for statement in WARM_UP_STATEMENTS:
+        try:
+            rds_data_client.execute_statement(statement, [], cluster_arn, secret_arn, db_name)
+        except Exception as e:
+            logger.warning(f"Warm-up statement failed: {statement}: {e}")
+
+
+@profiled
+def lambda_handler(event, context):
+    """Invoked by the timezone controller ahead of the windows it resolved from its schedule registry."""
+    windows = (event or {}).get('windows', [])
+    logger.info(f"Pre-warming cluster for windows opening at: {windows}")
+    warm_cluster()
+    return {'warmed': True, 'windows': windows}
@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from random_system.bulk_loader import BulkLoader, Checkpoint, generate_synthetic
+
+
+def make_loader(rds_data_client, checkpoint):
+    return BulkLoader(rds_data_client, 'cluster-arn', 'secret-arn', 'db', chunk_size=10, workers=3,
+                      checkpoint=checkpoint)
+
+
+def test_load_writes_every_row_in_chunks(tmp_path):
+    rds_data_client = MagicMock()
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+
+    assert make_loader(rds_data_client, checkpoint).load(generate_synthetic(95)) == 95
+
+    assert rds_data_client.batch_execute_statement.call_count == 10
+    emails = {
+        parameter_set[1]['value']['stringValue']
+        for call in rds_data_client.batch_execute_statement.call_args_list
+        for parameter_set in call[0][1]
+    }
+    assert len(emails) == 95
+    assert Checkpoint(str(tmp_path / 'checkpoint.json')).watermark == 10
+
+
+def test_load_resumes_after_failure(tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    failing_client = MagicMock()
+    failing_client.batch_execute_statement.side_effect = [None] * 3 + [RuntimeError('database down')] * 10
+
+    loader = BulkLoader(failing_client, 'cluster-arn', 'secret-arn', 'db', chunk_size=10, workers=1,
+                        checkpoint=Checkpoint(checkpoint_path))
+    with pytest.raises(RuntimeError):
+        loader.load(generate_synthetic(50))
+
+    rds_data_client = MagicMock()
+    assert make_loader(rds_data_client, Checkpoint(checkpoint_path)).load(generate_synthetic(50)) == 20
+    assert rds_data_client.batch_execute_statement.call_count == 2
+
+
+def test_checkpoint_refuses_another_chunk_size_or_source(tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.json')
+    checkpoint = Checkpoint(checkpoint_path, chunk_size=10, source='csv:/data/users.csv')
+    make_loader(MagicMock(), checkpoint).load(generate_synthetic(30))
+
+    with pytest.raises(ValueError, match='chunk_size'):
+        Checkpoint(checkpoint_path, chunk_size=20, source='csv:/data/users.csv')
+    with pytest.raises(ValueError, match='source'):
+        Checkpoint(checkpoint_path, chunk_size=10, source='csv:/data/other.csv')
+
+    assert Checkpoint(checkpoint_path, chunk_size=10, source='csv:/data/users.csv').watermark == 3
+    assert Checkpoint(checkpoint_path, chunk_size=20, source='csv:/data/other.csv', force=True).watermark == 3
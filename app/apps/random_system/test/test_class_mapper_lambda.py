@@ -0,0 +1,61 @@
+import os
+from common.constants import (
+    ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
+    ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
+    ENV_RANDOM_SYSTEM_DB_NAME,
+)
+os.environ['AWS_DEFAULT_REGION'] = 'us-east-1'
+os.environ[ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN] = 'arn:aws:rds:us-west-2:123456789012:cluster:mydbcluster'
+os.environ[ENV_RANDOM_SYSTEM_DB_SECRET_ARN] = 'arn:aws:secretsmanager:us-west-2:123456789012:secret:mysecret'
+os.environ[ENV_RANDOM_SYSTEM_DB_NAME] = 'mydatabase'
+
+from unittest.mock import patch
+import json
+from random_system import class_mapper_lambda
+from random_system.class_mapper_lambda import lambda_handler
+
+USERS_RESULT = {
+    'records': [
+        [{'longValue': 1}, {'stringValue': 'Alice'}, {'stringValue': 'alice@example.com'},
+         {'stringValue': '2024-01-01 00:00:00'}],
+    ]
+}
+
+
+@patch('random_system.class_mapper_lambda.rds_data_client')
+def test_lambda_handler_reads_users_once(mock_rds_data_client):
+    mock_rds_data_client.execute_statement.return_value = USERS_RESULT
+    class_mapper_lambda.users_cache.invalidate()
+
+    sample_event = {
+        'Records': [
+            {'body': json.dumps({'userId': 1})},
+            {'body': json.dumps({'userId': 1})},
+        ]
+    }
+
+    lambda_handler(sample_event, None)
+
+    assert mock_rds_data_client.execute_statement.call_count == 1
+    assert 'WHERE id = :id' in mock_rds_data_client.execute_statement.call_args[0][0]
+    assert class_mapper_lambda.users_cache.get(1)['email'] == 'alice@example.com'
+
+
+@patch('random_system.class_mapper_lambda.rds_data_client')
+def test_lambda_handler_fails_messages_that_cannot_be_mapped_so_they_reach_the_dlq(mock_rds_data_client):
+    mock_rds_data_client.execute_statement.return_value = USERS_RESULT
+    class_mapper_lambda.users_cache.invalidate()
+
+    for unmappable in ({'userName': 'Alice'}, {'userId': 1, 'messageType': 'unknown'}):
+        sample_event = {
+            'Records': [
+                {'messageId': 'm1', 'body': json.dumps({'userId': 1})},
+                {'messageId': 'm2', 'body': json.dumps(unmappable)},
+                {'messageId': 'm3', 'body': json.dumps({'userId': 1})},
+            ]
+        }
+
+        # Every receive fails the message again, so SQS moves it to the DLQ after maxReceiveCount receives
+        for _ in range(4):
+            response = lambda_handler(sample_event, None)
+            assert response == {'batchItemFailures': [{'itemIdentifier': 'm2'}, {'itemIdentifier': 'm3'}]}
@@ -15,19 +15,141 @@ from unittest.mock import patch
 import json
 from random_system.history_processor_lambda import lambda_handler
 
+
+def returned_row(user_id, name, email):
+    return [{'longValue': user_id}, {'stringValue': name}, {'stringValue': email},
+            {'stringValue': '2024-01-01 00:00:00'}]
+
+
 @patch('random_system.history_processor_lambda.transform_message')
 @patch('random_system.history_processor_lambda.sqs_client')
 @patch('random_system.history_processor_lambda.rds_data_client')
 def test_lambda_handler(mock_rds_data_client, mock_sqs_client, mock_transform_message):
-    
+    mock_rds_data_client.execute_statement.return_value = {
+        'records': [returned_row(1, 'Alice', 'alice@example.com')]
+    }
+    mock_transform_message.return_value = {'userId': 1}
+
     sample_event = {
         'Records': [
             {
-                'body': json.dumps({'id': 1})
+                'body': json.dumps({'id': 1, 'name': 'Alice', 'email': 'alice@example.com'})
             }
         ]
     }
     
     lambda_handler(sample_event, None)
 
-    mock_transform_message.assert_called()
\ No newline at end of file
+    mock_transform_message.assert_called()
+
+
+@patch('random_system.history_processor_lambda.sqs_client')
+@patch('random_system.history_processor_lambda.rds_data_client')
+def test_lambda_handler_upserts_batch_once_and_forwards_returned_rows(mock_rds_data_client, mock_sqs_client):
+    # RETURNING gives no guaranteed order, so rows are matched back by email
+    mock_rds_data_client.execute_statement.return_value = {
+        'records': [returned_row(8, 'Bob', 'bob@example.com'), returned_row(7, 'Alice', 'alice@example.com')]
+    }
+    sample_event = {
+        'Records': [
+            {'messageId': 'm1', 'body': json.dumps({'name': 'Alice', 'email': 'alice@example.com'})},
+            {'messageId': 'm2', 'body': json.dumps({'name': 'Bob', 'email': 'bob@example.com'})},
+            {'messageId': 'm3', 'body': json.dumps({'name': 'Alice', 'email': 'alice@example.com'})},
+        ]
+    }
+
+    response = lambda_handler(sample_event, None)
+
+    assert response == {'batchItemFailures': []}
+    assert mock_rds_data_client.execute_statement.call_count == 1
+    sql, parameters = mock_rds_data_client.execute_statement.call_args[0][:2]
+    assert 'RETURNING' in sql
+    assert 'INSERT INTO user_history' in sql
+    assert len(parameters) == 12
+    sent_user_ids = [json.loads(call[0][1])['userId'] for call in mock_sqs_client.send_message_to_sqs.call_args_list]
+    assert sent_user_ids == [7, 8, 7]
+
+
+@patch('random_system.history_processor_lambda.sqs_client')
+@patch('random_system.history_processor_lambda.rds_data_client')
+def test_lambda_handler_reports_failed_record_and_the_rest_of_the_batch(mock_rds_data_client, mock_sqs_client):
+    mock_rds_data_client.execute_statement.return_value = {
+        'records': [returned_row(7, 'Alice', 'alice@example.com')]
+    }
+    sample_event = {
+        'Records': [
+            {'messageId': 'm1', 'body': json.dumps({'name': 'Alice', 'email': 'alice@example.com'})},
+            {'messageId': 'm2', 'body': 'not json'},
+            {'messageId': 'm3', 'body': json.dumps({'name': 'Alice', 'email': 'alice@example.com'})},
+        ]
+    }
+
+    response = lambda_handler(sample_event, None)
+
+    assert response == {'batchItemFailures': [{'itemIdentifier': 'm2'}, {'itemIdentifier': 'm3'}]}
+    assert mock_sqs_client.send_message_to_sqs.call_count == 1
+
+
+@patch('random_system.history_processor_lambda.sqs_client')
+@patch('random_system.history_processor_lambda.rds_data_client')
+def test_lambda_handler_replays_partially_sent_batch_without_duplicate_history(mock_rds_data_client,
+                                                                              mock_sqs_client):
+    mock_rds_data_client.execute_statement.return_value = {
+        'records': [returned_row(7, 'Alice', 'alice@example.com'), returned_row(8, 'Bob', 'bob@example.com')]
+    }
+    records = [
+        {'messageId': f'm{index}', 'attributes': {'SentTimestamp': str(1_700_000_000_000 + index)},
+         'body': json.dumps({'name': name, 'email': f'{name.lower()}@example.com'})}
+        for index, name in enumerate(['Alice', 'Bob', 'Alice'])
+    ]
+    mock_sqs_client.send_message_to_sqs.side_effect = [None, RuntimeError('throttled'), None]
+
+    response = lambda_handler({'Records': records}, None)
+    assert response == {'batchItemFailures': [{'itemIdentifier': 'm1'}, {'itemIdentifier': 'm2'}]}
+
+    mock_sqs_client.send_message_to_sqs.side_effect = None
+    assert lambda_handler({'Records': records[1:]}, None) == {'batchItemFailures': []}
+
+    # The replayed records carry the ids and sent times of the first attempt, so the
+    # history rows the first attempt already wrote conflict and are skipped.
+    first_sql, first_parameters = mock_rds_data_client.execute_statement.call_args_list[0][0][:2]
+    replay_sql, replay_parameters = mock_rds_data_client.execute_statement.call_args_list[1][0][:2]
+    assert 'ON CONFLICT (message_id, created_at) DO NOTHING' in replay_sql
+    first = {parameter['name']: parameter['value'] for parameter in first_parameters}
+    replay = {parameter['name']: parameter['value'] for parameter in replay_parameters}
+    assert [replay['message_id_0'], replay['message_id_1']] == [first['message_id_1'], first['message_id_2']]
+    assert [replay['sent_at_0'], replay['sent_at_1']] == [first['sent_at_1'], first['sent_at_2']]
+    assert replay['sent_at_0'] == {'longValue': 1_700_000_000_001}
+
+
+@patch('common.tracing.now_ms')
+@patch('random_system.history_processor_lambda.now_ms')
+@patch('random_system.history_processor_lambda.sqs_client')
+@patch('random_system.history_processor_lambda.rds_data_client')
+def test_lambda_handler_times_the_shared_upsert_apart_from_each_record(mock_rds_data_client, mock_sqs_client,
+                                                                      mock_now_ms, mock_tracing_now_ms, capsys):
+    clock = [1_700_000_000_000]
+
+    def tick():
+        clock[0] += 1
+        return clock[0]
+
+    def slow_upsert(*args):
+        clock[0] += 500
+        return {'records': [returned_row(7, 'Alice', 'alice@example.com'), returned_row(8, 'Bob', 'bob@example.com')]}
+
+    mock_now_ms.side_effect = mock_tracing_now_ms.side_effect = tick
+    mock_rds_data_client.execute_statement.side_effect = slow_upsert
+    sample_event = {
+        'Records': [
+            {'messageId': 'm1', 'body': json.dumps({'name': 'Alice', 'email': 'alice@example.com'})},
+            {'messageId': 'm2', 'body': json.dumps({'name': 'Bob', 'email': 'bob@example.com'})},
+        ]
+    }
+
+    lambda_handler(sample_event, None)
+
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{"_aws"')]
+    assert len(documents) == 2
+    assert all(document['BatchWriteTime'] == 501 for document in documents)
+    assert all(document['ProcessingTime'] < 10 for document in documents)
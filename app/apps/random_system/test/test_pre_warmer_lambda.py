@@ -0,0 +1,23 @@
+import os
+from common.constants import (
+    ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
+    ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
+    ENV_RANDOM_SYSTEM_DB_NAME,
+)
+os.environ['AWS_DEFAULT_REGION'] = 'us-east-1'
+os.environ[ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN] = 'arn:aws:rds:us-west-2:123456789012:cluster:mydbcluster'
+os.environ[ENV_RANDOM_SYSTEM_DB_SECRET_ARN] = 'arn:aws:secretsmanager:us-west-2:123456789012:secret:mysecret'
+os.environ[ENV_RANDOM_SYSTEM_DB_NAME] = 'mydatabase'
+
+from unittest.mock import patch
+from random_system.pre_warmer_lambda import lambda_handler
+
+
+@patch('random_system.pre_warmer_lambda.rds_data_client')
+def test_lambda_handler_warms_cluster(mock_rds_data_client):
+    response = lambda_handler({'windows': ['2024-03-04T13:00:00+00:00']}, None)
+
+    assert response == {'warmed': True, 'windows': ['2024-03-04T13:00:00+00:00']}
+    statements = [call[0][0] for call in mock_rds_data_client.execute_statement.call_args_list]
+    assert statements[0] == "SELECT 1"
+    assert not any('count(' in statement.lower() for statement in statements)
@@ -0,0 +1,89 @@
+SQS_MINIMUM_CONCURRENCY = 2
+BACKLOG_ATTRIBUTES = ['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+
+
+class ConcurrencyRamp:
+    """Steps a mapping's MaximumConcurrency up while an overnight backlog drains.
+
+    When a window opens with a backlog above ``small_backlog`` messages, the
+    mapping starts at the first stage and moves up one stage per tick while
+    the database latency probe reports healthy. An unhealthy probe steps it
+    back down one stage. Once the backlog is drained the mapping is left at
+    the last stage, which is the steady-state concurrency.
+
+    The age of the oldest message sets the pace: a backlog no older than
+    ``young_backlog_seconds`` is fresh traffic, not an overnight pile-up, and
+    starts half way up the stages; one at least ``old_backlog_seconds`` old
+    holds every stage for ``slow_pace`` ticks.
+    """
+
+    def __init__(self, stages, small_backlog=100, latency_probe=None, max_latency=None, young_backlog_seconds=None,
+                 old_backlog_seconds=None, slow_pace=2):
+        self.stages = sorted(max(SQS_MINIMUM_CONCURRENCY, stage) for stage in stages)
+        self.small_backlog = small_backlog
+        self.latency_probe = latency_probe
+        self.max_latency = max_latency
+        self.young_backlog_seconds = young_backlog_seconds
+        self.old_backlog_seconds = old_backlog_seconds
+        self.slow_pace = slow_pace
+
+    @property
+    def steady_concurrency(self):
+        return self.stages[-1]
+
+    def is_latency_healthy(self):
+        """Treat a missing probe or missing datapoint as healthy so the ramp never stalls forever."""
+        if self.latency_probe is None or self.max_latency is None:
+            return True
+        latency = self.latency_probe()
+        if latency is None:
+            return True
+        print(f"Database latency is {latency}, threshold {self.max_latency}")
+        return latency <= self.max_latency
+
+    def is_young(self, oldest_message_age):
+        return (self.young_backlog_seconds is not None and oldest_message_age is not None
+                and oldest_message_age <= self.young_backlog_seconds)
+
+    def get_pace(self, oldest_message_age):
+        """Number of ticks each stage is held for. An unknown age gets the normal pace."""
+        if (self.old_backlog_seconds is not None and oldest_message_age is not None
+                and oldest_message_age >= self.old_backlog_seconds):
+            return self.slow_pace
+        return 1
+
+    def initial_concurrency(self, backlog, oldest_message_age=None):
+        """Return (concurrency, ramping) to use when the window opens."""
+        # An unknown backlog is treated as a large one.
+        if backlog is not None and backlog <= self.small_backlog:
+            return self.steady_concurrency, False
+        if self.is_young(oldest_message_age):
+            return self.stages[len(self.stages) // 2], True
+        return self.stages[0], True
+
+    def next_concurrency(self, current, backlog, pace=1, ticks_at_stage=1, latency_healthy=None):
+        """Return (concurrency, ramping) for the next tick of a ramping mapping.
+
+        ``ticks_at_stage`` is how many ticks the mapping has spent at ``current``;
+        it moves up only once that reaches ``pace``. ``latency_healthy`` is a
+        probe result shared by every mapping of a tick; without it the probe is read.
+        """
+        if backlog is not None and backlog <= self.small_backlog:
+            return self.steady_concurrency, False
+
+        lower_stages = [stage for stage in self.stages if stage < (current or 0)]
+        higher_stages = [stage for stage in self.stages if stage > (current or 0)]
+        if latency_healthy is None:
+            latency_healthy = self.is_latency_healthy()
+        if not latency_healthy:
+            return (lower_stages[-1] if lower_stages else self.stages[0]), True
+        if not higher_stages:
+            return self.steady_concurrency, False
+        if ticks_at_stage < pace:
+            return current, True
+        return higher_stages[0], True
+
+
+def get_backlog(queue_attributes) -> int:
+    """Messages waiting plus in flight, from GetQueueAttributes."""
+    return sum(int(queue_attributes.get(name, 0)) for name in BACKLOG_ATTRIBUTES)
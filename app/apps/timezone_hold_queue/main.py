@@ -1,5 +1,6 @@
-from datetime import datetime
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from datetime import datetime, timedelta, timezone
+import functools
+import json
 import os
 from common.constants import (
     ENV_START_TIME_HOUR,
@@ -12,27 +13,38 @@ from common.constants import (
     ENV_SAFETY_ZONE_END_MINUTE,
     ENV_HOLIDAY_TABLE_NAME,
     ENV_TARGET_LAMBDA_NAME,
+    ENV_TARGET_LAMBDA_NAMES,
+    ENV_INVENTORY_TABLE_NAME,
+    ENV_INVENTORY_REFRESH_SECONDS,
+    ENV_RAMP_STAGES,
+    ENV_RAMP_SMALL_BACKLOG,
+    ENV_RAMP_LATENCY_METRIC,
+    ENV_RAMP_MAX_LATENCY,
+    ENV_RAMP_YOUNG_BACKLOG_SECONDS,
+    ENV_RAMP_OLD_BACKLOG_SECONDS,
+    ENV_SCHEDULE_CONFIG,
+    ENV_SCHEDULE_CONFIG_PATH,
+    ENV_PRE_WARMER_FUNCTION_NAME,
+    ENV_PRE_WARM_LEAD_MINUTES,
+    ENV_PRE_WARM_INTERVAL_SECONDS,
     HOLIDAY_DATE_STR,
 )
+from common.cloudwatch_client import CloudWatchClient
 from common.dynamodb_service import DynamoDBService
 from common.lambda_client import LambdaClient
+from common.profiling import profiled
+from common.resilience import is_client_error
+from common.sqs_client import SQSClient, get_queue_url_from_arn
+from timezone_hold_queue.concurrency_ramp import BACKLOG_ATTRIBUTES, ConcurrencyRamp, get_backlog
+from timezone_hold_queue.mapping_inventory import MappingInventory
+from timezone_hold_queue.schedule_registry import Schedule, ScheduleRegistry, load_config
 
 # Set up logging
 
-# Initialize the boto3 client for interacting with SQS
+# Initialize the boto3 clients for managing event source mappings and reading queue state
 lambda_client = LambdaClient()
-
-# Timezone mappings based on the last three characters of the queue name
-TIMEZONE_MAP = {
-    'EST': 'America/New_York',
-    'CST': 'America/Chicago',
-    'MST': 'America/Denver',
-    'PST': 'America/Los_Angeles',
-    'EDT': 'America/New_York',
-    'CDT': 'America/Chicago',
-    'MDT': 'America/Denver',
-    'PDT': 'America/Los_Angeles'
-}
+sqs_client = SQSClient()
+cloudwatch_client = CloudWatchClient()
 
 
 START_TIME_HOUR = int(os.getenv(ENV_START_TIME_HOUR, '8'))
@@ -44,24 +56,107 @@ SAFETY_ZONE_START_MINUTE = int(os.getenv(ENV_SAFETY_ZONE_START_MINUTE, '0'))
 SAFETY_ZONE_END_HOUR = int(os.getenv(ENV_SAFETY_ZONE_END_HOUR, '20'))
 SAFETY_ZONE_END_MINUTE = int(os.getenv(ENV_SAFETY_ZONE_END_MINUTE, '30'))
 TARGET_LAMBDA_NAME = os.getenv(ENV_TARGET_LAMBDA_NAME)
+TARGET_LAMBDA_NAMES = [
+    name.strip() for name in os.getenv(ENV_TARGET_LAMBDA_NAMES, TARGET_LAMBDA_NAME or '').split(',') if name.strip()
+]
+INVENTORY_TABLE_NAME = os.getenv(ENV_INVENTORY_TABLE_NAME)
+INVENTORY_REFRESH_SECONDS = int(os.getenv(ENV_INVENTORY_REFRESH_SECONDS, '900'))
+RAMP_STAGES = [int(stage) for stage in os.getenv(ENV_RAMP_STAGES, '').split(',') if stage.strip()]
+RAMP_SMALL_BACKLOG = int(os.getenv(ENV_RAMP_SMALL_BACKLOG, '100'))
+# e.g. {"namespace": "AWS/RDS", "metric_name": "DMLLatency", "dimensions": {"DBClusterIdentifier": "..."}}
+RAMP_LATENCY_METRIC = json.loads(os.getenv(ENV_RAMP_LATENCY_METRIC) or 'null')
+RAMP_MAX_LATENCY = float(os.getenv(ENV_RAMP_MAX_LATENCY)) if os.getenv(ENV_RAMP_MAX_LATENCY) else None
+# Backlogs this young skip the first ramp stages, this old ramp at half speed
+RAMP_YOUNG_BACKLOG_SECONDS = int(os.getenv(ENV_RAMP_YOUNG_BACKLOG_SECONDS, '900'))
+RAMP_OLD_BACKLOG_SECONDS = int(os.getenv(ENV_RAMP_OLD_BACKLOG_SECONDS, '21600'))
 TABLE_NAME = os.getenv(ENV_HOLIDAY_TABLE_NAME)
+SCHEDULE_CONFIG_PATH = os.getenv(
+    ENV_SCHEDULE_CONFIG_PATH, os.path.join(os.path.dirname(__file__), 'schedules.json')
+)
+PRE_WARMER_FUNCTION_NAME = os.getenv(ENV_PRE_WARMER_FUNCTION_NAME)
+PRE_WARM_LEAD = timedelta(minutes=int(os.getenv(ENV_PRE_WARM_LEAD_MINUTES, '15')))
+# Aurora Serverless pauses again after a few idle minutes, so keep warming until the window opens
+PRE_WARM_INTERVAL = timedelta(seconds=int(os.getenv(ENV_PRE_WARM_INTERVAL_SECONDS, '300')))
 # holiday_table = DynamoDBService(TABLE_NAME)
 
+# Compiled once per container, see get_schedule_registry
+schedule_registry = None
+queue_tags_cache = {}
+# When the pre-warmer was last asked to warm for each upcoming window start
+pre_warm_requests = {}
+
+# Kept across warm invocations and mirrored to the inventory table
+mapping_inventory = MappingInventory(
+    lambda_client,
+    TARGET_LAMBDA_NAMES,
+    refresh_seconds=INVENTORY_REFRESH_SECONDS,
+    snapshot_store=DynamoDBService(INVENTORY_TABLE_NAME) if INVENTORY_TABLE_NAME else None,
+)
+
+
+def get_database_latency():
+    """Latest value of the configured database latency metric."""
+    return cloudwatch_client.get_latest_metric_value(
+        RAMP_LATENCY_METRIC['namespace'],
+        RAMP_LATENCY_METRIC['metric_name'],
+        RAMP_LATENCY_METRIC.get('dimensions', {}),
+        statistic=RAMP_LATENCY_METRIC.get('statistic', 'Average'),
+    )
+
+
+# Only used when RAMP_STAGES is set
+concurrency_ramp = ConcurrencyRamp(
+    RAMP_STAGES,
+    small_backlog=RAMP_SMALL_BACKLOG,
+    latency_probe=get_database_latency if RAMP_LATENCY_METRIC else None,
+    max_latency=RAMP_MAX_LATENCY,
+    young_backlog_seconds=RAMP_YOUNG_BACKLOG_SECONDS,
+    old_backlog_seconds=RAMP_OLD_BACKLOG_SECONDS,
+) if RAMP_STAGES else None
+
+# CloudTrail event names that change the set of mappings
+MAPPING_CHANGE_EVENT_PREFIXES = ('CreateEventSourceMapping', 'DeleteEventSourceMapping')
+
 
-def get_current_timezone(queue_name):
-    """Get the timezone based on the last three characters of the queue name."""
-    # Remove the ".fifo" suffix if the queue name ends with it
-    if queue_name.endswith(".fifo"):
-        queue_name = queue_name[:-5]  # Remove the last 5 characters (".fifo")
+def now_utc():
+    """Current time of the controller. Replaced by a fake clock in the simulator."""
+    return datetime.now(timezone.utc)
+
+
+def get_schedule_registry():
+    """Compile the queue schedule registry on first use and reuse it for the life of the container."""
+    global schedule_registry
+    if schedule_registry is None:
+        config = load_config(path=SCHEDULE_CONFIG_PATH, raw=os.getenv(ENV_SCHEDULE_CONFIG))
+        schedule_registry = ScheduleRegistry.from_config(
+            config,
+            default_window=(START_TIME_HOUR, START_TIME_MINUTE, END_TIME_HOUR, END_TIME_MINUTE),
+            fallback_schedule=Schedule(
+                'America/New_York',
+                SAFETY_ZONE_START_HOUR,
+                SAFETY_ZONE_START_MINUTE,
+                SAFETY_ZONE_END_HOUR,
+                SAFETY_ZONE_END_MINUTE,
+            ),
+        )
+    return schedule_registry
+
+
+def get_queue_tags(queue_arn):
+    """Fetch the queue's tags once per container, only when the registry resolves by tag."""
+    if queue_arn not in queue_tags_cache:
+        try:
+            queue_tags_cache[queue_arn] = sqs_client.list_queue_tags(get_queue_url_from_arn(queue_arn))
+        except Exception as e:
+            print(f"Unable to read tags of {queue_arn}: {e}")
+            return None
+    return queue_tags_cache[queue_arn]
 
-    timezone_code = queue_name[-3:].upper()  # Convert the last three characters to uppercase
-    timezone = TIMEZONE_MAP.get(timezone_code)
-    return timezone
 
 def is_current_date_holiday():
     return False
     # Format the current date to 'YYYYMMDD'
-    current_date = datetime.now().date()
+    current_date = now_utc().date()
     current_date_str = current_date.strftime('%Y%m%d')
     
     # Get the item from the DynamoDB table
@@ -73,38 +168,97 @@ def is_current_date_holiday():
         return True
     return False
 
-def is_current_time_within_eligibility_window(timezone):
-    """Check if the current time is within the eligibility window."""
+
+def get_queue_backlog(entry):
+    """Return the number of messages waiting in a mapping's queue, or None if it can't be read."""
     try:
-        tz = ZoneInfo(timezone)
-        current_time = datetime.now(tz)
-        start_time = current_time.replace(hour=START_TIME_HOUR, minute=START_TIME_MINUTE, second=0, microsecond=0)
-        end_time = current_time.replace(hour=END_TIME_HOUR, minute=END_TIME_MINUTE, second=0, microsecond=0)
-    except (ZoneInfoNotFoundError, TypeError) as e:
-        print(f"Invalid timezone: {timezone}. Error: {e}")
-        est_timezone = ZoneInfo('America/New_York')
-        current_time = datetime.now(est_timezone)
-        start_time = current_time.replace(hour=SAFETY_ZONE_START_HOUR, minute=SAFETY_ZONE_START_MINUTE, second=0, microsecond=0)
-        end_time = current_time.replace(hour=SAFETY_ZONE_END_HOUR, minute=SAFETY_ZONE_END_MINUTE, second=0, microsecond=0)
-
-    # Check if today is a holiday or Sunday
-    is_holiday = is_current_date_holiday()
-    is_sunday = current_time.weekday() == 6  # 6 corresponds to Sunday
-
-    if is_sunday or is_holiday:
-        print(f"Today is {'a Sunday' if is_sunday else 'a holiday'}, outside the eligibility window.")
-        return False, current_time
-
-    return start_time <= current_time <= end_time, current_time
-
-
-def enable_event_source_mapping(uuid):
-    """Enable the event source mapping."""
+        attributes = sqs_client.get_queue_attributes(get_queue_url_from_arn(entry['queue_arn']), BACKLOG_ATTRIBUTES)
+        return get_backlog(attributes)
+    except Exception as e:
+        print(f"Unable to read backlog of {entry['queue_name']}: {e}")
+        return None
+
+
+def get_oldest_message_age(entry):
+    """Seconds the oldest message of a mapping's queue has waited, or None if it can't be read."""
+    try:
+        return cloudwatch_client.get_latest_metric_value(
+            'AWS/SQS', 'ApproximateAgeOfOldestMessage', {'QueueName': entry['queue_name']}, statistic='Maximum'
+        )
+    except Exception as e:
+        print(f"Unable to read oldest message age of {entry['queue_name']}: {e}")
+        return None
+
+
+def request_pre_warm(registry, now, schedules):
+    """Ask the pre-warmer to warm the database for the windows of ``schedules`` opening within the lead time.
+
+    The schedules are the ones the registry resolved for the current queues,
+    tags and patterns included, so the database is warmed exactly for the
+    windows the controller is about to open.
+    """
+    if not PRE_WARMER_FUNCTION_NAME:
+        return
+    for window_start in list(pre_warm_requests):
+        if window_start < now:
+            del pre_warm_requests[window_start]
+
+    opening = registry.get_opening_soon(now, schedules, PRE_WARM_LEAD)
+    due = sorted({
+        window_start.astimezone(timezone.utc) for window_start in opening.values()
+        if now - pre_warm_requests.get(window_start, now - PRE_WARM_INTERVAL) >= PRE_WARM_INTERVAL
+    })
+    if not due:
+        return
+    try:
+        lambda_client.invoke_async(PRE_WARMER_FUNCTION_NAME, {'windows': [start.isoformat() for start in due]})
+        print(f"Requested a pre-warm for windows opening at {[start.isoformat() for start in due]}")
+        for window_start in due:
+            pre_warm_requests[window_start] = now
+    except Exception as e:
+        print(f"Unable to request a pre-warm: {e}")
+
+
+def enable_event_source_mapping(uuid, entry=None):
+    """Enable the event source mapping, starting a concurrency ramp when a backlog is waiting."""
+    maximum_concurrency, ramping, ramp_pace = None, False, 1
+    if concurrency_ramp and entry:
+        backlog = get_queue_backlog(entry)
+        # The age only matters for a backlog big enough to ramp
+        oldest_message_age = (
+            get_oldest_message_age(entry) if backlog is None or backlog > concurrency_ramp.small_backlog else None
+        )
+        maximum_concurrency, ramping = concurrency_ramp.initial_concurrency(backlog, oldest_message_age)
+        ramp_pace = concurrency_ramp.get_pace(oldest_message_age)
+        print(f"Opening {entry['queue_name']} with backlog {backlog}, oldest message age {oldest_message_age}s: "
+              f"concurrency {maximum_concurrency}, ramping {ramping}, {ramp_pace} tick(s) per stage")
     response = lambda_client.update_event_source_mapping(
         uuid=uuid,
-        enabled=True
+        enabled=True,
+        maximum_concurrency=maximum_concurrency
     )
     print(f"Enabled event source mapping {uuid}: {response}")
+    mapping_inventory.record_state(uuid, response.get('State', 'Enabling'))
+    if maximum_concurrency is not None:
+        mapping_inventory.update_entry(uuid, max_concurrency=maximum_concurrency, ramping=ramping,
+                                       ramp_pace=ramp_pace, ramp_ticks=1)
+
+
+def step_concurrency_ramp(uuid, entry, latency_healthy=None):
+    """Move a ramping mapping one stage up (or down, if the database is struggling)."""
+    current = entry.get('max_concurrency')
+    ramp_ticks = entry.get('ramp_ticks', 1)
+    maximum_concurrency, ramping = concurrency_ramp.next_concurrency(
+        current, get_queue_backlog(entry), pace=entry.get('ramp_pace', 1), ticks_at_stage=ramp_ticks,
+        latency_healthy=latency_healthy,
+    )
+    if maximum_concurrency != current:
+        lambda_client.update_event_source_mapping(uuid=uuid, maximum_concurrency=maximum_concurrency)
+        print(f"Changed maximum concurrency of {entry['queue_name']} from {current} to {maximum_concurrency}")
+        ramp_ticks = 0
+    mapping_inventory.update_entry(uuid, max_concurrency=maximum_concurrency, ramping=ramping,
+                                   ramp_ticks=ramp_ticks + 1)
+
 
 def disable_event_source_mapping(uuid):
     """Disable the event source mapping."""
@@ -113,49 +267,85 @@ def disable_event_source_mapping(uuid):
         enabled=False
     )
     print(f"Disabled event source mapping {uuid}: {response}")
+    mapping_inventory.record_state(uuid, response.get('State', 'Disabling'))
+    mapping_inventory.update_entry(uuid, ramping=False)
+
 
+def is_mapping_change_event(event):
+    """Whether the invocation comes from the CloudTrail rule watching mapping creation and deletion."""
+    if not isinstance(event, dict) or event.get('source') != 'aws.lambda':
+        return False
+    event_name = event.get('detail', {}).get('eventName', '')
+    return event_name.startswith(MAPPING_CHANGE_EVENT_PREFIXES)
 
+
+@profiled
 def lambda_handler(event, context):
     """Lambda function entry point."""
-    response = lambda_client.get_list_event_source_mappings(
-        target_lambda_name=TARGET_LAMBDA_NAME
-    )
-    print(f"Event source mappings: {response}")
-    queue_uuid_map = {}
-    for mapping in response.get('EventSourceMappings', []):
-        if 'sqs' in mapping.get('EventSourceArn'):
-            queue_name = mapping['EventSourceArn'].split(':')[-1]
-            queue_uuid_map[queue_name] = mapping['UUID']
+    try:
+        return update_mappings(event)
+    finally:
+        # One snapshot write per tick for all the changes it made, even when it failed part way
+        mapping_inventory.flush()
 
-    print(f"Queue UUID map: {queue_uuid_map}")
 
-    for queue_name, uuid  in queue_uuid_map.items():
-        try:
-            queue_name = queue_name.strip()
-            timezone = get_current_timezone(queue_name)
+def update_mappings(event):
+    """Enable or disable every mapping for its eligibility window and step the concurrency ramps."""
+    if is_mapping_change_event(event):
+        print(f"Event source mappings changed: {event['detail']['eventName']}, refreshing inventory")
+        mapping_inventory.invalidate()
 
-            within_window, current_time = is_current_time_within_eligibility_window(timezone)
+    entries = mapping_inventory.get_entries()
+    registry = get_schedule_registry()
+    queue_schedules = {}
+    for uuid, entry in entries.items():
+        try:
+            tags = get_queue_tags(entry['queue_arn']) if registry.tag_key else None
+            queue_schedules[uuid] = registry.resolve(entry['queue_name'], tags)
+        except Exception as e:
+            # One badly configured queue must not stop the tick for the others
+            print(f"Unable to resolve the schedule of {entry['queue_name']}, using the safety schedule: {e}")
+            queue_schedules[uuid] = registry.fallback_schedule
 
+    # Each distinct schedule is evaluated once and shared by every queue using it
+    now = now_utc()
+    holiday = is_current_date_holiday()
+    eligibility = registry.evaluate(now, queue_schedules.values())
+    try:
+        request_pre_warm(registry, now, queue_schedules.values())
+    except Exception as e:
+        # Warming is an optimisation; it must never keep the mappings from being toggled.
+        print(f"Unable to work out the pre-warm windows: {e}")
 
-            print(f"Checking event source mapping for {queue_name} at {current_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+    # The database latency is the same for every ramping mapping, so read it at most once per tick
+    get_ramp_latency_healthy = functools.lru_cache(maxsize=None)(concurrency_ramp.is_latency_healthy) \
+        if concurrency_ramp else None
 
-            current_mapping = lambda_client.get_event_source_mapping(uuid=uuid)
-            mapping_enabled = current_mapping['State'] == 'Enabled'
-            status = "enabled" if mapping_enabled else "disabled"
-            eligibility_window_status = "within" if within_window else "out of"
-            print(f"{queue_name} mapping is {status} and is {eligibility_window_status} eligibility window")
+    for uuid, entry in list(entries.items()):
+        queue_name = entry['queue_name']
+        try:
+            within_window, current_time = eligibility[queue_schedules[uuid]]
+            if holiday:
+                within_window = False
 
+            mapping_enabled = MappingInventory.is_enabled(entry)
             if mapping_enabled and not within_window:
+                print(f"{queue_name} mapping is enabled and is out of eligibility window at {current_time.isoformat()}")
                 disable_event_source_mapping(uuid)
             elif not mapping_enabled and within_window:
-                enable_event_source_mapping(uuid)
-            else:
-                print(f"Queue {queue_name} status is already correct.")
+                print(f"{queue_name} mapping is disabled and is within eligibility window at {current_time.isoformat()}")
+                enable_event_source_mapping(uuid, entry)
+            elif mapping_enabled and entry.get('ramping') and concurrency_ramp:
+                step_concurrency_ramp(uuid, entry, get_ramp_latency_healthy())
         except Exception as e:
-            print(f"Error processing queue {queue_name}: {e}")
+            if is_client_error(e) and e.response['Error']['Code'] == 'ResourceNotFoundException':
+                print(f"Event source mapping {uuid} for {queue_name} no longer exists, dropping it from the inventory")
+                mapping_inventory.remove(uuid)
+            else:
+                print(f"Error processing queue {queue_name}: {e}")
 
     print("Queue policies updated successfully.")
     return {
         'statusCode': 200,
         'body': 'Queue statuses updated successfully.'
-    }
\ No newline at end of file
+    }
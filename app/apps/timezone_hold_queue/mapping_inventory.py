@@ -0,0 +1,127 @@
+import json
+import time
+
+SNAPSHOT_KEY = {'INVENTORY_ID': 'event-source-mappings'}
+ENABLED_STATES = ('Enabled', 'Enabling')
+# Controller-owned concurrency ramp state of an entry, see main.step_concurrency_ramp
+RAMP_STATE_DEFAULTS = {'ramping': False, 'ramp_pace': 1, 'ramp_ticks': 1}
+
+
+class MappingInventory:
+    """Cached queue -> event source mapping inventory for the target functions.
+
+    Entries are keyed by mapping UUID and hold the queue name and ARN, the
+    owning function and the last known mapping state. The inventory lives in
+    memory across warm invocations and is mirrored to a small snapshot so a
+    cold container can start from it instead of listing every mapping.
+    Changes made during a tick only mark the inventory dirty; ``flush`` writes
+    the snapshot once at the end of the tick.
+    """
+
+    def __init__(self, lambda_client, function_names, refresh_seconds=900, snapshot_store=None, clock=time.time):
+        self.lambda_client = lambda_client
+        self.function_names = function_names
+        self.refresh_seconds = refresh_seconds
+        self.snapshot_store = snapshot_store
+        self.clock = clock
+        self.entries = {}
+        self.refreshed_at = None
+        self.dirty = False
+
+    def is_stale(self):
+        return self.refreshed_at is None or self.clock() - self.refreshed_at >= self.refresh_seconds
+
+    def get_entries(self) -> dict:
+        """Return the inventory, loading the snapshot or refreshing only when it is stale."""
+        if self.refreshed_at is None:
+            self.load_snapshot()
+        if self.is_stale():
+            self.refresh()
+        return self.entries
+
+    def invalidate(self):
+        """Force a full refresh on the next read."""
+        self.refreshed_at = None
+        # Don't let the next cold start pick up the outdated snapshot either.
+        if self.snapshot_store:
+            self.save_snapshot()
+
+    def refresh(self):
+        """List every SQS mapping of the target functions, following pagination."""
+        entries = {}
+        for function_name in self.function_names:
+            for mapping in self.lambda_client.list_all_event_source_mappings(target_lambda_name=function_name):
+                queue_arn = mapping.get('EventSourceArn', '')
+                if ':sqs:' not in queue_arn:
+                    continue
+                previous = self.entries.get(mapping['UUID'], {})
+                entries[mapping['UUID']] = {
+                    'queue_name': queue_arn.split(':')[-1].strip(),
+                    'queue_arn': queue_arn,
+                    'function_name': function_name,
+                    'state': mapping.get('State'),
+                    'max_concurrency': mapping.get('ScalingConfig', {}).get('MaximumConcurrency'),
+                    # Controller-owned state is not visible in the API, carry it over.
+                    **{field: previous.get(field, default) for field, default in RAMP_STATE_DEFAULTS.items()},
+                }
+        self.entries = entries
+        self.refreshed_at = self.clock()
+        print(f"Refreshed event source mapping inventory: {len(entries)} SQS mappings")
+        self.save_snapshot()
+
+    def record_state(self, uuid, state):
+        """Remember a state change made by the controller so the next tick needn't read it back."""
+        if uuid in self.entries and self.entries[uuid]['state'] != state:
+            self.entries[uuid]['state'] = state
+            self.dirty = True
+
+    def update_entry(self, uuid, **fields):
+        """Store extra per-mapping state, such as the concurrency ramp stage."""
+        if uuid in self.entries:
+            self.entries[uuid].update(fields)
+            self.dirty = True
+
+    def remove(self, uuid):
+        """Drop a mapping that no longer exists."""
+        if self.entries.pop(uuid, None) is not None:
+            self.dirty = True
+
+    def flush(self):
+        """Write the snapshot if anything changed since the last write."""
+        if self.dirty:
+            self.save_snapshot()
+
+    @staticmethod
+    def is_enabled(entry):
+        return entry['state'] in ENABLED_STATES
+
+    def load_snapshot(self):
+        if not self.snapshot_store:
+            return
+        try:
+            item = self.snapshot_store.get_item(SNAPSHOT_KEY).get('Item')
+        except Exception as e:
+            print(f"Unable to load inventory snapshot: {e}")
+            return
+        if not item or not item.get('refreshed_at'):
+            return
+        # A snapshot taken for a different set of functions is of no use.
+        if json.loads(item.get('function_names', '[]')) != list(self.function_names):
+            return
+        self.entries = json.loads(item['entries'])
+        self.refreshed_at = int(item['refreshed_at'])
+
+    def save_snapshot(self):
+        if not self.snapshot_store:
+            self.dirty = False
+            return
+        try:
+            self.snapshot_store.put_item({
+                **SNAPSHOT_KEY,
+                'refreshed_at': int(self.refreshed_at or 0),
+                'function_names': json.dumps(list(self.function_names)),
+                'entries': json.dumps(self.entries, separators=(',', ':')),
+            })
+            self.dirty = False
+        except Exception as e:
+            print(f"Unable to save inventory snapshot: {e}")
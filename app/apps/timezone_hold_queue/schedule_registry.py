@@ -0,0 +1,216 @@
+import json
+import os
+import re
+from datetime import timedelta
+from fnmatch import translate
+from typing import NamedTuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from common.constants import TIMEZONE_MAP
+
+FIFO_SUFFIX = ".fifo"
+SUNDAY = 6
+
+
+class Schedule(NamedTuple):
+    """Eligibility window of a queue, expressed in local time of an IANA zone."""
+    zone: str
+    start_hour: int
+    start_minute: int
+    end_hour: int
+    end_minute: int
+    skip_sundays: bool = True
+
+
+def parse_time(value, is_end=False):
+    """Parse an "HH:MM" string into an (hour, minute) tuple. Raises ValueError when malformed.
+
+    "24:00" is accepted only as the end of a window, meaning the end of the day.
+    """
+    hour, minute = value.split(":")
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour <= 23 and 0 <= minute <= 59) and not (is_end and (hour, minute) == (24, 0)):
+        raise ValueError(f"Time out of range: {value}")
+    return hour, minute
+
+
+def strip_fifo_suffix(queue_name):
+    if queue_name.endswith(FIFO_SUFFIX):
+        return queue_name[:-len(FIFO_SUFFIX)]
+    return queue_name
+
+
+class ScheduleRegistry:
+    """Maps queues to schedules and evaluates eligibility once per distinct schedule.
+
+    Queues are resolved in this order: an explicit queue entry, queue tags,
+    configured name patterns, the legacy three-letter timezone suffix, and
+    finally the safety schedule.
+    """
+
+    def __init__(self, default_window, fallback_schedule, queues=None, patterns=None, tag_key=None,
+                 window_tag_key=None, is_holiday=None):
+        self.default_window = default_window
+        self.fallback_schedule = fallback_schedule
+        self.queues = {}
+        self.patterns = []
+        self.tag_key = tag_key
+        self.window_tag_key = window_tag_key
+        self.is_holiday = is_holiday
+        self.zones = {}
+        self.resolved = {}
+
+        for queue_name, entry in (queues or {}).items():
+            self.queues[strip_fifo_suffix(queue_name)] = self.compile_schedule(entry)
+        for entry in patterns or []:
+            self.patterns.append((re.compile(translate(entry["pattern"].lower())), self.compile_schedule(entry)))
+        # Keep the historical "<name>EST" naming convention working.
+        for code, zone in TIMEZONE_MAP.items():
+            self.patterns.append((re.compile(translate(f"*{code.lower()}")), self.compile_schedule({"zone": zone})))
+        self.get_zone(fallback_schedule.zone)
+
+    @classmethod
+    def from_config(cls, config, default_window, fallback_schedule, is_holiday=None):
+        """Build a registry from a config dict (see ``load_config``)."""
+        if "default_window" in config:
+            start_hour, start_minute = parse_time(config["default_window"]["start"])
+            end_hour, end_minute = parse_time(config["default_window"]["end"], is_end=True)
+            default_window = (start_hour, start_minute, end_hour, end_minute)
+        return cls(
+            default_window,
+            fallback_schedule,
+            queues=config.get("queues"),
+            patterns=config.get("patterns"),
+            tag_key=config.get("tag_key"),
+            window_tag_key=config.get("window_tag_key"),
+            is_holiday=is_holiday,
+        )
+
+    def get_zone(self, zone_name):
+        """Return a cached ZoneInfo, or None when the zone is unknown."""
+        if zone_name not in self.zones:
+            try:
+                self.zones[zone_name] = ZoneInfo(zone_name)
+            except (ZoneInfoNotFoundError, TypeError, ValueError) as e:
+                print(f"Invalid timezone: {zone_name}. Error: {e}")
+                self.zones[zone_name] = None
+        return self.zones[zone_name]
+
+    def compile_schedule(self, entry):
+        """Turn a config entry into a Schedule, falling back to the safety schedule on a bad zone."""
+        zone = entry.get("zone")
+        if zone is None or self.get_zone(zone) is None:
+            return self.fallback_schedule
+
+        start_hour, start_minute, end_hour, end_minute = self.default_window
+        if "start" in entry:
+            start_hour, start_minute = parse_time(entry["start"])
+        if "end" in entry:
+            end_hour, end_minute = parse_time(entry["end"], is_end=True)
+        return Schedule(zone, start_hour, start_minute, end_hour, end_minute, entry.get("skip_sundays", True))
+
+    def resolve_from_tags(self, tags):
+        """Schedule from queue tags, or None so the patterns apply when the tags are missing or malformed."""
+        if not tags or not self.tag_key or self.tag_key not in tags:
+            return None
+        zone = tags[self.tag_key]
+        if self.get_zone(zone) is None:
+            print(f"Ignoring {self.tag_key} tag with unknown timezone: {zone}")
+            return None
+        entry = {"zone": zone}
+        if self.window_tag_key and self.window_tag_key in tags:
+            try:
+                entry["start"], entry["end"] = tags[self.window_tag_key].split("-")
+                return self.compile_schedule(entry)
+            except ValueError as e:
+                print(f"Ignoring malformed {self.window_tag_key} tag {tags[self.window_tag_key]!r}: {e}")
+                return None
+        return self.compile_schedule(entry)
+
+    def resolve(self, queue_name, tags=None) -> Schedule:
+        """Return the schedule of a queue. Results are cached for the life of the container."""
+        cache_key = (queue_name, tuple(sorted(tags.items())) if tags else None)
+        schedule = self.resolved.get(cache_key)
+        if schedule is not None:
+            return schedule
+
+        name = strip_fifo_suffix(queue_name.strip())
+        schedule = self.queues.get(name) or self.resolve_from_tags(tags)
+        if schedule is None:
+            lowered = name.lower()
+            for pattern, candidate in self.patterns:
+                if pattern.match(lowered):
+                    schedule = candidate
+                    break
+        if schedule is None:
+            schedule = self.fallback_schedule
+
+        self.resolved[cache_key] = schedule
+        return schedule
+
+    def is_closed_day(self, schedule, day):
+        """Whether the schedule keeps its queues closed all of ``day`` (a local date)."""
+        if schedule.skip_sundays and day.weekday() == SUNDAY:
+            return True
+        return bool(self.is_holiday and self.is_holiday(day))
+
+    def is_within_window(self, schedule, now):
+        """Return (within_window, local_time) for one schedule at the aware datetime ``now``."""
+        current_time = now.astimezone(self.get_zone(schedule.zone))
+        if self.is_closed_day(schedule, current_time.date()):
+            return False, current_time
+
+        # Compare wall-clock seconds of the day rather than building two datetimes per check.
+        seconds_of_day = (current_time.hour * 3600 + current_time.minute * 60 + current_time.second
+                          + current_time.microsecond / 1e6)
+        start_seconds = schedule.start_hour * 3600 + schedule.start_minute * 60
+        end_seconds = schedule.end_hour * 3600 + schedule.end_minute * 60
+        return start_seconds <= seconds_of_day <= end_seconds, current_time
+
+    def get_next_window_start(self, schedule, now):
+        """Return the next start of the schedule's window that is not before ``now``, skipping closed days."""
+        local_now = now.astimezone(self.get_zone(schedule.zone))
+        window_start = local_now.replace(hour=schedule.start_hour, minute=schedule.start_minute, second=0,
+                                         microsecond=0)
+        if window_start < local_now:
+            window_start += timedelta(days=1)
+        # A week is enough to get past Sundays and holidays; more closed days than that means no upcoming window.
+        for _ in range(7):
+            if not self.is_closed_day(schedule, window_start.date()):
+                return window_start
+            window_start += timedelta(days=1)
+        return None
+
+    def get_opening_soon(self, now, schedules, lead):
+        """Return {schedule: window start} for the distinct schedules whose window opens within ``lead``."""
+        opening = {}
+        for schedule in set(schedules):
+            window_start = self.get_next_window_start(schedule, now)
+            if window_start is not None and window_start - now <= lead:
+                opening[schedule] = window_start
+        return opening
+
+    def evaluate(self, now, schedules):
+        """Evaluate every distinct schedule once and return {schedule: (within_window, local_time)}."""
+        return {schedule: self.is_within_window(schedule, now) for schedule in set(schedules)}
+
+
+def load_config(path=None, raw=None):
+    """Load registry config from a JSON string or file. Returns an empty config when neither is set.
+
+    Example::
+
+        {
+            "default_window": {"start": "08:00", "end": "20:30"},
+            "queues": {"billing-queue.fifo": {"zone": "Europe/London", "start": "07:00"}},
+            "patterns": [{"pattern": "*-apac-*", "zone": "Asia/Singapore"}],
+            "tag_key": "timezone",
+            "window_tag_key": "eligibility-window"
+        }
+    """
+    if raw:
+        return json.loads(raw)
+    if path and os.path.exists(path):
+        with open(path) as config_file:
+            return json.load(config_file)
+    return {}
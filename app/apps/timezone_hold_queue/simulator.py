@@ -0,0 +1,168 @@
+"""Replay the timezone controller over a date range with a fake clock.
+
+Example::
+
+    PYTHONPATH=apps python -m timezone_hold_queue.simulator \\
+        --start 2024-01-01 --end 2025-01-01 \\
+        --queue orders-queueEST.fifo --queue orders-queuePST.fifo
+"""
+import argparse
+import contextlib
+import csv
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# The controller module creates boto3 clients at import time; the simulator never calls them.
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from timezone_hold_queue import main  # noqa: E402
+from timezone_hold_queue.mapping_inventory import MappingInventory  # noqa: E402
+
+SIMULATED_FUNCTION_NAME = 'simulated-consumer'
+
+
+class FakeClock:
+    """Minute-resolution clock shared by the controller and its inventory."""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def timestamp(self):
+        return self.current.timestamp()
+
+    def advance(self, step):
+        self.current += step
+
+
+class InMemoryLambdaClient:
+    """Event source mapping store with the LambdaClient interface. Counts every API call."""
+
+    def __init__(self, queue_names, account_id='123456789012', region='us-east-1'):
+        self.mappings = {}
+        self.api_calls = Counter()
+        for index, queue_name in enumerate(queue_names):
+            self.mappings[f'uuid-{index}'] = {
+                'UUID': f'uuid-{index}',
+                'EventSourceArn': f'arn:aws:sqs:{region}:{account_id}:{queue_name}',
+                'State': 'Disabled',
+            }
+
+    def get_list_event_source_mappings(self, target_lambda_name):
+        self.api_calls['ListEventSourceMappings'] += 1
+        return {'EventSourceMappings': [dict(mapping) for mapping in self.mappings.values()]}
+
+    def list_all_event_source_mappings(self, target_lambda_name):
+        return self.get_list_event_source_mappings(target_lambda_name)['EventSourceMappings']
+
+    def get_event_source_mapping(self, uuid):
+        self.api_calls['GetEventSourceMapping'] += 1
+        return dict(self.mappings[uuid])
+
+    def update_event_source_mapping(self, uuid, enabled=None, maximum_concurrency=None):
+        self.api_calls['UpdateEventSourceMapping'] += 1
+        mapping = self.mappings[uuid]
+        if enabled is not None:
+            # Transitions complete instantly in the simulation.
+            mapping['State'] = 'Enabled' if enabled else 'Disabled'
+        if maximum_concurrency is not None:
+            mapping['ScalingConfig'] = {'MaximumConcurrency': maximum_concurrency}
+        return dict(mapping)
+
+
+class NullWriter:
+    """Discards the controller's log output, which would dominate the run time otherwise."""
+
+    def write(self, _):
+        return 0
+
+    def flush(self):
+        pass
+
+
+class SimulationResult:
+    def __init__(self, transitions, api_calls, ticks, elapsed_seconds):
+        self.transitions = transitions
+        self.api_calls = api_calls
+        self.ticks = ticks
+        self.elapsed_seconds = elapsed_seconds
+
+    @property
+    def total_api_calls(self):
+        return sum(self.api_calls.values())
+
+
+def simulate(queue_names, start, end, step=timedelta(minutes=1), inventory_refresh_seconds=900, quiet=True):
+    """Run one controller tick per ``step`` from ``start`` to ``end`` (aware datetimes).
+
+    Returns every enable/disable transition as (time, queue_name, state)
+    together with the number of Lambda API calls the controller made.
+    """
+    clock = FakeClock(start)
+    lambda_client = InMemoryLambdaClient(queue_names)
+    inventory = MappingInventory(
+        lambda_client,
+        [SIMULATED_FUNCTION_NAME],
+        refresh_seconds=inventory_refresh_seconds,
+        clock=clock.timestamp,
+    )
+
+    transitions = []
+    states = {uuid: mapping['State'] for uuid, mapping in lambda_client.mappings.items()}
+    ticks = 0
+    started_at = time.perf_counter()
+    output = NullWriter() if quiet else sys.stdout
+
+    with patch.multiple(main, lambda_client=lambda_client, mapping_inventory=inventory,
+                        now_utc=clock.now, concurrency_ramp=None), contextlib.redirect_stdout(output):
+        while clock.current < end:
+            main.lambda_handler({}, None)
+            for uuid, mapping in lambda_client.mappings.items():
+                if mapping['State'] != states[uuid]:
+                    states[uuid] = mapping['State']
+                    queue_name = mapping['EventSourceArn'].split(':')[-1]
+                    transitions.append((clock.current, queue_name, mapping['State']))
+            ticks += 1
+            clock.advance(step)
+
+    return SimulationResult(transitions, lambda_client.api_calls, ticks, time.perf_counter() - started_at)
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', required=True, type=parse_date, help='UTC start date, e.g. 2024-01-01')
+    parser.add_argument('--end', required=True, type=parse_date, help='UTC end date (exclusive)')
+    parser.add_argument('--queue', action='append', required=True, dest='queues', help='queue name, repeatable')
+    parser.add_argument('--step-minutes', type=int, default=1)
+    parser.add_argument('--output', help='write transitions to this CSV file')
+    args = parser.parse_args(argv)
+
+    result = simulate(args.queues, args.start, args.end, step=timedelta(minutes=args.step_minutes))
+
+    if args.output:
+        with open(args.output, 'w', newline='') as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow(['time', 'queue_name', 'state'])
+            for moment, queue_name, state in result.transitions:
+                writer.writerow([moment.isoformat(), queue_name, state])
+    else:
+        for moment, queue_name, state in result.transitions:
+            print(f"{moment.isoformat()} {queue_name} {state}")
+
+    print(f"Ticks: {result.ticks}, transitions: {len(result.transitions)}, "
+          f"API calls: {result.total_api_calls} {dict(result.api_calls)}, "
+          f"elapsed: {result.elapsed_seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,46 @@
+from timezone_hold_queue.concurrency_ramp import ConcurrencyRamp, get_backlog
+
+
+def test_small_backlog_skips_ramp():
+    ramp = ConcurrencyRamp([2, 5, 10], small_backlog=100)
+    assert ramp.initial_concurrency(50) == (10, False)
+    assert ramp.initial_concurrency(5000) == (2, True)
+    assert ramp.initial_concurrency(None) == (2, True)
+
+
+def test_ramp_steps_up_while_healthy():
+    ramp = ConcurrencyRamp([2, 5, 10], small_backlog=100, latency_probe=lambda: 10, max_latency=50)
+    assert ramp.next_concurrency(2, 5000) == (5, True)
+    assert ramp.next_concurrency(5, 5000) == (10, True)
+    assert ramp.next_concurrency(10, 5000) == (10, False)
+
+
+def test_ramp_steps_down_when_latency_is_unhealthy():
+    ramp = ConcurrencyRamp([2, 5, 10], small_backlog=100, latency_probe=lambda: 200, max_latency=50)
+    assert ramp.next_concurrency(5, 5000) == (2, True)
+    assert ramp.next_concurrency(2, 5000) == (2, True)
+
+
+def test_ramp_finishes_once_backlog_is_drained():
+    ramp = ConcurrencyRamp([2, 5, 10], small_backlog=100)
+    assert ramp.next_concurrency(2, 10) == (10, False)
+
+
+def test_get_backlog():
+    assert get_backlog({'ApproximateNumberOfMessages': '7', 'ApproximateNumberOfMessagesNotVisible': '3'}) == 10
+
+
+def test_backlog_age_sets_the_start_and_pace():
+    ramp = ConcurrencyRamp([2, 5, 10], small_backlog=100, young_backlog_seconds=900, old_backlog_seconds=21600)
+
+    # Fresh traffic starts half way up, an overnight backlog at the bottom
+    assert ramp.initial_concurrency(5000, oldest_message_age=60) == (5, True)
+    assert ramp.initial_concurrency(5000, oldest_message_age=40000) == (2, True)
+    assert ramp.initial_concurrency(5000, oldest_message_age=None) == (2, True)
+    assert ramp.get_pace(60) == 1
+    assert ramp.get_pace(None) == 1
+    assert ramp.get_pace(40000) == 2
+
+    # An old backlog holds each stage for two ticks
+    assert ramp.next_concurrency(2, 5000, pace=2, ticks_at_stage=1) == (2, True)
+    assert ramp.next_concurrency(2, 5000, pace=2, ticks_at_stage=2) == (5, True)
@@ -0,0 +1,94 @@
+import os
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from timezone_hold_queue import main
+from timezone_hold_queue.concurrency_ramp import ConcurrencyRamp
+
+
+@patch.object(main, 'PRE_WARMER_FUNCTION_NAME', 'pre-warmer')
+@patch.object(main, 'pre_warm_requests', {})
+@patch.object(main, 'lambda_client')
+def test_request_pre_warm_once_per_interval_for_resolved_schedules(mock_lambda_client):
+    registry = main.get_schedule_registry()
+    schedules = [registry.resolve(name) for name in ('orders-queueEST.fifo', 'orders-queuePST.fifo')]
+    # Monday 07:50 in New York, 04:50 in Los Angeles
+    now = datetime(2024, 3, 4, 12, 50, tzinfo=timezone.utc)
+
+    main.request_pre_warm(registry, now, schedules)
+    main.request_pre_warm(registry, now + timedelta(minutes=1), schedules)
+    main.request_pre_warm(registry, now + timedelta(minutes=5), schedules)
+
+    assert mock_lambda_client.invoke_async.call_count == 2
+    function_name, payload = mock_lambda_client.invoke_async.call_args[0]
+    assert function_name == 'pre-warmer'
+    assert payload == {'windows': ['2024-03-04T13:00:00+00:00']}
+
+
+@patch.object(main, 'mapping_inventory')
+@patch.object(main, 'lambda_client')
+def test_unresolvable_queue_uses_safety_schedule_without_stopping_the_tick(mock_lambda_client, mock_mapping_inventory):
+    registry = main.get_schedule_registry()
+    mock_mapping_inventory.get_entries.return_value = {
+        'uuid-bad': {'queue_name': 'bad-queue', 'queue_arn': 'arn:aws:sqs:us-east-1:123456789012:bad-queue',
+                     'state': 'Disabled'},
+        'uuid-good': {'queue_name': 'good-queueEST', 'queue_arn': 'arn:aws:sqs:us-east-1:123456789012:good-queueEST',
+                      'state': 'Disabled'},
+    }
+    mock_lambda_client.update_event_source_mapping.return_value = {}
+    real_resolve = registry.resolve
+
+    def resolve(queue_name, tags=None):
+        if queue_name == 'bad-queue':
+            raise ValueError('bad tag')
+        return real_resolve(queue_name, tags)
+
+    # Monday 15:00 in New York: inside both the regular and the safety window
+    with patch.object(registry, 'resolve', side_effect=resolve), \
+            patch.object(main, 'now_utc', return_value=datetime(2024, 3, 4, 20, 0, tzinfo=timezone.utc)):
+        main.lambda_handler({}, None)
+
+    enabled = {call.kwargs['uuid'] for call in mock_lambda_client.update_event_source_mapping.call_args_list}
+    assert enabled == {'uuid-bad', 'uuid-good'}
+
+
+@patch.object(main, 'PRE_WARMER_FUNCTION_NAME', 'pre-warmer')
+@patch.object(main, 'mapping_inventory')
+@patch.object(main, 'lambda_client')
+def test_failed_pre_warm_does_not_stop_the_tick(mock_lambda_client, mock_mapping_inventory):
+    registry = main.get_schedule_registry()
+    mock_mapping_inventory.get_entries.return_value = {
+        'uuid-good': {'queue_name': 'good-queueEST', 'queue_arn': 'arn:aws:sqs:us-east-1:123456789012:good-queueEST',
+                      'state': 'Disabled'},
+    }
+    mock_lambda_client.update_event_source_mapping.return_value = {}
+
+    with patch.object(registry, 'get_opening_soon', side_effect=ValueError('hour must be in 0..23')), \
+            patch.object(main, 'now_utc', return_value=datetime(2024, 3, 4, 20, 0, tzinfo=timezone.utc)):
+        main.lambda_handler({}, None)
+
+    enabled = {call.kwargs['uuid'] for call in mock_lambda_client.update_event_source_mapping.call_args_list}
+    assert enabled == {'uuid-good'}
+
+
+@patch.object(main, 'get_queue_backlog', return_value=5000)
+@patch.object(main, 'mapping_inventory')
+@patch.object(main, 'lambda_client')
+def test_database_latency_is_read_once_per_tick(mock_lambda_client, mock_mapping_inventory, mock_get_queue_backlog):
+    probe_calls = []
+    ramp = ConcurrencyRamp([2, 5, 10], small_backlog=100, max_latency=50,
+                           latency_probe=lambda: probe_calls.append(1) or 10)
+    mock_mapping_inventory.get_entries.return_value = {
+        uuid: {'queue_name': f'{uuid}-queueEST', 'queue_arn': f'arn:aws:sqs:us-east-1:123456789012:{uuid}-queueEST',
+               'state': 'Enabled', 'ramping': True, 'max_concurrency': 2}
+        for uuid in ('uuid-1', 'uuid-2', 'uuid-3')
+    }
+
+    with patch.object(main, 'concurrency_ramp', ramp), \
+            patch.object(main, 'now_utc', return_value=datetime(2024, 3, 4, 20, 0, tzinfo=timezone.utc)):
+        main.lambda_handler({}, None)
+
+    assert len(probe_calls) == 1
+    assert mock_lambda_client.update_event_source_mapping.call_count == 3
@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock
+
+from timezone_hold_queue.mapping_inventory import MappingInventory
+
+
+class FakeSnapshotStore:
+    def __init__(self):
+        self.item = None
+
+    def get_item(self, key):
+        return {'Item': self.item} if self.item else {}
+
+    def put_item(self, item):
+        self.item = dict(item)
+
+
+def make_lambda_client():
+    lambda_client = MagicMock()
+    lambda_client.list_all_event_source_mappings.side_effect = lambda target_lambda_name: [
+        {
+            'UUID': f'{target_lambda_name}-uuid',
+            'EventSourceArn': f'arn:aws:sqs:us-east-1:123456789012:{target_lambda_name}-queueEST.fifo',
+            'State': 'Disabled',
+        },
+        {
+            'UUID': f'{target_lambda_name}-stream',
+            'EventSourceArn': 'arn:aws:kinesis:us-east-1:123456789012:stream/other',
+            'State': 'Enabled',
+        },
+    ]
+    return lambda_client
+
+
+def test_inventory_covers_all_functions_and_is_cached():
+    now = [0]
+    lambda_client = make_lambda_client()
+    inventory = MappingInventory(lambda_client, ['fn-a', 'fn-b'], refresh_seconds=900, clock=lambda: now[0])
+
+    entries = inventory.get_entries()
+    assert set(entries) == {'fn-a-uuid', 'fn-b-uuid'}
+    assert entries['fn-a-uuid']['queue_name'] == 'fn-a-queueEST.fifo'
+
+    now[0] = 60
+    inventory.get_entries()
+    assert lambda_client.list_all_event_source_mappings.call_count == 2
+
+    now[0] = 900
+    inventory.get_entries()
+    assert lambda_client.list_all_event_source_mappings.call_count == 4
+
+
+def test_inventory_restores_from_snapshot():
+    store = FakeSnapshotStore()
+    first = MappingInventory(make_lambda_client(), ['fn-a'], snapshot_store=store, clock=lambda: 100)
+    first.get_entries()
+    first.record_state('fn-a-uuid', 'Enabling')
+    first.flush()
+
+    lambda_client = make_lambda_client()
+    second = MappingInventory(lambda_client, ['fn-a'], snapshot_store=store, clock=lambda: 200)
+
+    entries = second.get_entries()
+    assert MappingInventory.is_enabled(entries['fn-a-uuid'])
+    lambda_client.list_all_event_source_mappings.assert_not_called()
+
+
+def test_invalidate_forces_refresh():
+    lambda_client = make_lambda_client()
+    inventory = MappingInventory(lambda_client, ['fn-a'], clock=lambda: 0)
+    inventory.get_entries()
+
+    inventory.invalidate()
+    inventory.get_entries()
+
+    assert lambda_client.list_all_event_source_mappings.call_count == 2
+
+
+def test_changes_are_saved_once_on_flush():
+    store = FakeSnapshotStore()
+    store.put_item = MagicMock(side_effect=store.put_item)
+    inventory = MappingInventory(make_lambda_client(), ['fn-a'], snapshot_store=store, clock=lambda: 100)
+    inventory.get_entries()
+    store.put_item.reset_mock()
+
+    inventory.record_state('fn-a-uuid', 'Enabling')
+    inventory.update_entry('fn-a-uuid', max_concurrency=2, ramping=True)
+    store.put_item.assert_not_called()
+
+    inventory.flush()
+    inventory.flush()
+    assert store.put_item.call_count == 1
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+from timezone_hold_queue.schedule_registry import Schedule, ScheduleRegistry
+
+DEFAULT_WINDOW = (8, 0, 20, 30)
+FALLBACK = Schedule('America/New_York', 14, 0, 20, 30)
+
+
+def make_registry(**kwargs):
+    return ScheduleRegistry(DEFAULT_WINDOW, FALLBACK, **kwargs)
+
+
+def test_resolve_legacy_suffix():
+    registry = make_registry()
+    assert registry.resolve("MyQueuePST").zone == "America/Los_Angeles"
+    assert registry.resolve("my-queue-cst.fifo").zone == "America/Chicago"
+    assert registry.resolve("MyQueueXYZ") == FALLBACK
+
+
+def test_resolve_precedence():
+    registry = make_registry(
+        queues={"billing.fifo": {"zone": "Europe/London", "start": "07:00", "end": "19:00"}},
+        patterns=[{"pattern": "*-apac-*", "zone": "Asia/Singapore"}],
+        tag_key="timezone",
+    )
+
+    assert registry.resolve("billing.fifo") == Schedule("Europe/London", 7, 0, 19, 0)
+    assert registry.resolve("orders-apac-est.fifo").zone == "Asia/Singapore"
+    assert registry.resolve("orders-est", tags={"timezone": "Asia/Tokyo"}).zone == "Asia/Tokyo"
+    assert registry.resolve("orders", tags={"timezone": "Not/AZone"}) == FALLBACK
+
+
+def test_evaluate_shares_schedules():
+    registry = make_registry()
+    schedules = [registry.resolve(name) for name in ("aEST", "bEDT", "cPST")]
+
+    # Monday 12:00 in New York, 09:00 in Los Angeles
+    eligibility = registry.evaluate(datetime(2024, 3, 4, 16, 0, tzinfo=timezone.utc), schedules)
+
+    assert len(eligibility) == 2
+    assert all(within for within, _ in eligibility.values())
+
+
+def test_evaluate_outside_window_and_sunday():
+    registry = make_registry()
+    schedule = registry.resolve("aEST")
+
+    within, local_time = registry.is_within_window(schedule, datetime(2024, 3, 5, 2, 0, tzinfo=timezone.utc))
+    assert not within
+    assert local_time.hour == 21
+
+    # Sunday 12:00 in New York
+    within, _ = registry.is_within_window(schedule, datetime(2024, 3, 3, 17, 0, tzinfo=timezone.utc))
+    assert not within
+
+
+def test_get_opening_soon_skips_open_windows_and_sundays():
+    registry = make_registry(queues={"billing.fifo": {"zone": "Europe/London", "start": "07:00"}})
+    schedules = [registry.resolve(name) for name in ("aEST", "bPST", "billing.fifo")]
+    lead = timedelta(minutes=15)
+
+    # Monday 07:50 in New York, 04:50 in Los Angeles, 12:50 in London
+    opening = registry.get_opening_soon(datetime(2024, 3, 4, 12, 50, tzinfo=timezone.utc), schedules, lead)
+    assert {schedule.zone for schedule in opening} == {"America/New_York"}
+    assert opening[registry.resolve("aEST")] == datetime(2024, 3, 4, 13, 0, tzinfo=timezone.utc)
+
+    # Monday 06:50 in London, a queue-specific start
+    opening = registry.get_opening_soon(datetime(2024, 3, 4, 6, 50, tzinfo=timezone.utc), schedules, lead)
+    assert {schedule.zone for schedule in opening} == {"Europe/London"}
+
+    # Sunday 07:50 in New York: closed, the next window is Monday's
+    assert registry.get_opening_soon(datetime(2024, 3, 3, 12, 50, tzinfo=timezone.utc), schedules, lead) == {}
+
+
+def test_malformed_tags_fall_back_to_patterns():
+    registry = make_registry(tag_key="timezone", window_tag_key="eligibility-window")
+
+    for tags in (
+        {"timezone": "Asia/Tokyo", "eligibility-window": "0900"},
+        {"timezone": "Asia/Tokyo", "eligibility-window": "09:00-late"},
+        {"timezone": "Asia/Tokyo", "eligibility-window": "25:00-26:00"},
+        {"timezone": "Asia/Tokyo", "eligibility-window": "24:00-24:00"},
+        {"timezone": "Asia/Tokyo", "eligibility-window": "09:00-24:30"},
+        {"timezone": "Not/AZone"},
+        {"timezone": "../etc"},
+    ):
+        assert registry.resolve("orders-pst.fifo", tags=tags).zone == "America/Los_Angeles"
+        assert registry.resolve("orders", tags=tags) == FALLBACK
+
+    tags = {"timezone": "Asia/Tokyo", "eligibility-window": "09:00-17:00"}
+    assert registry.resolve("orders-pst.fifo", tags=tags) == Schedule("Asia/Tokyo", 9, 0, 17, 0)
+    tags = {"timezone": "Asia/Tokyo", "eligibility-window": "09:00-24:00"}
+    assert registry.resolve("orders-pst.fifo", tags=tags) == Schedule("Asia/Tokyo", 9, 0, 24, 0)
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+from timezone_hold_queue.simulator import simulate
+
+
+def test_simulate_across_sunday_and_dst_change():
+    # US daylight saving time starts on Sunday 2024-03-10
+    result = simulate(
+        ['ordersEST.fifo'],
+        datetime(2024, 3, 9, 2, 0, tzinfo=timezone.utc),
+        datetime(2024, 3, 12, tzinfo=timezone.utc),
+    )
+
+    assert result.transitions == [
+        (datetime(2024, 3, 9, 13, 0, tzinfo=timezone.utc), 'ordersEST.fifo', 'Enabled'),
+        (datetime(2024, 3, 10, 1, 31, tzinfo=timezone.utc), 'ordersEST.fifo', 'Disabled'),
+        (datetime(2024, 3, 11, 12, 0, tzinfo=timezone.utc), 'ordersEST.fifo', 'Enabled'),
+    ]
+    assert result.api_calls['UpdateEventSourceMapping'] == 3
+    assert result.ticks == 3 * 24 * 60 - 120
@@ -22,7 +22,10 @@ class LocalBundle:
         if self.is_pip_install:
             subprocess.run(
                 ["pip3", "install", "-r", os.path.join(cwd, f"apps/{self.module_name}/requirements.txt"), "-t",
-                 output_dir])
+                 output_dir,
+                 # Compiled dependencies must be the Lambda runtime's wheels, not the build machine's
+                 "--platform", "manylinux2014_x86_64", "--implementation", "cp", "--python-version", "3.9",
+                 "--only-binary=:all:"])
 
         subprocess.run(["cp", "-r", os.path.join(cwd, f"apps/{self.module_name}"), output_dir])
 
@@ -173,6 +176,18 @@ class AwsSqsResource(SpecificAwsResource):
 
         return output_queue, dead_letter_queue
 
+    def create_priority_fifo_queues(self, queue_name, stack, priorities, visibility_timeout=None):
+        """One FIFO queue and DLQ pair per priority lane, keyed by priority.
+
+        The first lane keeps the bare queue name, so an existing queue becomes
+        the highest-priority lane in place; the others get a -<priority> suffix.
+        """
+        lanes = {}
+        for index, priority in enumerate(priorities):
+            lane_name = queue_name if index == 0 else f"{queue_name}-{priority}"
+            lanes[priority], _ = self.create_fifo_queue(lane_name, stack, visibility_timeout=visibility_timeout)
+        return lanes
+
     def create_single_queue(self, name, stack):
         single_queue = cdk.aws_sqs.Queue(stack, self.create_resource_id(name),
                                          queue_name=self.create_resource_name(name))
@@ -234,6 +249,12 @@ class AwsEventBusResource(SpecificAwsResource):
     def __init__(self, base_resource):
         super().__init__("event-bus", base_resource)
 
+    def create_event_bus(self, bus_name, stack):
+        event_bus = cdk.aws_events.EventBus(stack, self.create_resource_id(bus_name),
+                                            event_bus_name=self.create_resource_name(bus_name))
+        stack.export_value(event_bus.event_bus_arn)
+        return event_bus
+
 
 class AwsEventRuleResource(SpecificAwsResource):
     def __init__(self, base_resource):
@@ -1,6 +1,12 @@
+import hashlib
+import os
+
 from aws_cdk import (
+    CustomResource,
     Duration,
+    RemovalPolicy,
     Stack,
+    aws_s3 as s3,
     aws_events as events,
     aws_events_targets as targets,
     aws_sqs as sqs,
@@ -9,6 +15,7 @@ from aws_cdk import (
     aws_rds as rds,
     aws_ec2 as ec2,
     aws_iam as iam,
+    custom_resources,
 )
 from constructs import Construct
 from cdk.common.execution_context import ExecutionContext
@@ -16,20 +23,60 @@ from apps.common.constants import (
     ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN,
     ENV_RANDOM_SYSTEM_DB_SECRET_ARN,
     ENV_RANDOM_SYSTEM_DB_NAME,
-    ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL
+    ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL,
+    ENV_PAYLOAD_BUCKET_NAME,
+    ENV_HISTORY_RETENTION_DAYS,
+    ENV_HISTORY_PREMAKE_DAYS,
+    ENV_MESSAGE_CODEC,
+    ENV_REFERENCE_CACHE_TTL_SECONDS,
+    ENV_REFERENCE_CACHE_MAX_SIZE,
+    ENV_RDS_DATA_MAX_ATTEMPTS,
+    HISTORY_EVENT_SOURCE,
+    PRIORITY_FIELD,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    TRACE_CONTEXT_FIELD,
+    TRACE_DETAIL_FIELD,
 )
 
+
+# The queue-driven lambdas retry the Data API in-process, so their timeout must outlast the retry budget:
+# 5 attempts back off for at most 0.5 + 1 + 2 + 4 s. It must also stay within the queues' 60 s visibility timeout.
+PIPELINE_LAMBDA_TIMEOUT = Duration.seconds(50)
+PIPELINE_RDS_DATA_MAX_ATTEMPTS = "5"
+
+
 class RandomSystemStack(Stack):
 
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         self.execution_context: ExecutionContext = kwargs.pop("execution_context")
         super().__init__(scope, construct_id, **kwargs)
 
-        self.callback_message_buffer_queue = self.create_fifo_queue("callback-message-buffer")
+        # Urgent callbacks get their own lane so bulk or replayed traffic cannot hold them up
+        self.callback_lanes = self.execution_context.aws_sqs.create_priority_fifo_queues(
+            f"{self.module_name()}-callback-message-buffer",
+            self,
+            priorities=[PRIORITY_HIGH, PRIORITY_LOW],
+            visibility_timeout=Duration.seconds(60),
+        )
+        self.callback_message_buffer_queue = self.callback_lanes[PRIORITY_HIGH]
         self.transform_message_buffer_queue = self.create_fifo_queue("transform-message-buffer")
 
         self.vpc = ec2.Vpc(self, f"{self.module_name()}-vpc")
 
+        # Claim-check storage for messages too large for SQS
+        self.payload_bucket = s3.Bucket(
+            self,
+            f"{self.module_name()}-payload-bucket",
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            enforce_ssl=True,
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True,
+            # Outlives the 14 day maximum SQS retention of the messages pointing at it
+            lifecycle_rules=[s3.LifecycleRule(prefix="payloads/", expiration=Duration.days(15))],
+        )
+
         engine_version = rds.AuroraPostgresEngineVersion.VER_13_4
         self.cluster = rds.ServerlessCluster(
             self,
@@ -43,19 +90,26 @@ class RandomSystemStack(Stack):
             self,
             self.execution_context.aws_lambda.create_resource_id(f"{self.module_name()}-history-processor"),
             function_name=self.execution_context.aws_lambda.create_resource_name(f"{self.module_name()}-history-processor"),
-            code=self.execution_context.aws_lambda.get_local_code(self.code_location()),
+            # Bundles orjson and msgpack from random_system/requirements.txt for MESSAGE_CODEC
+            code=self.execution_context.aws_lambda.get_local_code(self.code_location(), is_pip_install=True),
             handler="random_system.history_processor_lambda.lambda_handler",
             environment={
                 ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN: self.cluster.cluster_arn,
                 ENV_RANDOM_SYSTEM_DB_SECRET_ARN: self.cluster.secret.secret_arn,
                 ENV_RANDOM_SYSTEM_DB_NAME: "postgres",
-                ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL: self.transform_message_buffer_queue.queue_url
+                ENV_RANDOM_SYSTEM_OUTPUT_QUEUE_URL: self.transform_message_buffer_queue.queue_url,
+                ENV_PAYLOAD_BUCKET_NAME: self.payload_bucket.bucket_name,
+                # json, orjson or msgpack; consumers decode whatever is sent
+                ENV_MESSAGE_CODEC: "json",
+                ENV_RDS_DATA_MAX_ATTEMPTS: PIPELINE_RDS_DATA_MAX_ATTEMPTS,
             },
             runtime=_lambda.Runtime.PYTHON_3_9,
+            timeout=PIPELINE_LAMBDA_TIMEOUT,
             vpc=self.vpc,
         )
 
         self.cluster.secret.grant_read(self.history_processor_lambda)
+        self.payload_bucket.grant_read_write(self.history_processor_lambda)
         self.history_processor_lambda.add_to_role_policy(
             iam.PolicyStatement(
                 actions=["rds-data:ExecuteStatement"],
@@ -63,27 +117,42 @@ class RandomSystemStack(Stack):
             )
         )
 
-        self.history_processor_lambda.add_event_source(lambda_event_sources.SqsEventSource(self.callback_message_buffer_queue))
+        # Lane isolation: each lane is its own FIFO queue, so a low priority backlog never sits
+        # ahead of high priority events. The rule targets put every event of a lane in one
+        # message group, so each lane is consumed one batch at a time and a per-lane
+        # max_concurrency would have no effect.
+        for lane in self.callback_lanes.values():
+            self.history_processor_lambda.add_event_source(
+                lambda_event_sources.SqsEventSource(lane, report_batch_item_failures=True)
+            )
 
         self.class_mapper_lambda = _lambda.Function(
             self,
             self.execution_context.aws_lambda.create_resource_id(f"{self.module_name()}-class-mapper"),
             function_name=self.execution_context.aws_lambda.create_resource_name(f"{self.module_name()}-class-mapper"),
-            code=self.execution_context.aws_lambda.get_local_code(self.code_location()),
+            code=self.execution_context.aws_lambda.get_local_code(self.code_location(), is_pip_install=True),
             handler="random_system.class_mapper_lambda.lambda_handler",
             environment={
                 ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN: self.cluster.cluster_arn,
                 ENV_RANDOM_SYSTEM_DB_SECRET_ARN: self.cluster.secret.secret_arn,
                 ENV_RANDOM_SYSTEM_DB_NAME: "postgres",
+                ENV_PAYLOAD_BUCKET_NAME: self.payload_bucket.bucket_name,
+                ENV_REFERENCE_CACHE_TTL_SECONDS: "300",
+                ENV_REFERENCE_CACHE_MAX_SIZE: "10000",
+                ENV_RDS_DATA_MAX_ATTEMPTS: PIPELINE_RDS_DATA_MAX_ATTEMPTS,
             },
             runtime=_lambda.Runtime.PYTHON_3_9,
+            timeout=PIPELINE_LAMBDA_TIMEOUT,
             vpc=self.vpc,
         )
 
-        self.class_mapper_lambda.add_event_source(lambda_event_sources.SqsEventSource(self.transform_message_buffer_queue))
+        self.class_mapper_lambda.add_event_source(
+            lambda_event_sources.SqsEventSource(self.transform_message_buffer_queue, report_batch_item_failures=True)
+        )
 
         self.transform_message_buffer_queue.grant_send_messages(self.history_processor_lambda)
         self.cluster.secret.grant_read(self.class_mapper_lambda)
+        self.payload_bucket.grant_read(self.class_mapper_lambda)
         self.class_mapper_lambda.add_to_role_policy(
             iam.PolicyStatement(
                 actions=["rds-data:ExecuteStatement"],
@@ -96,11 +165,51 @@ class RandomSystemStack(Stack):
         self.history_rule.add_target(
             targets.SqsQueue(
                 self.callback_message_buffer_queue,
-                message=events.RuleTargetInput.from_event_path('$.detail'),
+                message=self.traced_event_input(),
                 message_group_id="MyMessageGroupId" 
             )
         )
 
+        # Upstream producers publish history events to a dedicated bus with common.eventbridge_client
+        self.history_event_bus = self.execution_context.aws_event_bus.create_event_bus(
+            f"{self.module_name()}-history", self
+        )
+        self.history_event_rule = events.Rule(
+            self,
+            self.execution_context.aws_event_rule.create_resource_id(f"{self.module_name()}-history-events"),
+            description="Route published history events to the callback message queue",
+            rule_name=self.execution_context.aws_event_rule.create_resource_name(f"{self.module_name()}-history-events"),
+            event_bus=self.history_event_bus,
+            event_pattern=events.EventPattern(
+                source=[HISTORY_EVENT_SOURCE],
+                detail={PRIORITY_FIELD: [PRIORITY_HIGH, {"exists": False}]},
+            ),
+        )
+        self.history_event_rule.add_target(
+            targets.SqsQueue(
+                self.callback_message_buffer_queue,
+                message=self.traced_event_input(),
+                message_group_id="MyMessageGroupId"
+            )
+        )
+        self.low_priority_history_event_rule = events.Rule(
+            self,
+            self.execution_context.aws_event_rule.create_resource_id(f"{self.module_name()}-history-events-low"),
+            description="Route low priority history events to the low priority callback lane",
+            rule_name=self.execution_context.aws_event_rule.create_resource_name(
+                f"{self.module_name()}-history-events-low"
+            ),
+            event_bus=self.history_event_bus,
+            event_pattern=events.EventPattern(source=[HISTORY_EVENT_SOURCE], detail={PRIORITY_FIELD: [PRIORITY_LOW]}),
+        )
+        self.low_priority_history_event_rule.add_target(
+            targets.SqsQueue(
+                self.callback_lanes[PRIORITY_LOW],
+                message=self.traced_event_input(),
+                message_group_id="MyMessageGroupId"
+            )
+        )
+
         # Output the database endpoint
         # self.db_endpoint_output = self.db_instance.db_instance_endpoint_address
 
@@ -108,6 +217,12 @@ class RandomSystemStack(Stack):
         # init data for db
         self.init_db()
 
+        # resume and warm the cluster before the timezone eligibility windows open, invoked by the controller
+        self.pre_warmer_lambda = self.create_pre_warmer()
+
+        # keep user_history partitions created ahead and expired ones dropped
+        self.create_partition_maintenance()
+
     def module_name(self):
         return 'random-system'
 
@@ -124,6 +239,17 @@ class RandomSystemStack(Stack):
         )
         return queue
 
+    @staticmethod
+    def traced_event_input() -> events.RuleTargetInput:
+        "wrap the event detail with its time and id, the trace context the lambdas propagate"
+        return events.RuleTargetInput.from_object({
+            TRACE_DETAIL_FIELD: events.EventField.from_path('$.detail'),
+            TRACE_CONTEXT_FIELD: {
+                "originTime": events.EventField.time,
+                "correlationId": events.EventField.event_id,
+            },
+        })
+
     def create_event_bridge_rule(self, name: str, description: str) -> events.Rule:
         rule = events.Rule(
             self,
@@ -135,7 +261,7 @@ class RandomSystemStack(Stack):
         return rule
 
     def init_db(self):
-        "init some data for testing"
+        "apply schema migrations once per deploy"
 
         init_db_lambda = _lambda.Function(
             self,
@@ -144,7 +270,7 @@ class RandomSystemStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_9,
             handler="random_system.init_db.handler",
             code=self.execution_context.aws_lambda.get_local_code(self.code_location()),
-            timeout=Duration.minutes(5),
+            timeout=Duration.minutes(15),
             environment={
                 "DB_CLUSTER_ARN": self.cluster.cluster_arn,
                 "DB_SECRET_ARN": self.cluster.secret.secret_arn,
@@ -155,16 +281,105 @@ class RandomSystemStack(Stack):
 
         self.cluster.secret.grant_read(init_db_lambda)
         init_db_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "rds-data:ExecuteStatement",
+                    "rds-data:BeginTransaction",
+                    "rds-data:CommitTransaction",
+                    "rds-data:RollbackTransaction",
+                ],
+                resources=[self.cluster.cluster_arn]
+            )
+        )
+
+        # Run the migrations through a custom resource instead of a schedule
+        migration_provider = custom_resources.Provider(
+            self,
+            "InitDbProvider",
+            on_event_handler=init_db_lambda,
+        )
+        schema = CustomResource(
+            self,
+            "InitDbSchema",
+            service_token=migration_provider.service_token,
+            # Changes whenever the migrations change, which makes CloudFormation run the handler again
+            properties={"MigrationsHash": self.migrations_hash()},
+        )
+        schema.node.add_dependency(self.cluster)
+
+    def migrations_hash(self) -> str:
+        with open(os.path.join("apps", self.code_location(), "migrations.py"), "rb") as migrations_file:
+            return hashlib.sha256(migrations_file.read()).hexdigest()
+
+    def create_pre_warmer(self):
+        "resume and warm the cluster; the timezone controller invokes it ahead of the windows it resolves"
+
+        pre_warmer_lambda = _lambda.Function(
+            self,
+            self.execution_context.aws_lambda.create_resource_id(f"{self.module_name()}-pre-warmer"),
+            function_name=self.execution_context.aws_lambda.create_resource_name(f"{self.module_name()}-pre-warmer"),
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler="random_system.pre_warmer_lambda.lambda_handler",
+            code=self.execution_context.aws_lambda.get_local_code(self.code_location()),
+            timeout=Duration.minutes(3),
+            environment={
+                ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN: self.cluster.cluster_arn,
+                ENV_RANDOM_SYSTEM_DB_SECRET_ARN: self.cluster.secret.secret_arn,
+                ENV_RANDOM_SYSTEM_DB_NAME: "postgres",
+            },
+            vpc=self.vpc,
+        )
+
+        self.cluster.secret.grant_read(pre_warmer_lambda)
+        pre_warmer_lambda.add_to_role_policy(
             iam.PolicyStatement(
                 actions=["rds-data:ExecuteStatement"],
                 resources=[self.cluster.cluster_arn]
             )
         )
 
-        # Create EventBridge Rule to trigger init_db_lambda after stack deployment
-        init_db_rule = events.Rule(
+        return pre_warmer_lambda
+
+    def create_partition_maintenance(self):
+        "pre-create upcoming user_history partitions and drop the expired ones daily"
+
+        partition_maintenance_lambda = _lambda.Function(
+            self,
+            self.execution_context.aws_lambda.create_resource_id(f"{self.module_name()}-partition-maintenance"),
+            function_name=self.execution_context.aws_lambda.create_resource_name(
+                f"{self.module_name()}-partition-maintenance"
+            ),
+            runtime=_lambda.Runtime.PYTHON_3_9,
+            handler="random_system.partition_maintenance_lambda.lambda_handler",
+            code=self.execution_context.aws_lambda.get_local_code(self.code_location()),
+            timeout=Duration.minutes(5),
+            environment={
+                ENV_RANDOM_SYSTEM_DB_CLUSTER_ARN: self.cluster.cluster_arn,
+                ENV_RANDOM_SYSTEM_DB_SECRET_ARN: self.cluster.secret.secret_arn,
+                ENV_RANDOM_SYSTEM_DB_NAME: "postgres",
+                ENV_HISTORY_RETENTION_DAYS: "30",
+                ENV_HISTORY_PREMAKE_DAYS: "7",
+            },
+            vpc=self.vpc,
+        )
+
+        self.cluster.secret.grant_read(partition_maintenance_lambda)
+        partition_maintenance_lambda.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "rds-data:ExecuteStatement",
+                    "rds-data:BeginTransaction",
+                    "rds-data:CommitTransaction",
+                    "rds-data:RollbackTransaction",
+                ],
+                resources=[self.cluster.cluster_arn]
+            )
+        )
+
+        # Partitions are made a week ahead, so a few failed daily runs never block inserts
+        partition_maintenance_rule = events.Rule(
             self,
-            "InitDbRule",
-            schedule=events.Schedule.rate(Duration.minutes(1))
+            "PartitionMaintenanceRule",
+            schedule=events.Schedule.rate(Duration.days(1))
         )
-        init_db_rule.add_target(targets.LambdaFunction(init_db_lambda))
+        partition_maintenance_rule.add_target(targets.LambdaFunction(partition_maintenance_lambda))
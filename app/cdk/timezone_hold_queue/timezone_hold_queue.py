@@ -1,12 +1,22 @@
 from aws_cdk import (
     Duration,
+    RemovalPolicy,
     Stack,
+    aws_dynamodb as dynamodb,
     aws_events,
     aws_iam as iam,
     aws_lambda as _lambda,
     aws_events_targets as targets,
 )
 from constructs import Construct
+import json
+
+# A tick reads every queue's attributes, tags and metrics, updates mappings and writes the
+# inventory snapshot, with SQS backoff on top. The default 3 s is far too short; stay under
+# the 1 minute schedule so ticks never overlap.
+CONTROLLER_TIMEOUT = Duration.seconds(55)
+# Caps the SQS backoff per call at about 0.3 s, so retries cannot eat the tick.
+CONTROLLER_SQS_MAX_ATTEMPTS = "3"
 
 
 class TimeZoneHoldQueueStack(Stack):
@@ -14,11 +24,23 @@ class TimeZoneHoldQueueStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         self.execution_context = kwargs.pop("execution_context")
         # self.holidays_table = kwargs.pop("holidays_table")
+        self.db_cluster_identifier = kwargs.pop("db_cluster_identifier", None)
+        self.pre_warmer_function = kwargs.pop("pre_warmer_function", None)
         super().__init__(scope, construct_id, **kwargs)
         self.account_id = self.execution_context.env_properties['account_id']
 
         # For testing
-        self.target_lambda_name = "test"
+        self.target_lambda_names = ["test"]
+
+        # Snapshot of the event source mapping inventory, shared by cold containers
+        self.inventory_table = dynamodb.Table(
+            self,
+            self.execution_context.aws_dynamo_db.create_resource_id(f"{self.module_name()}-inventory"),
+            table_name=self.execution_context.aws_dynamo_db.create_resource_name(f"{self.module_name()}-inventory"),
+            partition_key=dynamodb.Attribute(name="INVENTORY_ID", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
 
         # The code that defines your stack goes here
         self.controller_lambda_role = self.create_lambda_role(
@@ -29,8 +51,18 @@ class TimeZoneHoldQueueStack(Stack):
             self.execution_context.aws_lambda.create_resource_name(self.module_name()),
             "timezone_hold_queue.main.lambda_handler",
             role=self.controller_lambda_role,
+            timeout=CONTROLLER_TIMEOUT,
             env_vars={
-                "TARGET_LAMBDA_NAME": self.target_lambda_name,
+                "TARGET_LAMBDA_NAMES": ",".join(self.target_lambda_names),
+                "INVENTORY_TABLE_NAME": self.inventory_table.table_name,
+                "INVENTORY_REFRESH_SECONDS": "900",
+                "SQS_MAX_ATTEMPTS": CONTROLLER_SQS_MAX_ATTEMPTS,
+                "RAMP_STAGES": "2,5,10,25",
+                "RAMP_SMALL_BACKLOG": "100",
+                "RAMP_YOUNG_BACKLOG_SECONDS": "900",
+                "RAMP_OLD_BACKLOG_SECONDS": "21600",
+                **self.ramp_latency_env_vars(),
+                **self.pre_warm_env_vars(),
                 "REGION": self.region,
                 "ACCOUNT_ID": self.account_id,
                 "START_TIME_HOUR": "8",
@@ -46,15 +78,46 @@ class TimeZoneHoldQueueStack(Stack):
         )
 
 
+        if self.pre_warmer_function:
+            self.pre_warmer_function.grant_invoke(self.controller_lambda_role)
+
         self.event_bridge_rule = self.create_event_bridge_rule()
         self.event_bridge_rule.add_target(targets.LambdaFunction(self.controller_lambda_function))
 
+        # Refresh the inventory as soon as a mapping is created or deleted (needs a CloudTrail trail)
+        self.mapping_change_rule = self.create_mapping_change_rule()
+        self.mapping_change_rule.add_target(targets.LambdaFunction(self.controller_lambda_function))
+
     def module_name(self):
         return 'timezone-hold-queue'
 
     def code_location(self):
         return 'timezone_hold_queue'
 
+    def ramp_latency_env_vars(self) -> dict:
+        """Database latency metric the concurrency ramp must keep healthy, when a cluster is given."""
+        if not self.db_cluster_identifier:
+            return {}
+        return {
+            "RAMP_LATENCY_METRIC": json.dumps({
+                "namespace": "AWS/RDS",
+                "metric_name": "DMLLatency",
+                "dimensions": {"DBClusterIdentifier": self.db_cluster_identifier},
+            }),
+            # milliseconds
+            "RAMP_MAX_LATENCY": "50",
+        }
+
+    def pre_warm_env_vars(self) -> dict:
+        """The controller invokes the database pre-warmer ahead of the windows it resolves, when one is given."""
+        if not self.pre_warmer_function:
+            return {}
+        return {
+            "PRE_WARMER_FUNCTION_NAME": self.pre_warmer_function.function_name,
+            "PRE_WARM_LEAD_MINUTES": "15",
+            "PRE_WARM_INTERVAL_SECONDS": "300",
+        }
+
     def create_lambda_function(
         self,
         id: str,
@@ -62,6 +125,7 @@ class TimeZoneHoldQueueStack(Stack):
         handler: str,
         role: iam.Role = None,
         env_vars: dict = {},
+        timeout: Duration = None,
     ) -> _lambda.Function:
 
         lambda_function = _lambda.Function(
@@ -73,6 +137,7 @@ class TimeZoneHoldQueueStack(Stack):
             environment=env_vars,
             runtime=_lambda.Runtime.PYTHON_3_9,
             role=role,
+            timeout=timeout,
         )
 
         return lambda_function
@@ -87,6 +152,25 @@ class TimeZoneHoldQueueStack(Stack):
         )
         return rule
 
+    def create_mapping_change_rule(self) -> aws_events.Rule:
+        rule = aws_events.Rule(
+            self,
+            self.execution_context.aws_event_rule.create_resource_name(f"{self.module_name()}-mapping-change"),
+            description='Event Rule to refresh the event source mapping inventory when mappings change.',
+            rule_name=self.execution_context.aws_event_rule.create_resource_name(f"{self.module_name()}-mapping-change"),
+            event_pattern=aws_events.EventPattern(
+                source=["aws.lambda"],
+                detail_type=["AWS API Call via CloudTrail"],
+                detail={
+                    "eventName": [
+                        {"prefix": "CreateEventSourceMapping"},
+                        {"prefix": "DeleteEventSourceMapping"},
+                    ]
+                },
+            ),
+        )
+        return rule
+
     def create_lambda_role(self, role_name) -> iam.Role:
         lambda_role = iam.Role(
             self,
@@ -97,6 +181,7 @@ class TimeZoneHoldQueueStack(Stack):
             ]
         )
         # self.holidays_table.grant_read_data(lambda_role)
+        self.inventory_table.grant_read_write_data(lambda_role)
         lambda_role.add_to_policy(
             iam.PolicyStatement(
                 actions=[
@@ -107,6 +192,18 @@ class TimeZoneHoldQueueStack(Stack):
             )
         )
 
+        # Schedule registry tag lookups and concurrency ramp backlog / latency reads
+        lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "sqs:ListQueueTags",
+                    "sqs:GetQueueAttributes",
+                    "cloudwatch:GetMetricStatistics",
+                ],
+                resources=["*"]
+            )
+        )
+
         lambda_role.add_to_policy(
             iam.PolicyStatement(
                 actions=[
@@ -115,7 +212,10 @@ class TimeZoneHoldQueueStack(Stack):
                 resources=["*"],
                 condition={
                     "StringEquals": {
-                        "lambda:FunctionArn": f"arn:aws:lambda:{self.region}:{self.account_id}:function:{self.target_lambda_name}"
+                        "lambda:FunctionArn": [
+                            f"arn:aws:lambda:{self.region}:{self.account_id}:function:{target_lambda_name}"
+                            for target_lambda_name in self.target_lambda_names
+                        ]
                     }
                 }
             )